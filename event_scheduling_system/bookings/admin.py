@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, BookingJob, CancellationNotice, EventLottery, LotteryEntry, SeatHold, WaitlistEntry
 
 
 @admin.register(Booking)
@@ -8,3 +8,51 @@ class BookingAdmin(admin.ModelAdmin):
     list_filter = ['status', 'booking_date']
     search_fields = ['attendee__user__username', 'event__title']
     ordering = ['-booking_date']
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'attendee', 'event', 'status', 'joined_at']
+    list_filter = ['status', 'joined_at']
+    search_fields = ['attendee__user__username', 'event__title']
+    ordering = ['joined_at']
+
+
+@admin.register(BookingJob)
+class BookingJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'attendee', 'event', 'status', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['attendee__user__username', 'event__title']
+    ordering = ['-id']
+
+
+@admin.register(CancellationNotice)
+class CancellationNoticeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'status', 'sent', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['event__title']
+    ordering = ['-id']
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ['id', 'attendee', 'event', 'status', 'expires_at']
+    list_filter = ['status', 'expires_at']
+    search_fields = ['attendee__user__username', 'event__title']
+    ordering = ['-created_at']
+
+
+@admin.register(EventLottery)
+class EventLotteryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'closes_at', 'drawn_at', 'winners']
+    list_filter = ['closes_at', 'drawn_at']
+    search_fields = ['event__title']
+    ordering = ['-created_at']
+
+
+@admin.register(LotteryEntry)
+class LotteryEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'lottery', 'attendee', 'result', 'created_at']
+    list_filter = ['result']
+    search_fields = ['attendee__user__username', 'lottery__event__title']
+    ordering = ['-id']
@@ -0,0 +1,229 @@
+"""
+In-process admission queue for booking requests on hot events.
+
+Concurrent booking requests for one event are collected for a short window
+and applied by a single leader thread as one batch: one capacity claim, one
+bulk insert of bookings and one bulk insert of history points. Each waiting
+request then receives its own result.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from events.models import Event
+from user.models import HistoryPoint
+from .conflicts import conflict_check_enabled, conflicting_titles
+from .models import Booking
+
+
+class AdmissionRejected(Exception):
+    """Raised for a queued booking request that could not be admitted."""
+
+
+def closed_reason(event):
+    """Why event takes no direct bookings right now, or None if it does."""
+    if event.is_cancelled:
+        return 'This event has been cancelled by its organiser.'
+    if event.is_past:
+        return 'Cannot book for events that have already ended.'
+    if event.is_ongoing:
+        return 'Cannot book for events that are currently ongoing.'
+    if event.lottery_pending:
+        return 'Seats for this event are allocated by lottery. Enter the draw instead.'
+    return None
+
+
+def rebooking_reason(status):
+    """Why an attendee whose booking of the event has status cannot book it again."""
+    if status == Booking.STATUS_CANCELLED:
+        return 'You already have a cancelled booking for this event. Reactivate it instead.'
+    return 'You already have an active booking for this event.'
+
+
+class AdmissionTicket:
+    """A booking request waiting in an admission queue."""
+
+    def __init__(self, attendee, user):
+        self.attendee = attendee
+        self.user = user
+        self.leads = False
+        self.done = False
+        self.booking = None
+        self.error = None
+        self._ready = threading.Event()
+
+    def resolve(self, booking=None, error=None):
+        self.booking = booking
+        self.error = error
+        self.done = True
+        self._ready.set()
+
+    def promote(self):
+        self.leads = True
+        self._ready.set()
+
+    def wait(self):
+        self._ready.wait()
+
+    def result(self):
+        if isinstance(self.error, Exception):
+            raise self.error
+        return self.booking
+
+
+def admit_tickets(event_id, tickets):
+    """
+    Admit tickets for one event: one capacity claim, one bulk insert of
+    bookings and one of history points. Must run inside a transaction.
+
+    The event's state and the attendees' conflicts are checked again here,
+    since queued jobs are admitted some time after they were validated.
+
+    Returns (ticket, booking, error) for every ticket, without resolving them.
+    """
+    event = Event.objects.get(pk=event_id)
+    reason = closed_reason(event)
+    if reason:
+        return [(ticket, None, AdmissionRejected(reason)) for ticket in tickets]
+    outcomes = []
+    existing = dict(
+        Booking.objects.filter(
+            event_id=event_id, attendee_id__in=[ticket.attendee.pk for ticket in tickets]
+        ).values_list('attendee_id', 'status')
+    )
+    candidates = []
+    for ticket in tickets:
+        if ticket.attendee.pk in existing:
+            outcomes.append((ticket, None, AdmissionRejected(rebooking_reason(existing[ticket.attendee.pk]))))
+            continue
+        existing[ticket.attendee.pk] = Booking.STATUS_ACTIVE
+        candidates.append(ticket)
+
+    if conflict_check_enabled() and candidates:
+        conflicts = conflicting_titles([ticket.attendee.pk for ticket in candidates], event)
+        for ticket in [ticket for ticket in candidates if ticket.attendee.pk in conflicts]:
+            outcomes.append((ticket, None, AdmissionRejected(
+                f"This event overlaps your booking for: {', '.join(conflicts[ticket.attendee.pk])}."
+            )))
+            candidates.remove(ticket)
+
+    granted = event.claim_seats(len(candidates))
+    for ticket in candidates[granted:]:
+        outcomes.append((ticket, None, AdmissionRejected(
+            'This event is at full capacity. No more bookings available.'
+        )))
+    admitted = candidates[:granted]
+    bookings = Booking.objects.bulk_create([
+        Booking(attendee=ticket.attendee, event=event) for ticket in admitted
+    ])
+    HistoryPoint.bulk_log_actions(
+        (ticket.user, HistoryPoint.ACTION_CREATE, booking, {
+            'event_id': event.id,
+            'event_title': event.title,
+            'booking_date': booking.booking_date.isoformat(),
+            'status': booking.status
+        })
+        for ticket, booking in zip(admitted, bookings)
+    )
+    for ticket, booking in zip(admitted, bookings):
+        booking._remember_persisted_state()
+        outcomes.append((ticket, booking, None))
+    return outcomes
+
+
+def apply_batch(event_id, tickets):
+    """
+    Admit a batch of tickets for one event in a single short transaction.
+
+    Tickets are resolved after the transaction commits, so no waiting request
+    sees a booking that could still be rolled back.
+    """
+    try:
+        with transaction.atomic():
+            outcomes = admit_tickets(event_id, tickets)
+    except Exception as exc:
+        for ticket in tickets:
+            ticket.resolve(error=exc)
+        return
+    for ticket, booking, error in outcomes:
+        ticket.resolve(booking=booking, error=error)
+
+
+class AdmissionQueue:
+    """
+    Group-commit queue for one event.
+
+    The first request to arrive becomes the leader: it waits window seconds,
+    applies everything queued so far (up to max_batch) and hands leadership
+    to the next waiting request, if any.
+    """
+
+    def __init__(self, event_id, window, max_batch, apply=apply_batch):
+        self.event_id = event_id
+        self.window = window
+        self.max_batch = max_batch
+        self.apply = apply
+        self._lock = threading.Lock()
+        self._pending = []
+        self._leader = None
+
+    def submit(self, attendee, user):
+        """Queue a booking request and block until it has been applied."""
+        ticket = AdmissionTicket(attendee, user)
+        with self._lock:
+            self._pending.append(ticket)
+            if self._leader is None:
+                self._leader = ticket
+                ticket.leads = True
+        if not ticket.leads:
+            ticket.wait()
+        if not ticket.done:
+            self._lead()
+        return ticket.result()
+
+    def _lead(self):
+        time.sleep(self.window)
+        with self._lock:
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+        try:
+            self.apply(self.event_id, batch)
+        finally:
+            with self._lock:
+                self._leader = self._pending[0] if self._pending else None
+                if self._leader is not None:
+                    self._leader.promote()
+                idle = self._leader is None
+            if idle:
+                _forget_queue(self)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def admission_enabled():
+    """The queue is opt-in through BOOKING_ADMISSION_WINDOW_MS."""
+    return getattr(settings, 'BOOKING_ADMISSION_WINDOW_MS', 0) > 0
+
+
+def admission_queue_for(event_id):
+    """Return the process-wide admission queue of an event, creating it on first use."""
+    with _queues_lock:
+        queue = _queues.get(event_id)
+        if queue is None:
+            queue = _queues[event_id] = AdmissionQueue(
+                event_id,
+                window=settings.BOOKING_ADMISSION_WINDOW_MS / 1000,
+                max_batch=getattr(settings, 'BOOKING_ADMISSION_MAX_BATCH', 500),
+            )
+        return queue
+
+
+def _forget_queue(queue):
+    # An idle queue is dropped; a late submitter on it simply leads its own batch
+    with _queues_lock:
+        if _queues.get(queue.event_id) is queue:
+            del _queues[queue.event_id]
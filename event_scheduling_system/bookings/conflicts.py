@@ -0,0 +1,100 @@
+"""
+Time conflicts between a customer's active bookings.
+
+Two bookings conflict when their events overlap: each starts before the other
+ends (back-to-back events do not conflict). Checking one event against a
+customer's bookings is a single query with range predicates on the events
+joined through the active-bookings index. Finding every conflicting pair
+sweeps the bookings in start order, keeping a heap of the events still
+running, so n bookings cost O(n log n) plus the pairs found.
+"""
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+
+from .models import Booking
+
+# values() paths read by the sweep
+INTERVAL_FIELDS = ('id', 'attendee_id', 'event_id', 'event__start_time', 'event__end_time')
+
+
+def conflict_check_enabled():
+    return getattr(settings, 'BOOKING_CONFLICT_CHECK', False)
+
+
+def overlapping_bookings(attendee, start_time, end_time):
+    """Active bookings of attendee whose event overlaps [start_time, end_time)."""
+    return Booking.objects.filter(
+        attendee=attendee,
+        status=Booking.STATUS_ACTIVE,
+        event__start_time__lt=end_time,
+        event__end_time__gt=start_time,
+    )
+
+
+def conflicting_bookings(attendee, event):
+    """Active bookings of attendee for other events overlapping event."""
+    return overlapping_bookings(attendee, event.start_time, event.end_time).exclude(event=event)
+
+
+def conflicting_titles(attendee_ids, event):
+    """
+    Titles of other booked events overlapping event, in start order, for
+    each of attendee_ids that has any; one query for all of them.
+    """
+    rows = Booking.objects.filter(
+        attendee_id__in=attendee_ids,
+        status=Booking.STATUS_ACTIVE,
+        event__start_time__lt=event.end_time,
+        event__end_time__gt=event.start_time,
+    ).exclude(event=event).order_by('event__start_time').values_list('attendee_id', 'event__title')
+    titles = {}
+    for attendee_id, title in rows:
+        titles.setdefault(attendee_id, []).append(title)
+    return titles
+
+
+def sweep_conflicts(intervals):
+    """
+    Yield (first, second) pairs of overlapping intervals.
+
+    intervals are (start, end, item) tuples sorted by start; each pair is
+    yielded once, the earlier-starting item first.
+    """
+    running = []
+    for order, (start, end, item) in enumerate(intervals):
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        for _, _, other in sorted(running, key=lambda entry: entry[1]):
+            yield other, item
+        heapq.heappush(running, (end, order, item))
+
+
+def _intervals(rows):
+    return [(row['event__start_time'], row['event__end_time'], row) for row in rows]
+
+
+def _active_rows(queryset):
+    return queryset.filter(status=Booking.STATUS_ACTIVE).values(*INTERVAL_FIELDS)
+
+
+def customer_conflicts(attendee):
+    """Conflicting pairs of attendee's active bookings, as values() rows, in one query."""
+    rows = _active_rows(Booking.objects.filter(attendee=attendee)).order_by('event__start_time', 'id')
+    return list(sweep_conflicts(_intervals(rows)))
+
+
+def audit_conflicts(chunk_size=2000):
+    """
+    Yield (attendee_id, pairs) for every customer with conflicting bookings.
+
+    Streams all active bookings ordered by customer and start time, so memory
+    holds one customer's bookings at a time.
+    """
+    rows = _active_rows(Booking.objects.all()).order_by('attendee_id', 'event__start_time', 'id')
+    by_customer = groupby(rows.iterator(chunk_size=chunk_size), key=lambda row: row['attendee_id'])
+    for attendee_id, customer_rows in by_customer:
+        pairs = list(sweep_conflicts(_intervals(customer_rows)))
+        if pairs:
+            yield attendee_id, pairs
@@ -0,0 +1,19 @@
+from event_scheduling_system.fast_serializers import ValuesSerializer, format_datetime, nullable
+
+_datetime = nullable(format_datetime)
+
+
+class BookingValuesSerializer(ValuesSerializer):
+    """values() counterpart of BookingSerializer for list pages."""
+    fields = (
+        ('id', ('id',), lambda row: row['id']),
+        ('attendee', ('attendee_id',), lambda row: row['attendee_id']),
+        ('event', ('event_id',), lambda row: row['event_id']),
+        ('booking_date', ('booking_date',), lambda row: _datetime(row['booking_date'])),
+        ('status', ('status',), lambda row: row['status']),
+    )
+    version_lookups = ('id', 'updated_at')
+
+    def version(self, row):
+        # Mirrors BookingViewSet.object_version
+        return row['id'], row['updated_at'].isoformat()
@@ -0,0 +1,34 @@
+"""
+iCalendar feed of a customer's active bookings, addressed by the secret key
+of their CalendarFeed (GET /bookingapi/calendar/{key}.ics).
+"""
+from django.views.decorators.http import require_safe
+
+from event_scheduling_system.icalendar import calendar_response, feed_chunk_size
+from events.feeds import event_component, feed_user
+from .models import Booking
+
+# values() paths of the booked event, named as events.feeds.FEED_FIELDS expects
+FEED_FIELDS = {
+    'id': 'event_id', 'title': 'event__title', 'description': 'event__description',
+    'start_time': 'event__start_time', 'end_time': 'event__end_time', 'updated_at': 'event__updated_at',
+    'cancelled_at': 'event__cancelled_at',
+}
+
+
+@require_safe
+def customer_calendar(request, key):
+    user = feed_user(key, 'customer_profile')
+    rows = (
+        Booking.objects.filter(attendee=user.customer_profile, status=Booking.STATUS_ACTIVE)
+        .order_by('event__start_time', 'id')
+        .values_list(*FEED_FIELDS.values())
+    )
+    host = request.get_host()
+    components = (
+        event_component(dict(zip(FEED_FIELDS, row)), host)
+        for row in rows.iterator(chunk_size=feed_chunk_size())
+    )
+    return calendar_response(
+        request, f'{user.username} bookings', components, 'bookings', key, content_rows=rows
+    )
@@ -0,0 +1,212 @@
+"""
+Time-limited seat holds.
+
+A hold claims a seat with the same guarded counter update as a booking, for
+SEAT_HOLD_MINUTES. Confirming it writes the booking without claiming again;
+releasing or expiring it gives the seat back and promotes the waitlist.
+
+Expiry never scans all holds. HoldSweeper, run by a long-running worker
+(manage.py run_hold_sweeper), keeps a min-heap of (expires_at, id): new holds
+are picked up with an id range scan since its last poll, and holds are expired
+in batches as they reach the top of the heap. A periodic range sweep over the
+partial expires_at index of live holds catches holds the heap never saw, e.g.
+ones placed while the sweeper was down or committed out of id order.
+"""
+import heapq
+import time
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from event_scheduling_system.conditional import touch_catalog
+from events.models import Event, EventFullError
+from user.models import HistoryPoint
+from .admission import closed_reason
+from .conflicts import conflict_check_enabled, conflicting_titles
+from .models import Booking, SeatHold, schedule_waitlist_promotion
+
+
+HELD_SEAT_MESSAGE = 'You hold a seat for this event. Confirm the hold instead.'
+
+
+def hold_duration():
+    return timedelta(minutes=getattr(settings, 'SEAT_HOLD_MINUTES', 10))
+
+
+def live_holds(attendee, events):
+    """attendee's holds still holding a seat on any of events (ids or instances)."""
+    return SeatHold.objects.filter(
+        attendee=attendee, event__in=events, status=SeatHold.STATUS_HELD, expires_at__gt=timezone.now()
+    )
+
+
+def place_hold(attendee, event):
+    """
+    Hold a seat on event for attendee; raises EventFullError or ValueError.
+    """
+    try:
+        with transaction.atomic():
+            if not event.claim_seat(key=attendee.pk):
+                raise EventFullError("This event is at full capacity.")
+            return SeatHold.objects.create(
+                attendee=attendee, event=event, expires_at=timezone.now() + hold_duration()
+            )
+    except IntegrityError:
+        # The unique live-hold constraint; the seat claim was rolled back with the insert
+        raise ValueError("You already hold a seat for this event.")
+
+
+def confirm_hold(hold, user):
+    """
+    Turn a live hold into an active booking that keeps the held seat.
+
+    The event and the attendee's schedule are checked as for a direct
+    booking, since either may have changed while the seat was held.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        confirmed = SeatHold.objects.filter(
+            pk=hold.pk, status=SeatHold.STATUS_HELD, expires_at__gt=now
+        ).update(status=SeatHold.STATUS_CONFIRMED, updated_at=now)
+        if not confirmed:
+            raise ValueError("This hold has expired or was already used.")
+        event = Event.objects.get(pk=hold.event_id)
+        reason = closed_reason(event)
+        if reason:
+            raise ValueError(reason)
+        if conflict_check_enabled():
+            titles = conflicting_titles([hold.attendee_id], event).get(hold.attendee_id)
+            if titles:
+                raise ValueError(f"This event overlaps your booking for: {', '.join(titles)}.")
+        booking = Booking.objects.filter(attendee_id=hold.attendee_id, event_id=hold.event_id).first()
+        if booking is not None and booking.status == Booking.STATUS_ACTIVE:
+            raise ValueError("You already have an active booking for this event.")
+        action = HistoryPoint.ACTION_REACTIVATE if booking is not None else HistoryPoint.ACTION_CREATE
+        # The hold's seat carries over, so the row is written without Booking.save's claim
+        if booking is None:
+            booking = Booking.objects.bulk_create([Booking(attendee_id=hold.attendee_id, event_id=hold.event_id)])[0]
+        else:
+            Booking.objects.filter(pk=booking.pk).update(status=Booking.STATUS_ACTIVE, updated_at=now)
+            booking.status = Booking.STATUS_ACTIVE
+        booking._remember_persisted_state()
+        SeatHold.objects.filter(pk=hold.pk).update(booking=booking)
+        HistoryPoint.log_action(
+            user=user,
+            action=action,
+            obj=booking,
+            details={
+                'event_id': hold.event_id,
+                'event_title': event.title,
+                'booking_date': booking.booking_date.isoformat(),
+                'status': booking.status,
+                'hold_id': hold.pk
+            }
+        )
+        touch_catalog()
+    hold.status = SeatHold.STATUS_CONFIRMED
+    hold.booking = booking
+    return booking
+
+
+def release_hold(hold):
+    """Give a live hold's seat back before it expires."""
+    if not _end_holds([hold.pk], SeatHold.STATUS_RELEASED):
+        raise ValueError("Only live holds can be released.")
+    hold.status = SeatHold.STATUS_RELEASED
+
+
+def expire_holds(ids, now=None):
+    """Expire the holds among ids that are still held and due; returns how many were."""
+    return _end_holds(ids, SeatHold.STATUS_EXPIRED, due_by=now or timezone.now())
+
+
+def _end_holds(ids, status, due_by=None):
+    """
+    End the live holds among ids and release their seats, one counter
+    update per event.
+    """
+    with transaction.atomic():
+        live = SeatHold.objects.select_for_update().filter(id__in=ids, status=SeatHold.STATUS_HELD)
+        if due_by is not None:
+            live = live.filter(expires_at__lte=due_by)
+        rows = sorted(live.values_list('event_id', 'id'))
+        if not rows:
+            return 0
+        SeatHold.objects.filter(id__in=[hold_id for _, hold_id in rows], status=SeatHold.STATUS_HELD).update(
+            status=status, updated_at=timezone.now()
+        )
+        events = Event.objects.in_bulk({event_id for event_id, _ in rows})
+        for event_id, group in groupby(rows, key=lambda row: row[0]):
+            events[event_id].release_seats(len(list(group)))
+            schedule_waitlist_promotion(event_id)
+    return len(rows)
+
+
+class HoldSweeper:
+    """
+    Expire seat holds as they fall due, from a min-heap of (expires_at, id).
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.heap = []
+        self.last_id = 0
+
+    def load_new(self):
+        """Push holds placed since the last poll onto the heap (an id range scan); returns how many."""
+        holds = SeatHold.objects.filter(id__gt=self.last_id, status=SeatHold.STATUS_HELD).order_by('id')
+        loaded = 0
+        for hold_id, expires_at in holds.values_list('id', 'expires_at').iterator(chunk_size=self.batch_size):
+            heapq.heappush(self.heap, (expires_at, hold_id))
+            self.last_id = hold_id
+            loaded += 1
+        return loaded
+
+    def expire_due(self, now=None):
+        """Expire the heap's due holds in batches; returns how many expired."""
+        now = now or timezone.now()
+        expired = 0
+        while self.heap and self.heap[0][0] <= now:
+            batch = []
+            while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self.heap)[1])
+            # Holds confirmed or released meanwhile are skipped by the status check
+            expired += expire_holds(batch, now)
+        return expired
+
+    def sweep(self, now=None):
+        """Fallback: expire every due live hold found by an expires_at range scan."""
+        now = now or timezone.now()
+        expired = 0
+        while True:
+            batch = list(
+                SeatHold.objects.filter(status=SeatHold.STATUS_HELD, expires_at__lte=now)
+                .order_by('expires_at', 'id').values_list('id', flat=True)[:self.batch_size]
+            )
+            if not batch:
+                return expired
+            expired += expire_holds(batch, now)
+
+    def seconds_until_next(self, default):
+        if not self.heap:
+            return default
+        return max(0.0, min(default, (self.heap[0][0] - timezone.now()).total_seconds()))
+
+    def run(self, poll_interval=1.0, sweep_interval=None):
+        """
+        Load new holds and expire due ones forever, sleeping until the next
+        expiry or poll, with a range sweep every sweep_interval seconds.
+        """
+        if sweep_interval is None:
+            sweep_interval = getattr(settings, 'SEAT_HOLD_SWEEP_INTERVAL', 60)
+        next_sweep = time.monotonic()
+        while True:
+            if time.monotonic() >= next_sweep:
+                self.sweep()
+                next_sweep = time.monotonic() + sweep_interval
+            self.load_new()
+            self.expire_due()
+            time.sleep(self.seconds_until_next(poll_interval))
@@ -0,0 +1,155 @@
+"""
+Asynchronous booking submission.
+
+With BOOKING_ASYNC_SUBMISSION on, a validated booking request is stored as a
+BookingJob (a single INSERT) and answered with 202 and the job id, so request
+latency does not depend on queue depth or on contention for the event.
+Booking workers (manage.py run_booking_workers) claim the oldest jobs in
+batches with a guarded UPDATE, group them by event and admit each group with
+the admission queue's rules: one capacity claim and bulk inserts, with the
+jobs' outcomes written in the same transaction.
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .admission import AdmissionRejected, admit_tickets, rebooking_reason
+from .cancellation import drain_notices
+from .models import Booking, BookingJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds between status reads while a long-poll waits for a job
+WAIT_POLL_INTERVAL = 0.25
+
+
+def async_submission_enabled():
+    return getattr(settings, 'BOOKING_ASYNC_SUBMISSION', False)
+
+
+def max_wait():
+    """Longest long-poll a status request may ask for, in seconds."""
+    return getattr(settings, 'BOOKING_JOB_MAX_WAIT', 30)
+
+
+def submit_booking(attendee, event):
+    """
+    Queue a booking request; returns the job, whose id is the client's ticket.
+
+    Raises AdmissionRejected if the attendee already has a booking of the
+    event, which a worker could only refuse.
+    """
+    status = Booking.objects.filter(attendee=attendee, event=event).values_list('status', flat=True).first()
+    if status is not None:
+        raise AdmissionRejected(rebooking_reason(status))
+    return BookingJob.objects.create(attendee=attendee, event=event)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'[:48]
+
+
+def claim_jobs(worker, batch_size, stale_after=None):
+    """
+    Claim up to batch_size of the oldest pending jobs for worker.
+
+    Jobs left processing for longer than stale_after seconds belong to a
+    worker that stopped before finishing and are claimed again. The UPDATE
+    only matches rows that are still pending, so concurrent workers never
+    claim the same job.
+    """
+    if stale_after is None:
+        stale_after = getattr(settings, 'BOOKING_JOB_CLAIM_TIMEOUT', 300)
+    now = timezone.now()
+    pending = Q(status=BookingJob.STATUS_QUEUED) | Q(
+        status=BookingJob.STATUS_PROCESSING, claimed_at__lt=now - timedelta(seconds=stale_after)
+    )
+    ids = list(BookingJob.objects.filter(pending).order_by('id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    # A token per claim tells this claim's rows apart from an earlier one of the same worker
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    BookingJob.objects.filter(pending, id__in=ids).update(
+        status=BookingJob.STATUS_PROCESSING, worker=token, claimed_at=now
+    )
+    return list(BookingJob.objects.filter(worker=token).select_related('attendee__user', 'event'))
+
+
+class JobTicket:
+    """A claimed job in the shape admit_tickets expects."""
+
+    def __init__(self, job):
+        self.job = job
+        self.attendee = job.attendee
+        self.user = job.attendee.user
+
+
+def _finish(outcomes):
+    now = timezone.now()
+    jobs = []
+    for ticket, booking, error in outcomes:
+        job = ticket.job
+        job.status = BookingJob.STATUS_FAILED if error else BookingJob.STATUS_DONE
+        job.booking = booking
+        job.error = str(error)[:255] if error else ''
+        job.updated_at = now
+        jobs.append(job)
+    BookingJob.objects.bulk_update(jobs, ['status', 'booking', 'error', 'updated_at'])
+
+
+def process_jobs(jobs):
+    """
+    Apply claimed jobs, one transaction per event in event id order.
+
+    Returns the number of jobs processed.
+    """
+    for event_id, group in groupby(sorted(jobs, key=attrgetter('event_id', 'id')), key=attrgetter('event_id')):
+        tickets = [JobTicket(job) for job in group]
+        try:
+            with transaction.atomic():
+                _finish(admit_tickets(event_id, tickets))
+        except Exception as exc:
+            logger.exception('Booking jobs for event %s failed', event_id)
+            _finish([(ticket, None, exc) for ticket in tickets])
+    return len(jobs)
+
+
+def drain(worker=None, batch_size=None):
+    """Claim and apply one batch; returns the number of jobs processed."""
+    batch_size = batch_size or getattr(settings, 'BOOKING_JOB_BATCH_SIZE', 100)
+    return process_jobs(claim_jobs(worker or worker_name(), batch_size))
+
+
+def run_worker(batch_size, poll_interval, once=False):
+    """
+    Drain the queue, and queued cancellation notices, until stopped; with
+    once=True, until both are empty.
+
+    Entry point of each worker process.
+    """
+    worker = worker_name()
+    while True:
+        if drain(worker, batch_size) + drain_notices(worker):
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+def wait_for_job(job, timeout):
+    """Re-read job until it finishes or timeout seconds pass (long-poll)."""
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(min(WAIT_POLL_INTERVAL, max(0, deadline - time.monotonic())))
+        job.refresh_from_db(fields=['status', 'booking', 'error', 'updated_at'])
+    return job
@@ -0,0 +1,166 @@
+"""
+Lottery allocation for oversubscribed events.
+
+While an event's lottery is open, customers only add LotteryEntry rows: one
+INSERT each, with no seat claim and no lock. The draw then allocates every
+seat in one transaction: the entries are shuffled with random.Random(seed) in
+entry id order, so a draw can be reproduced from its published seed; seats are
+claimed once with Event.claim_seats for the winners, and bookings, history
+points, entry results and (optionally) waitlist entries are written in bulk.
+"""
+import random
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from events.models import Event
+from user.models import Customer, HistoryPoint
+from .models import Booking, EventLottery, LotteryEntry, WaitlistEntry
+
+BATCH_SIZE = 1000
+
+
+class LotteryClosed(ValueError):
+    """Raised for an entry into a lottery that no longer accepts entries."""
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def open_lottery(event, closes_at, waitlist_losers=False):
+    """Start an event's entry window; direct bookings are refused until the draw."""
+    with transaction.atomic():
+        lottery = EventLottery.objects.create(event=event, closes_at=closes_at, waitlist_losers=waitlist_losers)
+        Event.objects.filter(pk=event.pk).update(lottery_pending=True)
+        event.lottery_pending = True
+    return lottery
+
+
+def enter_lottery(lottery, attendee):
+    """Add attendee's entry; raises LotteryClosed, or ValueError for a second entry."""
+    if not lottery.is_open:
+        raise LotteryClosed("This lottery is closed.")
+    try:
+        with transaction.atomic():
+            return LotteryEntry.objects.create(lottery=lottery, attendee=attendee)
+    except IntegrityError:
+        raise ValueError("You have already entered this lottery.")
+
+
+def shuffled_entries(lottery):
+    """(entry id, attendee id) pairs in draw order; the same for the same entries and seed."""
+    entries = list(lottery.entries.order_by('id').values_list('id', 'attendee_id'))
+    random.Random(lottery.seed).shuffle(entries)
+    return entries
+
+
+def draw_lottery(lottery_id, now=None):
+    """
+    Draw a closed lottery: book winners up to the event's free seats.
+
+    Returns a summary dict; a lottery that was already drawn is left as is.
+    Raises ValueError while the lottery is still open.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        lottery = EventLottery.objects.select_for_update().select_related('event').get(pk=lottery_id)
+        event = lottery.event
+        if lottery.drawn_at is not None:
+            return {'lottery': lottery.id, 'already_drawn': True, 'winners': lottery.winners}
+        if lottery.closes_at > now:
+            raise ValueError("This lottery is still open.")
+
+        entries = shuffled_entries(lottery)
+        existing = {}
+        for attendees in _chunks([attendee_id for _, attendee_id in entries]):
+            existing.update(
+                Booking.objects.filter(event=event, attendee_id__in=attendees).values_list('attendee_id', 'status')
+            )
+        # Entrants booked some other way keep that seat and count as winners
+        already_booked = [entry for entry in entries if existing.get(entry[1]) == Booking.STATUS_ACTIVE]
+        candidates = [entry for entry in entries if existing.get(entry[1]) != Booking.STATUS_ACTIVE]
+
+        granted = event.claim_seats(len(candidates)) if event.start_time > now else 0
+        winners, losers = candidates[:granted], candidates[granted:]
+
+        # The seats were claimed above, so rows are written without Booking.save's per-row claim
+        reactivate = [attendee_id for _, attendee_id in winners if attendee_id in existing]
+        for attendees in _chunks(reactivate):
+            Booking.objects.filter(event=event, attendee_id__in=attendees).update(
+                status=Booking.STATUS_ACTIVE, updated_at=now
+            )
+        Booking.objects.bulk_create([
+            Booking(attendee_id=attendee_id, event=event, booking_date=now)
+            for _, attendee_id in winners if attendee_id not in existing
+        ], batch_size=BATCH_SIZE)
+
+        customers = Customer.objects.select_related('user').in_bulk([attendee_id for _, attendee_id in winners])
+        bookings = {}
+        for attendees in _chunks([attendee_id for _, attendee_id in winners]):
+            bookings.update(
+                (booking.attendee_id, booking)
+                for booking in Booking.objects.filter(event=event, attendee_id__in=attendees)
+            )
+        HistoryPoint.bulk_log_actions(
+            (
+                customers[attendee_id].user,
+                HistoryPoint.ACTION_REACTIVATE if attendee_id in existing else HistoryPoint.ACTION_CREATE,
+                bookings[attendee_id],
+                {
+                    'event_id': event.id,
+                    'event_title': event.title,
+                    'booking_date': bookings[attendee_id].booking_date.isoformat(),
+                    'status': Booking.STATUS_ACTIVE,
+                    'lottery': lottery.id
+                }
+            )
+            for _, attendee_id in winners
+        )
+
+        lottery.entries.update(result=LotteryEntry.RESULT_LOST)
+        for entry_ids in _chunks([entry_id for entry_id, _ in winners + already_booked]):
+            LotteryEntry.objects.filter(id__in=entry_ids).update(result=LotteryEntry.RESULT_WON)
+
+        waitlisted = 0
+        if lottery.waitlist_losers and losers and event.start_time > now:
+            waiting = set()
+            for attendees in _chunks([attendee_id for _, attendee_id in losers]):
+                waiting.update(
+                    WaitlistEntry.objects.filter(
+                        event=event, attendee_id__in=attendees, status=WaitlistEntry.STATUS_WAITING
+                    ).values_list('attendee_id', flat=True)
+                )
+            # Same joined_at for all; ascending ids keep the draw order for FIFO promotion
+            WaitlistEntry.objects.bulk_create([
+                WaitlistEntry(attendee_id=attendee_id, event=event, joined_at=now)
+                for _, attendee_id in losers if attendee_id not in waiting
+            ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+            # bulk_create also returns rows skipped as conflicts (entrants who joined meanwhile),
+            # so count the rows stamped with this draw's joined_at
+            waitlisted = WaitlistEntry.objects.filter(
+                event=event, status=WaitlistEntry.STATUS_WAITING, joined_at=now
+            ).count()
+
+        lottery.drawn_at = now
+        lottery.winners = len(winners) + len(already_booked)
+        lottery.save(update_fields=['drawn_at', 'winners'])
+        Event.objects.filter(pk=event.pk).update(lottery_pending=False)
+
+    return {
+        'lottery': lottery.id,
+        'entries': len(entries),
+        'winners': lottery.winners,
+        'losers': len(losers),
+        'waitlisted': waitlisted,
+        'seed': lottery.seed,
+    }
+
+
+def draw_closed_lotteries(now=None):
+    """Draw every lottery whose window has closed; yields each draw's summary."""
+    now = now or timezone.now()
+    due = EventLottery.objects.filter(drawn_at__isnull=True, closes_at__lte=now).order_by('closes_at', 'id')
+    for lottery_id in due.values_list('id', flat=True):
+        yield draw_lottery(lottery_id, now)
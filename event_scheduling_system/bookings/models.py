@@ -1,6 +1,10 @@
-from django.db import models
+import random
+
+from django.db import models, transaction
 from django.utils import timezone
-from events.models import Event
+
+from event_scheduling_system.conditional import touch_catalog
+from events.models import Event, EventFullError
 from user.models import Customer
 
 
@@ -16,16 +20,94 @@ class Booking(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='bookings')
     booking_date = models.DateTimeField(default=timezone.now)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=['attendee']),
+            # A customer's bookings, newest first; also serves plain attendee lookups
+            models.Index(fields=['attendee', '-booking_date', 'id'], name='booking_attendee_date_idx'),
             models.Index(fields=['event']),
             models.Index(fields=['status']),
+            # Active bookings per event, for availability counts and duplicate checks
+            models.Index(
+                fields=['event', 'attendee'],
+                condition=models.Q(status='active'),
+                name='booking_active_event_idx',
+            ),
+            # A customer's active bookings, for time conflict checks
+            models.Index(
+                fields=['attendee', 'event'],
+                condition=models.Q(status='active'),
+                name='booking_active_attendee_idx',
+            ),
         ]
         unique_together = [('attendee', 'event')]
         ordering = ['-booking_date']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_persisted_state()
+        return instance
+
+    def _remember_persisted_state(self):
+        """Remember the seat this booking holds in the database, if any."""
+        self._persisted_event_id = self.__dict__.get('event_id')
+        self._persisted_status = self.__dict__.get('status')
+
+    def _held_event_id(self):
+        """Event whose booked seat counter currently includes this booking."""
+        if self._state.adding or getattr(self, '_persisted_status', None) != self.STATUS_ACTIVE:
+            return None
+        return self._persisted_event_id
+
+    def claims_seat(self):
+        """Whether saving this booking would take a new seat on its event."""
+        return self.status == self.STATUS_ACTIVE and self._held_event_id() != self.event_id
+
+    def _event_for(self, event_id):
+        """The loaded event when it matches event_id, otherwise a fresh one."""
+        return self.event if self.event_id == event_id else Event.objects.get(pk=event_id)
+
+    def save(self, *args, **kwargs):
+        """
+        Save the booking and keep the event's seat counters in step with status changes.
+
+        A newly held seat is claimed with a guarded UPDATE before the row is
+        written, so a full event raises EventFullError without overbooking.
+        """
+        held_event_id = self._held_event_id()
+        holds_event_id = self.event_id if self.status == self.STATUS_ACTIVE else None
+        with transaction.atomic(savepoint=False):
+            claimed = (
+                holds_event_id is None or holds_event_id == held_event_id
+                or self.event.claim_seat(key=self.attendee_id)
+            )
+            if claimed:
+                super().save(*args, **kwargs)
+                if held_event_id is not None and held_event_id != holds_event_id:
+                    self._event_for(held_event_id).release_seat(key=self.attendee_id)
+                    schedule_waitlist_promotion(held_event_id)
+        # Raised outside the atomic block so callers can still use their transaction
+        if not claimed:
+            raise EventFullError("This event is at full capacity.")
+        self._remember_persisted_state()
+
+    def delete(self, *args, **kwargs):
+        """
+        Hard delete the booking and release its seat if it was active.
+        """
+        held_event_id = self._held_event_id()
+        with transaction.atomic(savepoint=False):
+            result = super().delete(*args, **kwargs)
+            if held_event_id is not None:
+                self._event_for(held_event_id).release_seat(key=self.attendee_id)
+                schedule_waitlist_promotion(held_event_id)
+            else:
+                # No seat changed hands, but booking listings still lose a row
+                touch_catalog()
+        return result
+
     def __str__(self) -> str:
         attendee_name = self.attendee.user.username if self.attendee and self.attendee.user else 'unknown'
         return f"Booking(attendee={attendee_name}, event={self.event_id}, status={self.status})"
@@ -41,5 +123,255 @@ class Booking(models.Model):
             raise ValueError("Cannot cancel booking for events that have already started or ended.")
         
         self.status = self.STATUS_CANCELLED
-        self.save()
+        self.save(update_fields=['status', 'updated_at'])
         return self
+
+
+class WaitlistEntry(models.Model):
+    """
+    A customer waiting for a seat on a full event.
+
+    Entries are promoted to bookings in FIFO order whenever seats are freed.
+    """
+    STATUS_WAITING = 'waiting'
+    STATUS_PROMOTED = 'promoted'
+    STATUS_WITHDRAWN = 'withdrawn'
+    STATUS_CHOICES = [
+        (STATUS_WAITING, 'Waiting'),
+        (STATUS_PROMOTED, 'Promoted'),
+        (STATUS_WITHDRAWN, 'Withdrawn'),
+    ]
+
+    attendee = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='waitlist_entries')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist_entries')
+    joined_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_WAITING)
+    booking = models.ForeignKey(
+        Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Booking created or reactivated on promotion"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event', 'status', 'joined_at']),
+        ]
+        constraints = [
+            # Promoted and withdrawn entries stay as history, so a customer can join again later
+            models.UniqueConstraint(
+                fields=['attendee', 'event'], condition=models.Q(status='waiting'), name='unique_waiting_entry'
+            ),
+        ]
+        ordering = ['joined_at', 'id']
+
+    def __str__(self) -> str:
+        return f"WaitlistEntry(attendee={self.attendee_id}, event={self.event_id}, status={self.status})"
+
+
+class SeatHold(models.Model):
+    """
+    A seat held for a customer while they confirm, until expires_at.
+
+    A live hold takes a seat on its event's counters exactly like an active
+    booking, so availability already accounts for it. Confirming turns it into
+    a booking that keeps the seat; releasing or expiring gives the seat back
+    (see bookings/holds.py).
+    """
+    STATUS_HELD = 'held'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_RELEASED = 'released'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_HELD, 'Held'),
+        (STATUS_CONFIRMED, 'Confirmed'),
+        (STATUS_RELEASED, 'Released'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    attendee = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='seat_holds')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='seat_holds')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_HELD)
+    expires_at = models.DateTimeField()
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Live holds by expiry, for the sweeper's range sweep
+            models.Index(
+                fields=['expires_at', 'id'],
+                condition=models.Q(status='held'),
+                name='seat_hold_live_expiry_idx',
+            ),
+            models.Index(fields=['attendee', '-created_at'], name='seat_hold_attendee_idx'),
+        ]
+        constraints = [
+            # One live hold per customer and event
+            models.UniqueConstraint(
+                fields=['attendee', 'event'],
+                condition=models.Q(status='held'),
+                name='unique_live_seat_hold',
+            ),
+        ]
+        ordering = ['-created_at', '-id']
+
+    @property
+    def is_live(self):
+        return self.status == self.STATUS_HELD and self.expires_at > timezone.now()
+
+    def __str__(self) -> str:
+        return f"SeatHold(attendee={self.attendee_id}, event={self.event_id}, status={self.status})"
+
+
+class BookingJob(models.Model):
+    """
+    A booking request submitted asynchronously, waiting for a booking worker.
+
+    The job id is the ticket returned to the client, which polls it for the
+    outcome (see bookings/jobs.py).
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    attendee = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='booking_jobs')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.CharField(max_length=255, blank=True)
+    worker = models.CharField(max_length=64, blank=True, help_text="Worker holding the job while processing")
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest unfinished jobs
+            models.Index(
+                fields=['status', 'id'],
+                condition=models.Q(status__in=['queued', 'processing']),
+                name='booking_job_pending_idx',
+            ),
+            models.Index(fields=['worker']),
+        ]
+        ordering = ['id']
+
+    @property
+    def finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def __str__(self) -> str:
+        return f"BookingJob(attendee={self.attendee_id}, event={self.event_id}, status={self.status})"
+
+
+def new_lottery_seed():
+    return random.SystemRandom().getrandbits(62)
+
+
+class EventLottery(models.Model):
+    """
+    Opt-in entry window for an oversubscribed event.
+
+    Customers enter until closes_at; the draw then books winners up to the
+    event's free seats in a seeded, reproducible order (see bookings/lottery.py).
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='lottery')
+    closes_at = models.DateTimeField(help_text="Entries are accepted until this time")
+    waitlist_losers = models.BooleanField(default=False, help_text="Put entrants who lose the draw on the waitlist")
+    seed = models.BigIntegerField(default=new_lottery_seed, editable=False, help_text="Seed of the draw's shuffle")
+    drawn_at = models.DateTimeField(null=True, blank=True)
+    winners = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Closed lotteries still to draw
+            models.Index(fields=['closes_at'], condition=models.Q(drawn_at__isnull=True), name='lottery_undrawn_idx'),
+        ]
+        ordering = ['-created_at', '-id']
+
+    @property
+    def is_open(self):
+        return self.drawn_at is None and timezone.now() < self.closes_at
+
+    def __str__(self) -> str:
+        return f"EventLottery(event={self.event_id}, closes_at={self.closes_at})"
+
+
+class LotteryEntry(models.Model):
+    """A customer's entry into an event lottery."""
+    RESULT_PENDING = 'pending'
+    RESULT_WON = 'won'
+    RESULT_LOST = 'lost'
+    RESULT_CHOICES = [
+        (RESULT_PENDING, 'Pending'),
+        (RESULT_WON, 'Won'),
+        (RESULT_LOST, 'Lost'),
+    ]
+
+    lottery = models.ForeignKey(EventLottery, on_delete=models.CASCADE, related_name='entries')
+    attendee = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='lottery_entries')
+    result = models.CharField(max_length=16, choices=RESULT_CHOICES, default=RESULT_PENDING)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [('lottery', 'attendee')]
+        ordering = ['id']
+
+    def __str__(self) -> str:
+        return f"LotteryEntry(lottery={self.lottery_id}, attendee={self.attendee_id}, result={self.result})"
+
+
+class CancellationNotice(models.Model):
+    """
+    Attendee emails owed for an event cancellation, queued in the cancelling
+    transaction and sent by a booking worker (see bookings/cancellation.py).
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='cancellation_notices')
+    cancelled_at = models.DateTimeField(help_text="Stamp of the bookings the cancellation cancelled")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    sent = models.PositiveIntegerField(default=0, help_text="Emails handed to the mail backend")
+    error = models.CharField(max_length=255, blank=True)
+    worker = models.CharField(max_length=64, blank=True, help_text="Worker holding the notice while sending")
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                condition=models.Q(status__in=['queued', 'sending']),
+                name='cancel_notice_pending_idx',
+            ),
+        ]
+        ordering = ['id']
+
+    def __str__(self) -> str:
+        return f"CancellationNotice(event={self.event_id}, status={self.status})"
+
+
+def schedule_waitlist_promotion(event_id):
+    """
+    Promote waitlisted customers of an event once the current transaction commits.
+    """
+    from .waitlist import promote_waitlist
+    transaction.on_commit(lambda: promote_waitlist(event_id))
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from events.models import Event, EventFullError
+
+
+class RowLockReservation:
+    """
+    Lock the event row with select_for_update, re-check capacity, then save.
+    """
+    name = 'row_lock'
+
+    def reserve(self, booking):
+        if booking.claims_seat():
+            event = Event.objects.select_for_update().get(id=booking.event_id)
+            if event.is_full:
+                raise EventFullError("This event is at full capacity.")
+            # Book against the locked row so its seat counter stays current
+            booking.event = event
+        booking.save()
+        return booking
+
+
+class ConditionalUpdateReservation:
+    """
+    Claim the seat with Booking.save's guarded UPDATE and no row lock.
+
+    The UPDATE only matches while booked_count < capacity, so a booking costs
+    one UPDATE plus the INSERT and concurrent buyers never queue on a lock.
+    """
+    name = 'conditional_update'
+
+    def reserve(self, booking):
+        booking.save()
+        return booking
+
+
+RESERVATION_STRATEGIES = {
+    strategy.name: strategy for strategy in (RowLockReservation, ConditionalUpdateReservation)
+}
+
+
+def get_reservation_strategy(name=None):
+    """
+    Return the seat reservation strategy configured by BOOKING_RESERVATION_STRATEGY.
+    """
+    name = name or getattr(settings, 'BOOKING_RESERVATION_STRATEGY', ConditionalUpdateReservation.name)
+    try:
+        return RESERVATION_STRATEGIES[name]()
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown booking reservation strategy: {name}")
@@ -1,11 +1,21 @@
+from datetime import timedelta
+
 from rest_framework import serializers
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from .models import Booking
+from event_scheduling_system.fieldsets import SparseFieldsSerializerMixin
+from .admission import closed_reason
+from .conflicts import conflict_check_enabled, conflicting_bookings, sweep_conflicts
+from .holds import HELD_SEAT_MESSAGE, live_holds, place_hold
+from .lottery import open_lottery
+from .models import Booking, BookingJob, EventLottery, LotteryEntry, SeatHold, WaitlistEntry
+from .reservations import get_reservation_strategy
+from events.models import Event, EventFullError, EventSeries
 from user.models import Customer, HistoryPoint
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['id', 'attendee', 'event', 'booking_date', 'status']
@@ -13,7 +23,11 @@ class BookingSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         """
-        Comprehensive validation for booking creation and updates.
+        Validate a booking creation or update from the request alone.
+
+        Duplicates and capacity are not pre-checked here: the unique
+        (attendee, event) constraint and the seat claim decide them once, at
+        write time, in create() and update().
         """
         event = attrs.get('event', getattr(self.instance, 'event', None))
         user = self.context['request'].user
@@ -25,80 +39,440 @@ class BookingSerializer(serializers.ModelSerializer):
         
         if not event:
             raise serializers.ValidationError({'event': 'Event is required.'})
-        if event.is_past:
+        reason = closed_reason(event)
+        if reason:
+            raise serializers.ValidationError({'event': reason})
+        
+        activates = attrs.get('status', Booking.STATUS_ACTIVE) == Booking.STATUS_ACTIVE and (
+            not self.instance or self.instance.status != Booking.STATUS_ACTIVE or self.instance.event_id != event.id
+        )
+        # A held seat is turned into a booking by confirming the hold, not by taking a second seat
+        if activates and live_holds(user.customer_profile, [event]).exists():
+            raise serializers.ValidationError({'event': HELD_SEAT_MESSAGE})
+        
+        # Time conflicts with the customer's other bookings, when the booking would become active
+        if conflict_check_enabled() and activates:
+            titles = list(
+                conflicting_bookings(user.customer_profile, event)
+                .order_by('event__start_time').values_list('event__title', flat=True)
+            )
+            if titles:
+                raise serializers.ValidationError({
+                    'event': f"This event overlaps your booking for: {', '.join(titles)}."
+                })
+        
+        return attrs
+
+    def create(self, validated_data):
+        """
+        Create booking, claiming the seat through the configured reservation
+        strategy, and log it in the same transaction.
+        """
+        user = self.context['request'].user
+        
+        validated_data['attendee'] = user.customer_profile
+        booking = Booking(**validated_data)
+        
+        self._reserve(booking, HistoryPoint.ACTION_CREATE, {
+            'event_id': booking.event.id,
+            'event_title': booking.event.title,
+            'booking_date': booking.booking_date.isoformat(),
+            'status': booking.status
+        }, full_message='This event is at full capacity. No more bookings available.')
+        return booking
+
+    def update(self, instance, validated_data):
+        """
+        Update booking and log it in the same transaction; reactivating a
+        cancelled booking claims its seat again.
+        """
+        original_status = instance.status
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        
+        action = HistoryPoint.ACTION_REACTIVATE if (
+            original_status == Booking.STATUS_CANCELLED and instance.status == Booking.STATUS_ACTIVE
+        ) else HistoryPoint.ACTION_UPDATE
+        request = self.context['request']
+        self._reserve(instance, action, {
+            'previous_status': original_status,
+            'new_status': instance.status,
+            'event_id': instance.event.id,
+            'event_title': instance.event.title,
+            'updated_fields': list(request.data.keys()) if request.data else []
+        }, full_message='This event is at full capacity. Cannot reactivate booking.')
+        return instance
+
+    def _reserve(self, booking, action, details, full_message):
+        """
+        Save booking and its history point in one transaction.
+
+        A second booking of the same event fails on the unique constraint,
+        which rolls the seat claim back with everything else.
+        """
+        try:
+            with transaction.atomic():
+                get_reservation_strategy().reserve(booking)
+                HistoryPoint.log_action(
+                    user=self.context['request'].user, action=action, obj=booking, details=details
+                )
+        except IntegrityError:
+            if self._holds_other_seat(booking):
+                raise serializers.ValidationError({'event': ['You already have an active booking for this event.']})
+            raise serializers.ValidationError({
+                'event': ['You already have a cancelled booking for this event. Reactivate it instead.']
+            })
+        except EventFullError:
+            # A customer already holding a seat learns that rather than that the event is full
+            if self._holds_other_seat(booking):
+                raise serializers.ValidationError({'event': ['You already have an active booking for this event.']})
+            raise serializers.ValidationError({'event': [full_message]})
+
+    @staticmethod
+    def _holds_other_seat(booking):
+        """Whether the attendee has another active booking of the event (error paths only)."""
+        return Booking.objects.filter(
+            attendee_id=booking.attendee_id, event_id=booking.event_id, status=Booking.STATUS_ACTIVE
+        ).exclude(pk=booking.pk).exists()
+
+
+class BookingJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookingJob
+        fields = ['id', 'event', 'status', 'booking', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ['id', 'attendee', 'event', 'status', 'expires_at', 'booking', 'created_at']
+        read_only_fields = ['id', 'attendee', 'status', 'expires_at', 'booking', 'created_at']
+
+    def validate(self, attrs):
+        """
+        Only customers may hold seats, only on upcoming events they have not booked.
+        """
+        event = attrs['event']
+        user = self.context['request'].user
+        if not hasattr(user, 'customer_profile'):
             raise serializers.ValidationError({
-                'event': 'Cannot book for events that have already ended.'
+                'attendee': 'Only customers can hold seats.'
             })
-        if event.is_ongoing:
+        if event.is_cancelled:
+            raise serializers.ValidationError({'event': 'This event has been cancelled by its organiser.'})
+        if event.is_past or event.is_ongoing:
             raise serializers.ValidationError({
-                'event': 'Cannot book for events that are currently ongoing.'
+                'event': 'Cannot hold seats for events that have started or ended.'
             })
-        # Check if user already has an active booking for this event
-        existing_booking = Booking.objects.filter(
-            attendee__user=user,
-            event=event,
-            status='active'
-        )
-        
-        # For updates, exclude the current booking from the check
-        if self.instance:
-            existing_booking = existing_booking.exclude(id=self.instance.id)
-        
-        if existing_booking.exists():
+        if event.lottery_pending:
+            raise serializers.ValidationError({
+                'event': 'Seats for this event are allocated by lottery. Enter the draw instead.'
+            })
+        if Booking.objects.filter(attendee=user.customer_profile, event=event, status='active').exists():
             raise serializers.ValidationError({
                 'event': 'You already have an active booking for this event.'
             })
-        
-        # Capacity validation for create operations and reactivation
-        if event.is_full and (not self.instance or 
-                             (self.instance and self.instance.status == 'cancelled' and 
-                              attrs.get('status') == 'active')):
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return place_hold(self.context['request'].user.customer_profile, validated_data['event'])
+        except EventFullError:
             raise serializers.ValidationError({
-                'event': 'This event is at full capacity. No more bookings available.'
+                'event': ['This event is at full capacity. No more bookings available.']
             })
-        
+        except ValueError as e:
+            raise serializers.ValidationError({'event': [str(e)]})
+
+
+class EventLotterySerializer(serializers.ModelSerializer):
+    seed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EventLottery
+        fields = ['id', 'event', 'closes_at', 'waitlist_losers', 'drawn_at', 'winners', 'seed', 'created_at']
+        read_only_fields = ['id', 'drawn_at', 'winners', 'seed', 'created_at']
+
+    def get_seed(self, lottery):
+        # Published once drawn, so anyone can replay the shuffle; hidden before so nobody can game it
+        return lottery.seed if lottery.drawn_at else None
+
+    def validate(self, attrs):
+        """
+        Only the event's organiser may open its lottery, before the event starts.
+        """
+        event = attrs['event']
+        user = self.context['request'].user
+        if not hasattr(user, 'organizer_profile') or event.creator_id != user.organizer_profile.id:
+            raise serializers.ValidationError({
+                'event': 'Only the event\'s organiser can open its lottery.'
+            })
+        if event.is_cancelled:
+            raise serializers.ValidationError({'event': 'This event has been cancelled by its organiser.'})
+        if attrs['closes_at'] <= timezone.now():
+            raise serializers.ValidationError({'closes_at': 'The entry window must close in the future.'})
+        if attrs['closes_at'] >= event.start_time:
+            raise serializers.ValidationError({'closes_at': 'The entry window must close before the event starts.'})
         return attrs
 
-    @transaction.atomic
     def create(self, validated_data):
+        return open_lottery(**validated_data)
+
+
+class LotteryEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LotteryEntry
+        fields = ['id', 'lottery', 'attendee', 'result', 'created_at']
+        read_only_fields = fields
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'attendee', 'event', 'joined_at', 'status', 'booking']
+        read_only_fields = ['id', 'attendee', 'joined_at', 'status', 'booking']
+
+    def validate(self, attrs):
         """
-        Create booking with atomic transaction to prevent race conditions.
+        Only customers may join, and only the waitlist of a full upcoming event.
         """
+        event = attrs['event']
         user = self.context['request'].user
-        
-        validated_data['attendee'] = user.customer_profile
-        event = validated_data['event']
-        
-        # Lock the event row to prevent concurrent modifications
-        event = event.__class__.objects.select_for_update().get(id=event.id)
-        
-        # Re-check capacity after locking
-        if event.is_full:
+        if not hasattr(user, 'customer_profile'):
             raise serializers.ValidationError({
-                'event': 'This event is at full capacity. No more bookings available.'
+                'attendee': 'Only customers can join a waitlist.'
             })
-        
-        booking = super().create(validated_data)
-        return booking
+        if event.is_cancelled:
+            raise serializers.ValidationError({'event': 'This event has been cancelled by its organiser.'})
+        if event.is_past or event.is_ongoing:
+            raise serializers.ValidationError({
+                'event': 'Cannot join the waitlist of an event that has started or ended.'
+            })
+        if not event.is_full:
+            raise serializers.ValidationError({
+                'event': 'This event still has available slots. Book it directly.'
+            })
+        if Booking.objects.filter(attendee__user=user, event=event, status='active').exists():
+            raise serializers.ValidationError({
+                'event': 'You already have an active booking for this event.'
+            })
+        if WaitlistEntry.objects.filter(attendee__user=user, event=event, status=WaitlistEntry.STATUS_WAITING).exists():
+            raise serializers.ValidationError({
+                'event': 'You are already on the waitlist for this event.'
+            })
+        return attrs
+
+    def create(self, validated_data):
+        """
+        Join at the back of the queue; earlier promoted or withdrawn entries are kept.
+        """
+        validated_data['attendee'] = self.context['request'].user.customer_profile
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # A concurrent join won the unique waiting-entry constraint
+            raise serializers.ValidationError({'event': ['You are already on the waitlist for this event.']})
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    """
+    Book many events for the requesting customer in one transaction.
+    """
+    MAX_EVENTS = 100
+
+    events = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_EVENTS
+    )
+
+    def validate(self, attrs):
+        if not hasattr(self.context['request'].user, 'customer_profile'):
+            raise serializers.ValidationError({
+                'attendee': 'Only customers can create or update bookings.'
+            })
+        return attrs
 
     @transaction.atomic
-    def update(self, instance, validated_data):
+    def create(self, validated_data):
+        """
+        Validate every event with set-based queries, claim seats in event ID
+        order so concurrent bulk requests cannot deadlock, then bulk-write the
+        bookings and their history points.
+
+        Returns one result dict per requested event, in request order.
         """
-        Update booking with atomic transaction to prevent race conditions.
-        """
-        # If we're reactivating a cancelled booking, we need to check capacity
-        if (instance.status == 'cancelled' and 
-            validated_data.get('status') == 'active'):
-            
-            event = validated_data.get('event', instance.event)
-            
-            # Lock the event row to prevent concurrent modifications
-            event = event.__class__.objects.select_for_update().get(id=event.id)
-            
-            # Re-check capacity after locking
-            if event.is_full:
+        user = self.context['request'].user
+        customer = user.customer_profile
+        event_ids = validated_data['events']
+        events = Event.objects.in_bulk(set(event_ids))
+        bookings = {
+            booking.event_id: booking
+            for booking in Booking.objects.filter(attendee=customer, event_id__in=events)
+        }
+
+        errors = {}
+        seen = set()
+        for event_id in event_ids:
+            if event_id in seen:
+                continue
+            seen.add(event_id)
+            event = events.get(event_id)
+            if event is None:
+                errors[event_id] = 'Event not found.'
+            elif event.is_cancelled:
+                errors[event_id] = 'This event has been cancelled by its organiser.'
+            elif event.is_past:
+                errors[event_id] = 'Cannot book for events that have already ended.'
+            elif event.is_ongoing:
+                errors[event_id] = 'Cannot book for events that are currently ongoing.'
+            elif event.lottery_pending:
+                errors[event_id] = 'Seats for this event are allocated by lottery. Enter the draw instead.'
+            elif event_id in bookings and bookings[event_id].status == Booking.STATUS_ACTIVE:
+                errors[event_id] = 'You already have an active booking for this event.'
+        for event_id in live_holds(customer, seen - set(errors)).values_list('event_id', flat=True):
+            errors[event_id] = HELD_SEAT_MESSAGE
+
+        if conflict_check_enabled():
+            self._reject_conflicts(customer, events, event_ids, errors)
+
+        claimed = []
+        for event_id in sorted(seen - set(errors)):
+            if events[event_id].claim_seat(key=customer.id):
+                claimed.append(event_id)
+            else:
+                errors[event_id] = 'This event is at full capacity. No more bookings available.'
+
+        # Seats are already claimed, so write rows without Booking.save's per-row claim
+        reactivated = [bookings[event_id] for event_id in claimed if event_id in bookings]
+        Booking.objects.filter(id__in=[booking.id for booking in reactivated]).update(
+            status=Booking.STATUS_ACTIVE, updated_at=timezone.now()
+        )
+        for booking in reactivated:
+            booking.status = Booking.STATUS_ACTIVE
+        created = Booking.objects.bulk_create([
+            Booking(attendee=customer, event=events[event_id])
+            for event_id in claimed if event_id not in bookings
+        ])
+        for booking in created + reactivated:
+            booking._remember_persisted_state()
+        booked = {booking.event_id: booking for booking in created + reactivated}
+
+        HistoryPoint.bulk_log_actions(
+            (
+                user,
+                HistoryPoint.ACTION_REACTIVATE if booking.event_id in bookings else HistoryPoint.ACTION_CREATE,
+                booking,
+                {
+                    'event_id': booking.event_id,
+                    'event_title': events[booking.event_id].title,
+                    'booking_date': booking.booking_date.isoformat(),
+                    'status': booking.status,
+                    'bulk': True
+                }
+            )
+            for booking in booked.values()
+        )
+
+        results = []
+        reported = set()
+        for event_id in event_ids:
+            if event_id in reported:
+                results.append({'event': event_id, 'error': 'Event is listed more than once.'})
+            elif event_id in booked:
+                results.append({'event': event_id, 'booking': BookingSerializer(booked[event_id]).data})
+            else:
+                results.append({'event': event_id, 'error': errors[event_id]})
+            reported.add(event_id)
+        return results
+
+    def _reject_conflicts(self, customer, events, event_ids, errors):
+        """
+        Reject requested events overlapping the customer's active bookings
+        (read in one query) or an event listed earlier in the same request.
+        """
+        booked = Booking.objects.filter(attendee=customer, status=Booking.STATUS_ACTIVE).values_list(
+            'event__start_time', 'event__end_time', 'event__title'
+        )
+        requested = [events[event_id] for event_id in dict.fromkeys(event_ids) if event_id not in errors]
+        intervals = [(start, end, title) for start, end, title in booked]
+        intervals += [(event.start_time, event.end_time, event) for event in requested]
+        intervals.sort(key=lambda interval: interval[0])
+        for first, second in sweep_conflicts(intervals):
+            # Pairs of one requested event and one existing booking (a title)
+            if isinstance(first, str) != isinstance(second, str):
+                event, title = (second, first) if isinstance(first, str) else (first, second)
+                errors.setdefault(event.id, f'This event overlaps your booking for: {title}.')
+
+        accepted = []
+        for event in requested:
+            if event.id in errors:
+                continue
+            earlier = next(
+                (other for other in accepted
+                 if other.start_time < event.end_time and event.start_time < other.end_time),
+                None
+            )
+            if earlier is None:
+                accepted.append(event)
+            else:
+                errors[event.id] = f'This event overlaps {earlier.title}, requested in the same bulk booking.'
+
+
+class SeriesBookingSerializer(serializers.Serializer):
+    """
+    Book one occurrence of a recurring series (start_time), or every upcoming
+    occurrence up to until, materializing the booked occurrences as events.
+
+    until defaults to EVENT_SERIES_BOOKING_HORIZON_DAYS from now; at most
+    BulkBookingSerializer.MAX_EVENTS occurrences are booked per call.
+    """
+    series = serializers.PrimaryKeyRelatedField(queryset=EventSeries.objects.select_related('template'))
+    start_time = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not hasattr(self.context['request'].user, 'customer_profile'):
+            raise serializers.ValidationError({
+                'attendee': 'Only customers can create or update bookings.'
+            })
+        if 'start_time' in attrs and 'until' in attrs:
+            raise serializers.ValidationError({
+                'until': 'Use either start_time or until, not both.'
+            })
+        start_time = attrs.get('start_time')
+        if start_time is not None:
+            if start_time <= timezone.now():
                 raise serializers.ValidationError({
-                    'event': 'This event is at full capacity. Cannot reactivate booking.'
+                    'start_time': 'Cannot book occurrences that have already started.'
                 })
-        
-        return super().update(instance, validated_data)
\ No newline at end of file
+            if not attrs['series'].is_occurrence(start_time):
+                raise serializers.ValidationError({
+                    'start_time': 'The series has no occurrence starting at this time.'
+                })
+        return attrs
+
+    def occurrence_starts(self, validated_data):
+        if 'start_time' in validated_data:
+            return [validated_data['start_time']]
+        now = timezone.now()
+        until = validated_data.get('until') or now + timedelta(
+            days=getattr(settings, 'EVENT_SERIES_BOOKING_HORIZON_DAYS', 90)
+        )
+        starts = []
+        for start in validated_data['series'].occurrence_starts(after=now):
+            if start > until or len(starts) == BulkBookingSerializer.MAX_EVENTS:
+                break
+            starts.append(start)
+        return starts
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """
+        Materialize the occurrences, then book them like a bulk booking.
+        """
+        events = validated_data['series'].materialize(self.occurrence_starts(validated_data))
+        if not events:
+            return []
+        return BulkBookingSerializer(context=self.context).create({'events': [event.id for event in events]})
+
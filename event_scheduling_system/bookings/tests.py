@@ -7,12 +7,14 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from django.urls import reverse
+from django.contrib.contenttypes.models import ContentType
 import threading
 import time
 
 from .models import Booking
 from events.models import Event
 from user.models import Organizer, Customer, HistoryPoint
+from event_scheduling_system.testing import share_caches
 
 
 class BookingAPITest(APITestCase):
@@ -706,6 +708,10 @@ class BookingAPITest(APITestCase):
 
     def test_booking_list_pagination(self):
         """Test that booking list supports pagination."""
+        # Make room for the bookings; the database rejects overbooking
+        self.event.capacity = 15
+        self.event.save()
+
         # Create multiple bookings
         for i in range(15):  # More than default page size
             customer = Customer.objects.create(
@@ -734,6 +740,44 @@ class BookingAPITest(APITestCase):
         self.assertLessEqual(len(response.data['results']), 10)  # Default page size
         self.assertGreater(response.data['count'], 10)
 
+    def test_booking_list_cursor_pagination(self):
+        """Test that booking list walks -booking_date, id cursors without a count."""
+        self.event.capacity = 15
+        self.event.save()
+        for i in range(15):
+            customer = Customer.objects.create(
+                user=User.objects.create_user(username=f'cursor_customer_{i}')
+            )
+            Booking.objects.create(attendee=customer, event=self.event, status='active')
+        
+        self.client.force_authenticate(user=self.organizer_user)
+        url = reverse('booking-list') + '?pagination=cursor'
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(booking['id'] for booking in response.data['results'])
+            url = response.data['next']
+        
+        expected = list(
+            Booking.objects.filter(event__creator=self.organizer)
+            .order_by('-booking_date', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_booking_list_sparse_fields(self):
+        """Test that ?fields= and ?omit= trim booking rows."""
+        Booking.objects.create(attendee=self.customer, event=self.event)
+        self.client.force_authenticate(user=self.customer_user)
+        
+        response = self.client.get(reverse('booking-list') + '?fields=id,status')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+        
+        response = self.client.get(reverse('booking-list') + '?omit=attendee,booking_date')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'event', 'status'})
+
     def test_booking_filtering_by_status(self):
         """Test filtering bookings by status."""
         # Create bookings with different statuses
@@ -1159,3 +1203,1839 @@ class BookingModelTest(TestCase):
         # Verify ordering (newest first)
         self.assertEqual(bookings[0], booking2)
         self.assertEqual(bookings[1], booking1)
+
+
+class BookingReservationStrategyTest(APITestCase):
+    """Test cases for the selectable seat reservation strategies."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(3)
+        ]
+        self.event = Event.objects.create(
+            title='Strategy Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=2,
+            creator=self.organizer
+        )
+    
+    def _book(self, customer):
+        self.client.force_authenticate(user=customer.user)
+        return self.client.post(reverse('booking-list'), {'event': self.event.id})
+    
+    def _assert_capacity_enforced(self):
+        self.assertEqual(self._book(self.customers[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._book(self.customers[1]).status_code, status.HTTP_201_CREATED)
+        response = self._book(self.customers[2])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('full capacity', response.data['event'][0])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+    
+    def test_conditional_update_enforces_capacity(self):
+        """Test that the conditional UPDATE strategy never overbooks."""
+        with self.settings(BOOKING_RESERVATION_STRATEGY='conditional_update'):
+            self._assert_capacity_enforced()
+    
+    def test_row_lock_enforces_capacity(self):
+        """Test that the row lock strategy is still available and never overbooks."""
+        with self.settings(BOOKING_RESERVATION_STRATEGY='row_lock'):
+            self._assert_capacity_enforced()
+    
+    def test_conditional_update_claims_seat_in_two_statements(self):
+        """Test that a conditional booking is one guarded UPDATE plus the INSERT."""
+        from .reservations import ConditionalUpdateReservation
+        booking = Booking(attendee=self.customers[0], event=self.event)
+        with self.assertNumQueries(2):
+            ConditionalUpdateReservation().reserve(booking)
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_conditional_update_full_event_keeps_transaction_usable(self):
+        """Test that a rejected claim leaves no booking and no broken transaction."""
+        from django.db import transaction
+        from events.models import EventFullError
+        from .reservations import ConditionalUpdateReservation
+        Event.objects.filter(id=self.event.id).update(booked_count=2)
+        booking = Booking(attendee=self.customers[0], event=self.event)
+        with transaction.atomic():
+            with self.assertRaises(EventFullError):
+                ConditionalUpdateReservation().reserve(booking)
+            self.assertFalse(Booking.objects.filter(event=self.event).exists())
+    
+    def test_reactivation_respects_capacity(self):
+        """Test that reactivating a cancelled booking claims a seat through the strategy."""
+        booking = Booking.objects.create(attendee=self.customers[0], event=self.event, status='cancelled')
+        Booking.objects.create(attendee=self.customers[1], event=self.event)
+        Booking.objects.create(attendee=self.customers[2], event=self.event)
+        
+        self.client.force_authenticate(user=self.customers[0].user)
+        url = reverse('booking-detail', kwargs={'pk': booking.id})
+        response = self.client.patch(url, {'status': 'active'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        Booking.objects.get(attendee=self.customers[2]).cancel()
+        response = self.client.patch(url, {'status': 'active'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+
+
+class BookingAdmissionQueueTest(APITestCase):
+    """Test cases for the group-commit admission queue."""
+    
+    def setUp(self):
+        self.organizer = Organizer.objects.create(
+            user=User.objects.create_user(username='organizer1'),
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(4)
+        ]
+        self.event = Event.objects.create(
+            title='Hot Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=2,
+            creator=self.organizer
+        )
+    
+    def test_queue_groups_concurrent_requests(self):
+        """Test that concurrent submissions are applied in a few batches, each answered individually."""
+        from .admission import AdmissionQueue
+        batches = []
+        
+        def fake_apply(event_id, tickets):
+            batches.append(len(tickets))
+            for ticket in tickets:
+                ticket.resolve(booking=ticket.attendee)
+        
+        queue = AdmissionQueue(self.event.id, window=0.05, max_batch=100, apply=fake_apply)
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(queue.submit(attendee=i, user=None)))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(results), list(range(20)))
+        self.assertEqual(sum(batches), 20)
+        self.assertLess(len(batches), 20)
+    
+    def test_apply_batch_admits_up_to_capacity(self):
+        """Test that a batch claims capacity once and bulk-creates bookings and history."""
+        from .admission import AdmissionRejected, AdmissionTicket, apply_batch
+        tickets = [AdmissionTicket(customer, customer.user) for customer in self.customers[:3]]
+        tickets.append(AdmissionTicket(self.customers[0], self.customers[0].user))
+        
+        apply_batch(self.event.id, tickets)
+        
+        self.assertIsNotNone(tickets[0].result())
+        self.assertIsNotNone(tickets[1].result())
+        with self.assertRaisesMessage(AdmissionRejected, 'full capacity'):
+            tickets[2].result()
+        with self.assertRaisesMessage(AdmissionRejected, 'already have an active booking'):
+            tickets[3].result()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+        self.assertEqual(Booking.objects.filter(event=self.event, status='active').count(), 2)
+        self.assertEqual(HistoryPoint.objects.filter(action='create', content_type__model='booking').count(), 2)
+    
+    def test_create_through_admission_queue(self):
+        """Test that the booking endpoint answers individually when the queue is enabled."""
+        self.client.force_authenticate(user=self.customers[0].user)
+        with self.settings(BOOKING_ADMISSION_WINDOW_MS=1):
+            response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['event'], self.event.id)
+        history = HistoryPoint.objects.get(user=self.customers[0].user, action='create')
+        self.assertEqual(history.details['event_title'], 'Hot Event')
+
+
+class WaitlistTest(APITestCase):
+    """Test cases for the waitlist and its automatic promotion."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(4)
+        ]
+        self.event = Event.objects.create(
+            title='Popular Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=1,
+            creator=self.organizer
+        )
+        self.booking = Booking.objects.create(attendee=self.customers[0], event=self.event)
+    
+    def _join(self, customer):
+        self.client.force_authenticate(user=customer.user)
+        return self.client.post(reverse('waitlist-list'), {'event': self.event.id})
+    
+    def test_join_waitlist_of_full_event(self):
+        """Test that a customer can join the waitlist of a full event."""
+        response = self._join(self.customers[1])
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'waiting')
+        self.assertEqual(response.data['attendee'], self.customers[1].id)
+        self.assertTrue(HistoryPoint.objects.filter(
+            user=self.customers[1].user, action='create', content_type__model='waitlistentry'
+        ).exists())
+        
+        response = self._join(self.customers[1])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_join_waitlist_rejected_when_slots_available(self):
+        """Test that customers book directly when the event has room."""
+        self.booking.cancel()
+        response = self._join(self.customers[1])
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('available slots', response.data['event'][0])
+    
+    def test_join_waitlist_forbidden_organizer(self):
+        """Test that organizers cannot join a waitlist."""
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(reverse('waitlist-list'), {'event': self.event.id})
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_leave_withdraws_entry(self):
+        """Test that leaving keeps the entry as withdrawn history, and promoted entries cannot leave."""
+        from .models import WaitlistEntry
+        entry_id = self._join(self.customers[1]).data['id']
+        url = reverse('waitlist-detail', kwargs={'pk': entry_id})
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(WaitlistEntry.objects.get(id=entry_id).status, 'withdrawn')
+        self.assertTrue(HistoryPoint.objects.filter(
+            user=self.customers[1].user, action='cancel', content_type__model='waitlistentry', object_id=entry_id
+        ).exists())
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        entry_id = self._join(self.customers[2]).data['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel()
+        response = self.client.delete(reverse('waitlist-detail', kwargs={'pk': entry_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        entry = WaitlistEntry.objects.get(id=entry_id)
+        self.assertEqual(entry.status, 'promoted')
+        self.assertEqual(entry.booking.attendee, self.customers[2])
+    
+    def test_cancellation_promotes_first_waiting_customer(self):
+        """Test that a cancellation promotes the oldest waitlist entry after commit."""
+        from .models import WaitlistEntry
+        self._join(self.customers[1])
+        self._join(self.customers[2])
+        
+        self.client.force_authenticate(user=self.customers[0].user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('booking-cancel', kwargs={'pk': self.booking.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        first, second = WaitlistEntry.objects.order_by('joined_at', 'id')
+        self.assertEqual(first.status, 'promoted')
+        self.assertEqual(first.booking.attendee, self.customers[1])
+        self.assertEqual(first.booking.status, 'active')
+        self.assertEqual(second.status, 'waiting')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_rejoin_after_promotion_and_cancellation(self):
+        """Test that a promoted customer who cancelled can join the waitlist again, at the back."""
+        from .models import WaitlistEntry
+        self._join(self.customers[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel()
+        promoted = WaitlistEntry.objects.get(attendee=self.customers[1])
+        self.assertEqual(promoted.status, 'promoted')
+        self._join(self.customers[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            promoted.booking.cancel()
+        self.assertTrue(Booking.objects.filter(attendee=self.customers[2], status='active').exists())
+        self._join(self.customers[3])
+        
+        response = self._join(self.customers[1])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'waiting')
+        self.assertEqual(self._join(self.customers[1]).status_code, status.HTTP_400_BAD_REQUEST)
+        waiting = WaitlistEntry.objects.filter(event=self.event, status='waiting').order_by('joined_at', 'id')
+        self.assertEqual([entry.attendee for entry in waiting], [self.customers[3], self.customers[1]])
+        self.assertEqual(WaitlistEntry.objects.filter(attendee=self.customers[1]).count(), 2)
+        self.assertTrue(HistoryPoint.objects.filter(
+            user=self.customers[1].user, action='create', content_type__model='booking'
+        ).exists())
+    
+    def test_no_promotion_while_lottery_pending(self):
+        """Test that freed seats are not handed to the waitlist while a lottery allocates them."""
+        from .lottery import open_lottery
+        from .models import WaitlistEntry
+        self._join(self.customers[1])
+        open_lottery(self.event, timezone.now() + timedelta(hours=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel()
+        self.assertEqual(WaitlistEntry.objects.get(attendee=self.customers[1]).status, 'waiting')
+        self.assertFalse(Booking.objects.filter(event=self.event, status='active').exists())
+    
+    def test_conflicting_customers_keep_waiting(self):
+        """Test that with the conflict check on, a clashing customer is skipped for the next one."""
+        from django.test import override_settings
+        from .models import WaitlistEntry
+        self._join(self.customers[1])
+        self._join(self.customers[2])
+        clash = Event.objects.create(
+            title='Clashing Event',
+            start_time=self.event.start_time + timedelta(hours=1),
+            end_time=self.event.end_time + timedelta(hours=1),
+            capacity=5,
+            creator=self.organizer
+        )
+        Booking.objects.create(attendee=self.customers[1], event=clash)
+        with override_settings(BOOKING_CONFLICT_CHECK=True), self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel()
+        self.assertEqual(WaitlistEntry.objects.get(attendee=self.customers[1]).status, 'waiting')
+        self.assertEqual(WaitlistEntry.objects.get(attendee=self.customers[2]).status, 'promoted')
+    
+    def test_promotion_continues_past_batch_size(self):
+        """Test that freed seats beyond one batch are filled in further batches, in FIFO order."""
+        from .models import WaitlistEntry
+        from .waitlist import promote_waitlist
+        extra = [
+            Customer.objects.create(user=User.objects.create_user(username=f'extra{i}'))
+            for i in range(4)
+        ]
+        waiting = self.customers[1:] + extra
+        for customer in waiting:
+            self._join(customer)
+        Event.objects.filter(pk=self.event.pk).update(capacity=6)
+        
+        self.assertEqual(promote_waitlist(self.event.id, batch_size=2), 5)
+        promoted = WaitlistEntry.objects.filter(status='promoted').order_by('joined_at', 'id')
+        self.assertEqual([entry.attendee for entry in promoted], waiting[:5])
+        still_waiting = WaitlistEntry.objects.filter(status='waiting').order_by('joined_at', 'id')
+        self.assertEqual([entry.attendee for entry in still_waiting], waiting[5:])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 6)
+    
+    def test_hard_delete_and_capacity_increase_promote(self):
+        """Test that hard deletes and capacity increases promote waiting customers."""
+        from .models import WaitlistEntry
+        for customer in self.customers[1:4]:
+            self._join(customer)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.delete()
+        self.assertEqual(WaitlistEntry.objects.filter(status='promoted').count(), 1)
+        
+        event = Event.objects.get(id=self.event.id)
+        event.capacity = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertEqual(WaitlistEntry.objects.filter(status='promoted').count(), 3)
+        event.refresh_from_db()
+        self.assertEqual(event.booked_count, 3)
+    
+    def test_promotion_reactivates_cancelled_booking(self):
+        """Test that a customer with a cancelled booking gets it reactivated."""
+        from .models import WaitlistEntry
+        other = Booking.objects.create(attendee=self.customers[1], event=self.event, status='cancelled')
+        self._join(self.customers[1])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel()
+        
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'active')
+        self.assertEqual(WaitlistEntry.objects.get(attendee=self.customers[1]).booking, other)
+        self.assertTrue(HistoryPoint.objects.filter(
+            user=self.customers[1].user, action='reactivate'
+        ).exists())
+
+
+class BulkBookingTest(APITestCase):
+    """Test cases for the bulk booking endpoint."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer = Customer.objects.create(user=User.objects.create_user(username='customer1'))
+        self.other = Customer.objects.create(user=User.objects.create_user(username='customer2'))
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=1, hours=2),
+                capacity=1,
+                creator=self.organizer
+            )
+            for i in range(4)
+        ]
+        self.url = reverse('booking-bulk')
+    
+    def test_bulk_booking_returns_result_per_item(self):
+        """Test that each requested event gets its own result."""
+        past_event = Event.objects.create(
+            title='Past Event',
+            start_time=timezone.now() - timedelta(days=2),
+            end_time=timezone.now() - timedelta(days=1),
+            capacity=5,
+            creator=self.organizer
+        )
+        Booking.objects.create(attendee=self.other, event=self.events[1])
+        Booking.objects.create(attendee=self.customer, event=self.events[2], status='cancelled')
+        self.client.force_authenticate(user=self.customer.user)
+        
+        ids = [self.events[0].id, self.events[1].id, self.events[2].id, past_event.id, 99999, self.events[0].id]
+        response = self.client.post(self.url, {'events': ids}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['event'] for r in results], ids)
+        self.assertEqual(results[0]['booking']['status'], 'active')
+        self.assertIn('full capacity', results[1]['error'])
+        self.assertEqual(results[2]['booking']['status'], 'active')
+        self.assertIn('already ended', results[3]['error'])
+        self.assertIn('not found', results[4]['error'])
+        self.assertIn('more than once', results[5]['error'])
+        
+        self.assertEqual(Booking.objects.filter(attendee=self.customer, status='active').count(), 2)
+        for event in self.events[:3]:
+            event.refresh_from_db()
+            self.assertEqual(event.booked_count, 1)
+        self.assertEqual(HistoryPoint.objects.filter(user=self.customer.user, action='create').count(), 1)
+        self.assertEqual(HistoryPoint.objects.filter(user=self.customer.user, action='reactivate').count(), 1)
+    
+    def test_bulk_booking_query_count_is_constant(self):
+        """Test that bulk booking needs a fixed number of queries plus one claim per event."""
+        self.client.force_authenticate(user=self.customer.user)
+        ids = [event.id for event in self.events]
+        ContentType.objects.get_for_model(Booking)  # warm the content type cache
+        # Savepoint, three lookups, two bulk inserts and release, plus one guarded seat claim per event
+        with self.assertNumQueries(7 + len(ids)):
+            response = self.client.post(self.url, {'events': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all('booking' in result for result in response.data['results']))
+    
+    def test_bulk_booking_forbidden_organizer(self):
+        """Test that organizers cannot bulk book."""
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(self.url, {'events': [self.events[0].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_bulk_booking_rejects_empty_list(self):
+        """Test that an empty event list is a validation error."""
+        self.client.force_authenticate(user=self.customer.user)
+        response = self.client.post(self.url, {'events': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingQueryPlanTest(APITestCase):
+    """Fails when a booking endpoint's SQL falls back to a full table scan."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(3)
+        ]
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                start_time=timezone.now() + timedelta(days=i + 1),
+                end_time=timezone.now() + timedelta(days=i + 1, hours=2),
+                capacity=2,
+                creator=self.organizer
+            )
+            for i in range(3)
+        ]
+        for customer in self.customers[:2]:
+            for event in self.events[:2]:
+                Booking.objects.create(attendee=customer, event=event)
+        self.booking = Booking.objects.filter(attendee=self.customers[0]).first()
+    
+    def _assert_indexed(self, user, method, url, data=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from event_scheduling_system.query_plans import full_table_scans
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400, response.data)
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(full_table_scans(sql), [], sql)
+        return response
+    
+    def test_customer_list_plans(self):
+        """Test that a customer's bookings are read from the attendee index."""
+        customer = self.customers[0].user
+        self._assert_indexed(customer, 'get', reverse('booking-list'))
+        self._assert_indexed(customer, 'get', reverse('booking-list') + '?pagination=cursor')
+    
+    def test_organizer_list_plans(self):
+        """Test that an organizer's bookings are reached through their events."""
+        self._assert_indexed(self.organizer_user, 'get', reverse('booking-list'))
+        self._assert_indexed(self.organizer_user, 'get', reverse('booking-list') + '?pagination=cursor')
+    
+    def test_detail_and_cancel_plans(self):
+        """Test that booking detail and cancel use key lookups."""
+        customer = self.customers[0].user
+        self._assert_indexed(customer, 'get', reverse('booking-detail', kwargs={'pk': self.booking.id}))
+        self._assert_indexed(customer, 'post', reverse('booking-cancel', kwargs={'pk': self.booking.id}))
+    
+    def test_create_plans(self):
+        """Test that the duplicate and capacity checks of a new booking are indexed."""
+        self._assert_indexed(
+            self.customers[2].user, 'post', reverse('booking-list'), {'event': self.events[2].id}
+        )
+    
+    def test_waitlist_plans(self):
+        """Test that joining and listing a waitlist are indexed."""
+        customer = self.customers[2].user
+        self._assert_indexed(customer, 'post', reverse('waitlist-list'), {'event': self.events[0].id})
+        self._assert_indexed(customer, 'get', reverse('waitlist-list'))
+        self._assert_indexed(self.organizer_user, 'get', reverse('waitlist-list'))
+
+
+class BookingConditionalGetTest(APITestCase):
+    """Tests for ETag / If-None-Match on booking GETs."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer = Customer.objects.create(user=User.objects.create_user(username='customer1'))
+        self.event = Event.objects.create(
+            title='Test Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        self.booking = Booking.objects.create(attendee=self.customer, event=self.event)
+        self.client.force_authenticate(user=self.customer.user)
+    
+    def test_detail_not_modified_until_cancelled(self):
+        """Test that booking detail revalidates with 304 until the booking changes."""
+        url = reverse('booking-detail', kwargs={'pk': self.booking.id})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.booking.cancel()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'cancelled')
+    
+    def test_list_etag_tracks_bookings(self):
+        """Test that the booking list ETag changes when bookings are added or deleted."""
+        url = reverse('booking-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        
+        other_event = Event.objects.create(
+            title='Other Event',
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        other = Booking.objects.create(attendee=self.customer, event=other_event)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        
+        other.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+
+class BookingAvailabilityCacheTest(APITestCase):
+    """Tests that booking transitions write through to the availability cache."""
+    
+    def setUp(self):
+        share_caches(self)
+        from django.core.cache import caches
+        caches['availability'].clear()
+        organizer = Organizer.objects.create(
+            user=User.objects.create_user(username='organizer1'),
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer = Customer.objects.create(user=User.objects.create_user(username='customer1'))
+        self.event = Event.objects.create(
+            title='Flash Sale',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=5,
+            bucket_count=2,
+            creator=organizer
+        )
+        self.client.force_authenticate(user=self.customer.user)
+    
+    def _cached_available_slots(self):
+        event = Event.objects.get(pk=self.event.pk)
+        with self.assertNumQueries(0):
+            return event.available_slots
+    
+    def test_create_cancel_and_reactivate(self):
+        """Test that create, cancel and reactivation keep the cached availability current."""
+        self.assertEqual(Event.objects.get(pk=self.event.pk).available_slots, 5)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._cached_available_slots(), 4)
+        
+        booking = Booking.objects.get(id=response.data['id'])
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel()
+        self.assertEqual(self._cached_available_slots(), 5)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('booking-detail', kwargs={'pk': booking.id}), {'status': 'active'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._cached_available_slots(), 4)
+
+
+class BookingFastListSerializationTest(APITestCase):
+    """Tests that the values() list path renders exactly what BookingSerializer does."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1', password='testpass123')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        for i in range(3):
+            event = Event.objects.create(
+                title=f'Event {i}',
+                start_time=timezone.now() + timedelta(days=i + 1),
+                end_time=timezone.now() + timedelta(days=i + 1, hours=2),
+                capacity=5,
+                creator=self.organizer
+            )
+            booking = Booking.objects.create(attendee=self.customer, event=event)
+        booking.cancel()
+    
+    def _assert_parity(self, url):
+        from django.test import override_settings
+        fast = self.client.get(url)
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.json(), slow.json())
+        self.assertEqual(fast['ETag'], slow['ETag'])
+        return fast.json()
+    
+    def test_list_parity(self):
+        """Test that customer and organizer lists, sparse and cursor pages match."""
+        self.client.force_authenticate(user=self.customer_user)
+        data = self._assert_parity(reverse('booking-list'))
+        self.assertEqual(len(data['results']), 3)
+        self._assert_parity(reverse('booking-list') + '?fields=id,status')
+        page = self._assert_parity(reverse('booking-list') + '?pagination=cursor')
+        self.assertIsNone(page['next'])
+        self.client.force_authenticate(user=self.organizer_user)
+        self._assert_parity(reverse('booking-list') + '?status=cancelled')
+
+
+class BookingConflictTest(APITestCase):
+    """Tests for time conflicts between a customer's bookings."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1', password='testpass123')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        self.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        # 10-12, 11-13 and 12-14: the first and last only touch
+        self.morning = self._event('Morning', 10, 12)
+        self.noon = self._event('Noon', 11, 13)
+        self.afternoon = self._event('Afternoon', 12, 14)
+        self.client.force_authenticate(user=self.customer_user)
+    
+    def _event(self, title, start_hour, end_hour):
+        return Event.objects.create(
+            title=title,
+            start_time=self.start + timedelta(hours=start_hour),
+            end_time=self.start + timedelta(hours=end_hour),
+            capacity=5,
+            creator=self.organizer
+        )
+    
+    def test_sweep_conflicts(self):
+        """Test that the sweep yields each overlapping pair once, and not touching intervals."""
+        from bookings.conflicts import sweep_conflicts
+        intervals = [(0, 10, 'a'), (1, 3, 'b'), (2, 4, 'c'), (4, 5, 'd'), (10, 11, 'e')]
+        self.assertEqual(
+            sorted(sweep_conflicts(intervals)),
+            [('a', 'b'), ('a', 'c'), ('a', 'd'), ('b', 'c')]
+        )
+    
+    def test_conflicts_endpoint(self):
+        """Test that overlapping bookings are reported as pairs in one query."""
+        from bookings.conflicts import customer_conflicts
+        first = Booking.objects.create(attendee=self.customer, event=self.morning)
+        second = Booking.objects.create(attendee=self.customer, event=self.noon)
+        Booking.objects.create(attendee=self.customer, event=self.afternoon)
+        
+        response = self.client.get(reverse('booking-conflicts'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        conflicts = response.data['conflicts']
+        self.assertEqual(len(conflicts), 2)
+        self.assertEqual([b['booking'] for b in conflicts[0]['bookings']], [first.id, second.id])
+        self.assertEqual(conflicts[0]['overlap_start'], conflicts[0]['bookings'][1]['start_time'])
+        self.assertEqual(conflicts[0]['overlap_end'], conflicts[0]['bookings'][0]['end_time'])
+        with self.assertNumQueries(1):
+            customer_conflicts(self.customer)
+        
+        second.cancel()
+        response = self.client.get(reverse('booking-conflicts'))
+        self.assertEqual(response.data['conflicts'], [])
+    
+    def test_conflicts_with_event(self):
+        """Test that ?event= lists the bookings an event would overlap."""
+        Booking.objects.create(attendee=self.customer, event=self.morning)
+        Booking.objects.create(attendee=self.customer, event=self.afternoon)
+        
+        response = self.client.get(reverse('booking-conflicts'), {'event': self.noon.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['event'] for c in response.data['conflicts']], [self.morning.id, self.afternoon.id])
+        
+        response = self.client.get(reverse('booking-conflicts'), {'event': self.morning.id})
+        self.assertEqual(response.data['conflicts'], [])
+        
+        response = self.client.get(reverse('booking-conflicts'), {'event': 'nope'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_conflicts_for_organizer(self):
+        """Test that organizers get 403."""
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.get(reverse('booking-conflicts'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_conflict_query_plans(self):
+        """Test that conflict lookups are indexed."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from event_scheduling_system.query_plans import full_table_scans
+        Booking.objects.create(attendee=self.customer, event=self.morning)
+        for params in ({}, {'event': self.noon.id}):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse('booking-conflicts'), params)
+            for query in ctx.captured_queries:
+                self.assertEqual(full_table_scans(query['sql']), [], query['sql'])
+    
+    def test_create_rejects_conflicts(self):
+        """Test that booking creation checks conflicts only when enabled."""
+        from django.test import override_settings
+        Booking.objects.create(attendee=self.customer, event=self.morning)
+        
+        with override_settings(BOOKING_CONFLICT_CHECK=True):
+            response = self.client.post(reverse('booking-list'), {'event': self.noon.id})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('Morning', str(response.data['event']))
+            # Back-to-back events do not conflict
+            response = self.client.post(reverse('booking-list'), {'event': self.afternoon.id})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        response = self.client.post(reverse('booking-list'), {'event': self.noon.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_reactivation_rejects_conflicts(self):
+        """Test that reactivating a cancelled booking checks conflicts."""
+        from django.test import override_settings
+        booking = Booking.objects.create(attendee=self.customer, event=self.noon)
+        booking.cancel()
+        Booking.objects.create(attendee=self.customer, event=self.morning)
+        
+        with override_settings(BOOKING_CONFLICT_CHECK=True):
+            response = self.client.patch(
+                reverse('booking-detail', kwargs={'pk': booking.id}), {'status': 'active'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'cancelled')
+    
+    def test_bulk_rejects_conflicts(self):
+        """Test that bulk booking rejects overlaps with existing bookings and within the request."""
+        from django.test import override_settings
+        evening = self._event('Evening', 18, 20)
+        late = self._event('Late', 19, 21)
+        Booking.objects.create(attendee=self.customer, event=self.morning)
+        
+        with override_settings(BOOKING_CONFLICT_CHECK=True):
+            response = self.client.post(
+                reverse('booking-bulk'),
+                {'events': [self.noon.id, self.afternoon.id, evening.id, late.id]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertIn('Morning', results[0]['error'])
+        self.assertIn('booking', results[1])
+        self.assertIn('booking', results[2])
+        self.assertIn('Evening', results[3]['error'])
+    
+    def test_audit_command(self):
+        """Test that the audit reports conflicting customers only."""
+        from io import StringIO
+        from django.core.management import call_command
+        other = Customer.objects.create(user=User.objects.create_user(username='customer2'))
+        Booking.objects.create(attendee=self.customer, event=self.morning)
+        Booking.objects.create(attendee=self.customer, event=self.noon)
+        Booking.objects.create(attendee=other, event=self.morning)
+        Booking.objects.create(attendee=other, event=self.afternoon)
+        
+        out = StringIO()
+        call_command('audit_booking_conflicts', '--chunk-size', '1', stdout=out)
+        self.assertIn(f'customer {self.customer.id}:', out.getvalue())
+        self.assertNotIn(f'customer {other.id}:', out.getvalue())
+        self.assertIn('1 conflicting booking pair(s) across 1 customer(s).', out.getvalue())
+
+
+class BookingCalendarFeedTest(APITestCase):
+    """Tests for the customer's iCalendar feed."""
+    
+    def setUp(self):
+        share_caches(self)
+        from user.models import CalendarFeed
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                start_time=timezone.now() + timedelta(days=i + 1),
+                end_time=timezone.now() + timedelta(days=i + 1, hours=2),
+                capacity=10,
+                creator=self.organizer
+            )
+            for i in range(3)
+        ]
+        self.bookings = [Booking.objects.create(attendee=self.customer, event=event) for event in self.events]
+        self.url = reverse('booking-calendar', kwargs={'key': CalendarFeed.for_user(self.customer_user).key})
+    
+    def _get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content).decode() if response.streaming else ''
+        return response, body
+    
+    def test_feed_lists_active_bookings(self):
+        """Test that cancelling a booking removes it from the feed and changes the ETag."""
+        response, body = self._get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn(f'UID:event-{self.events[0].id}@', body)
+        
+        self.bookings[1].cancel()
+        response, body = self._get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertNotIn('SUMMARY:Event 1', body)
+        
+        response, _ = self._get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_feed_conditional_get_without_shared_stamp(self):
+        """Test that with process-local caches a booking cancelled elsewhere changes the ETag."""
+        from django.test import override_settings
+        from event_scheduling_system.testing import local_caches
+        with override_settings(CACHES=local_caches()):
+            response, _ = self._get()
+            etag = response['ETag']
+            response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            
+            Booking.objects.filter(pk=self.bookings[0].pk).update(status=Booking.STATUS_CANCELLED)
+            response, body = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+    
+    def test_feed_query_plan(self):
+        """Test that the feed reads the customer's active bookings through an index."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from event_scheduling_system.query_plans import full_table_scans
+        with CaptureQueriesContext(connection) as ctx:
+            self._get()
+        for query in ctx.captured_queries:
+            self.assertEqual(full_table_scans(query['sql']), [], query['sql'])
+    
+    def test_organizer_key_is_not_a_customer_feed(self):
+        """Test that an organizer's key does not open a booking feed."""
+        from user.models import CalendarFeed
+        url = reverse('booking-calendar', kwargs={'key': CalendarFeed.for_user(self.organizer_user).key})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SeriesBookingTest(APITestCase):
+    """Tests for booking occurrences of recurring series."""
+    
+    def setUp(self):
+        from events.models import EventSeries
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        self.first = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        template = Event.objects.create(
+            title='Weekly Yoga',
+            start_time=self.first,
+            end_time=self.first + timedelta(hours=1),
+            capacity=2,
+            creator=self.organizer
+        )
+        self.series = EventSeries.objects.create(
+            template=template, frequency='weekly', starts_at=self.first, duration=timedelta(hours=1)
+        )
+        Event.objects.filter(id=template.id).update(series=self.series, recurrence_start=self.first)
+        self.client.force_authenticate(user=self.customer_user)
+    
+    def _book(self, **data):
+        return self.client.post(reverse('booking-series'), {'series': self.series.id, **data}, format='json')
+    
+    def test_book_one_occurrence(self):
+        """Test that booking one occurrence materializes only that occurrence."""
+        third = self.first + timedelta(weeks=2)
+        response = self._book(start_time=third.isoformat())
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(len(response.data['results']), 1)
+        event = Event.objects.get(id=response.data['results'][0]['event'])
+        self.assertEqual(event.start_time, third)
+        self.assertEqual(event.booked_seats, 1)
+        self.assertEqual(Event.objects.filter(series=self.series).count(), 2)
+        
+        response = self._book(start_time=(third + timedelta(hours=1)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start_time', response.data)
+    
+    def test_book_whole_series(self):
+        """Test that booking a series books every occurrence up to until in one call."""
+        until = self.first + timedelta(weeks=3)
+        response = self._book(until=until.isoformat())
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertTrue(all('booking' in result for result in response.data['results']))
+        self.assertEqual(Booking.objects.filter(attendee=self.customer, event__series=self.series).count(), 4)
+        
+        # Booking again reports the existing bookings instead of duplicating them
+        response = self._book(until=until.isoformat())
+        self.assertTrue(all('error' in result for result in response.data['results']))
+        self.assertEqual(Event.objects.filter(series=self.series).count(), 4)
+    
+    def test_default_horizon(self):
+        """Test that an open-ended series is booked up to the configured horizon."""
+        from django.test import override_settings
+        with override_settings(EVENT_SERIES_BOOKING_HORIZON_DAYS=15):
+            response = self._book()
+        self.assertEqual(len(response.data['results']), 3)
+    
+    def test_organizer_cannot_book(self):
+        """Test that organizers get 403."""
+        self.client.force_authenticate(user=self.organizer_user)
+        self.assertEqual(self._book().status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BookingQueryBudgetTest(APITestCase):
+    """Booking create, reactivate and cancel run a fixed number of statements."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        self.event = Event.objects.create(
+            title='Budget Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        token = Token.objects.create(user=self.customer_user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        # Warm the ContentType cache, which is process-wide in production
+        ContentType.objects.get_for_model(Booking)
+    
+    def test_create_budget(self):
+        """Test that creating a booking costs a fixed number of statements."""
+        # token + profiles, event, live hold check, savepoint, seat claim, insert, history, release
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(HistoryPoint.objects.filter(action=HistoryPoint.ACTION_CREATE).exists())
+    
+    def test_cancel_budget(self):
+        """Test that cancelling a booking costs a fixed number of statements."""
+        booking = Booking.objects.create(attendee=self.customer, event=self.event)
+        # token + profiles, booking + event, savepoint, booking update, seat release, history, release
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('booking-cancel', kwargs={'pk': booking.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+    
+    def test_reactivate_budget(self):
+        """Test that reactivating a booking costs a fixed number of statements."""
+        booking = Booking.objects.create(attendee=self.customer, event=self.event, status='cancelled')
+        # token + profiles, booking + event, live hold check, savepoint, seat claim, booking update, history,
+        # release
+        with self.assertNumQueries(8):
+            response = self.client.patch(
+                reverse('booking-detail', kwargs={'pk': booking.id}), {'status': 'active'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(HistoryPoint.objects.filter(action=HistoryPoint.ACTION_REACTIVATE).exists())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_duplicate_rolls_back_seat_claim(self):
+        """Test that a duplicate caught by the unique constraint leaves no claimed seat or history."""
+        Booking.objects.create(attendee=self.customer, event=self.event, status='cancelled')
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Reactivate it instead', response.data['event'][0])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+        self.assertFalse(HistoryPoint.objects.exists())
+    
+    def test_duplicate_of_full_event(self):
+        """Test that a customer already booked on a full event is told about their booking."""
+        self.event.capacity = 1
+        self.event.save()
+        Booking.objects.create(attendee=self.customer, event=self.event)
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already have an active booking', response.data['event'][0])
+
+
+class BookingIdempotencyTest(APITestCase):
+    """Test cases for Idempotency-Key replays of booking writes."""
+    
+    def setUp(self):
+        share_caches(self)
+        from django.core.cache import caches
+        caches['idempotency'].clear()
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        self.event = Event.objects.create(
+            title='Idempotent Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        self.client.force_authenticate(user=self.customer_user)
+    
+    def _book(self, key, event=None):
+        return self.client.post(
+            reverse('booking-list'), {'event': (event or self.event).id}, HTTP_IDEMPOTENCY_KEY=key
+        )
+    
+    def test_create_replayed(self):
+        """Test that a retried create replays the first response without booking again."""
+        first = self._book('key-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(0):
+            second = self._book('key-1')
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(HistoryPoint.objects.filter(action=HistoryPoint.ACTION_CREATE).count(), 1)
+        
+        # A new key is a new request
+        response = self._book('key-2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already have an active booking', response.data['event'][0])
+    
+    def test_replayed_through_database_cache(self):
+        """Test that the shipped database-backed cache replays a retried create."""
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.test import override_settings
+        from event_scheduling_system import settings as project_settings
+        caches = {**settings.CACHES, 'idempotency': project_settings.CACHES['idempotency']}
+        with override_settings(CACHES=caches):
+            call_command('createcachetable', 'idempotency_cache')
+            first = self._book('key-1')
+            second = self._book('key-1')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+    
+    def test_cancel_replayed(self):
+        """Test that a retried cancel replays success instead of failing on the cancelled booking."""
+        booking = Booking.objects.create(attendee=self.customer, event=self.event)
+        url = reverse('booking-cancel', kwargs={'pk': booking.id})
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='cancel-1')
+        second = self.client.post(url, HTTP_IDEMPOTENCY_KEY='cancel-1')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(HistoryPoint.objects.filter(action='cancel').count(), 1)
+    
+    def test_key_reused_with_other_body(self):
+        """Test that a key reused for a different request is rejected with 422."""
+        other = Event.objects.create(
+            title='Other Event',
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        self.assertEqual(self._book('key-1').status_code, status.HTTP_201_CREATED)
+        response = self._book('key-1', event=other)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Booking.objects.filter(event=other).exists())
+    
+    def test_keys_scoped_to_user(self):
+        """Test that two customers using the same key both get their own booking."""
+        self.assertEqual(self._book('shared').status_code, status.HTTP_201_CREATED)
+        other = Customer.objects.create(user=User.objects.create_user(username='customer2'))
+        self.client.force_authenticate(user=other.user)
+        self.assertEqual(self._book('shared').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.count(), 2)
+    
+    def test_failed_request_not_kept(self):
+        """Test that a request failing validation leaves its key free for a retry."""
+        Booking.objects.create(attendee=self.customer, event=self.event)
+        self.assertEqual(self._book('key-1').status_code, status.HTTP_400_BAD_REQUEST)
+        Booking.objects.all().delete()
+        self.assertEqual(self._book('key-1').status_code, status.HTTP_201_CREATED)
+    
+    def test_concurrent_duplicate_waits_for_first(self):
+        """Test that a repeat arriving while the first request runs gets the first response."""
+        from unittest import mock
+        from rest_framework.test import APIClient
+        from .serializers import BookingSerializer
+        original_save = BookingSerializer.save
+        retry_client = APIClient()
+        retry_client.force_authenticate(user=self.customer_user)
+        retries = []
+        threads = []
+        
+        def slow_save(serializer, **kwargs):
+            # The client retries while the first request is still being handled
+            threads.append(threading.Thread(target=lambda: retries.append(retry_client.post(
+                reverse('booking-list'), {'event': self.event.id}, HTTP_IDEMPOTENCY_KEY='key-1'
+            ))))
+            threads[0].start()
+            time.sleep(0.2)
+            return original_save(serializer, **kwargs)
+        
+        with mock.patch.object(BookingSerializer, 'save', slow_save):
+            first = self._book('key-1')
+        threads[0].join()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retries[0].status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retries[0]['Idempotent-Replayed'], 'true')
+        self.assertEqual(retries[0].data, first.data)
+        self.assertEqual(Booking.objects.count(), 1)
+    
+    def test_in_flight_timeout(self):
+        """Test that a repeat gives up with 409 when the first request holds the key too long."""
+        from django.core.cache import caches
+        from django.test import override_settings
+        from event_scheduling_system import idempotency
+        from rest_framework.test import APIRequestFactory
+        request = APIRequestFactory().post(reverse('booking-list'))
+        request.user = self.customer_user
+        caches['idempotency'].add(idempotency._cache_key(request, 'key-1'), idempotency.IN_FLIGHT)
+        with override_settings(IDEMPOTENCY_IN_FLIGHT_TIMEOUT=0.1):
+            response = self._book('key-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Booking.objects.exists())
+
+
+class BookingAsyncSubmissionTest(APITestCase):
+    """Test cases for queued booking submission and the booking workers."""
+    
+    def setUp(self):
+        from django.test import override_settings
+        self.settings_override = override_settings(BOOKING_ASYNC_SUBMISSION=True)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(3)
+        ]
+        self.event = Event.objects.create(
+            title='On Sale Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=2,
+            creator=self.organizer
+        )
+    
+    def _submit(self, customer):
+        self.client.force_authenticate(user=customer.user)
+        return self.client.post(reverse('booking-list'), {'event': self.event.id})
+    
+    def test_submit_and_process(self):
+        """Test that a submission is queued with 202 and booked by a worker."""
+        from .jobs import drain
+        from .models import BookingJob
+        response = self._submit(self.customers[0])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], BookingJob.STATUS_QUEUED)
+        self.assertTrue(response['Location'].endswith(reverse('booking-job-detail', kwargs={'pk': response.data['id']})))
+        self.assertFalse(Booking.objects.exists())
+        
+        self.assertEqual(drain(), 1)
+        job = self.client.get(response['Location']).data
+        self.assertEqual(job['status'], BookingJob.STATUS_DONE)
+        booking = Booking.objects.get(id=job['booking'])
+        self.assertEqual(booking.attendee, self.customers[0])
+        self.assertTrue(HistoryPoint.objects.filter(action=HistoryPoint.ACTION_CREATE, object_id=booking.id).exists())
+        self.assertEqual(drain(), 0)
+    
+    def test_capacity_and_duplicates(self):
+        """Test that workers apply the usual capacity and duplicate rules."""
+        from .jobs import drain
+        from .models import BookingJob
+        ids = [self._submit(customer).data['id'] for customer in self.customers]
+        duplicate = self._submit(self.customers[0]).data['id']
+        drain()
+        jobs = BookingJob.objects.in_bulk(ids + [duplicate])
+        self.assertEqual([jobs[i].status for i in ids], ['done', 'done', 'failed'])
+        self.assertIn('full capacity', jobs[ids[2]].error)
+        self.assertIn('already have an active booking', jobs[duplicate].error)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+    
+    def test_existing_booking_refused_at_submission(self):
+        """Test that customers with a booking of the event get the synchronous 400, not a doomed job."""
+        from .models import BookingJob
+        booking = Booking.objects.create(attendee=self.customers[0], event=self.event)
+        response = self._submit(self.customers[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['event'], ['You already have an active booking for this event.'])
+        booking.cancel()
+        response = self._submit(self.customers[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Reactivate it instead', response.data['event'][0])
+        self.assertFalse(BookingJob.objects.exists())
+    
+    def test_submission_cost_independent_of_queue_depth(self):
+        """Test that queueing costs the same statements with an empty or a deep queue."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import BookingJob
+        with CaptureQueriesContext(connection) as empty:
+            self._submit(self.customers[0])
+        BookingJob.objects.bulk_create([BookingJob(attendee=self.customers[1], event=self.event)] * 200)
+        with CaptureQueriesContext(connection) as deep:
+            self._submit(self.customers[2])
+        self.assertEqual(len(deep.captured_queries), len(empty.captured_queries))
+    
+    def test_long_poll(self):
+        """Test that ?wait= holds a status request until the wait runs out or the job is done."""
+        from .jobs import drain
+        job_id = self._submit(self.customers[0]).data['id']
+        url = reverse('booking-job-detail', kwargs={'pk': job_id})
+        started = time.monotonic()
+        response = self.client.get(url, {'wait': '0.3'})
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertEqual(response.data['status'], 'queued')
+        
+        drain()
+        started = time.monotonic()
+        response = self.client.get(url, {'wait': '10'})
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(self.client.get(url, {'wait': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_jobs_private_to_customer(self):
+        """Test that other users cannot see a customer's jobs."""
+        job_id = self._submit(self.customers[0]).data['id']
+        url = reverse('booking-job-detail', kwargs={'pk': job_id})
+        self.client.force_authenticate(user=self.customers[1].user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.organizer_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('booking-job-list')).data['count'], 0)
+    
+    def test_stale_claim_reclaimed(self):
+        """Test that jobs of a worker that stopped are claimed again after the claim timeout."""
+        from .jobs import claim_jobs
+        from .models import BookingJob
+        job_id = self._submit(self.customers[0]).data['id']
+        self.assertEqual(len(claim_jobs('worker-a', 10)), 1)
+        self.assertEqual(claim_jobs('worker-b', 10), [])
+        BookingJob.objects.filter(id=job_id).update(claimed_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual([job.id for job in claim_jobs('worker-b', 10, stale_after=60)], [job_id])
+    
+    def test_worker_command(self):
+        """Test that the worker command drains the queue and exits with --once."""
+        from django.core.management import call_command
+        from .models import BookingJob
+        for customer in self.customers[:2]:
+            self._submit(customer)
+        call_command('run_booking_workers', workers=1, once=True, batch_size=1)
+        self.assertFalse(BookingJob.objects.exclude(status=BookingJob.STATUS_DONE).exists())
+        self.assertEqual(Booking.objects.count(), 2)
+    
+    def test_job_processed_after_event_started(self):
+        """Test that a job drained once its event is under way fails like a direct booking would."""
+        from .jobs import drain
+        from .models import BookingJob
+        job_id = self._submit(self.customers[0]).data['id']
+        Event.objects.filter(pk=self.event.pk).update(start_time=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(drain(), 1)
+        job = BookingJob.objects.get(id=job_id)
+        self.assertEqual(job.status, BookingJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'Cannot book for events that are currently ongoing.')
+        self.assertFalse(Booking.objects.exists())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+    
+    def test_job_rechecks_lottery_and_conflicts(self):
+        """Test that workers refuse jobs for lottery events and jobs that now overlap a booking."""
+        from django.test import override_settings
+        from .jobs import drain
+        from .models import BookingJob
+        first = self._submit(self.customers[0]).data['id']
+        Event.objects.filter(pk=self.event.pk).update(lottery_pending=True)
+        drain()
+        self.assertIn('allocated by lottery', BookingJob.objects.get(id=first).error)
+        Event.objects.filter(pk=self.event.pk).update(lottery_pending=False)
+        
+        overlapping = Event.objects.create(
+            title='Overlapping Event',
+            start_time=self.event.start_time + timedelta(hours=1),
+            end_time=self.event.end_time + timedelta(hours=1),
+            capacity=5,
+            creator=self.organizer
+        )
+        with override_settings(BOOKING_CONFLICT_CHECK=True):
+            second = self._submit(self.customers[1]).data['id']
+            Booking.objects.create(attendee=self.customers[1], event=overlapping)
+            third = self._submit(self.customers[2]).data['id']
+            drain()
+        job = BookingJob.objects.get(id=second)
+        self.assertEqual(job.status, BookingJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'This event overlaps your booking for: Overlapping Event.')
+        self.assertEqual(BookingJob.objects.get(id=third).status, BookingJob.STATUS_DONE)
+
+
+class SeatHoldTest(APITestCase):
+    """Test cases for time-limited seat holds and their expiry."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(3)
+        ]
+        self.event = Event.objects.create(
+            title='Checkout Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=2,
+            creator=self.organizer
+        )
+    
+    def _hold(self, customer, event=None):
+        self.client.force_authenticate(user=customer.user)
+        return self.client.post(reverse('seat-hold-list'), {'event': (event or self.event).id})
+    
+    def _expire(self, *hold_ids):
+        from .models import SeatHold
+        SeatHold.objects.filter(id__in=hold_ids).update(expires_at=timezone.now() - timedelta(seconds=1))
+    
+    def test_hold_counts_against_capacity(self):
+        """Test that live holds take seats and a full event refuses more holds and bookings."""
+        for customer in self.customers[:2]:
+            self.assertEqual(self._hold(customer).status_code, status.HTTP_201_CREATED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.available_slots, 0)
+        response = self._hold(self.customers[2])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('full capacity', response.data['event'][0])
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_one_live_hold_per_customer(self):
+        """Test that a second hold on the same event is refused without taking a seat."""
+        self._hold(self.customers[0])
+        response = self._hold(self.customers[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already hold a seat', response.data['event'][0])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_confirm_hold(self):
+        """Test that confirming a hold creates a booking that keeps the held seat."""
+        hold_id = self._hold(self.customers[0]).data['id']
+        response = self.client.post(reverse('seat-hold-confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking = Booking.objects.get(id=response.data['id'])
+        self.assertEqual(booking.status, 'active')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+        self.assertTrue(HistoryPoint.objects.filter(action='create', object_id=booking.id).exists())
+        
+        hold = self.client.get(reverse('seat-hold-detail', kwargs={'pk': hold_id})).data
+        self.assertEqual((hold['status'], hold['booking']), ('confirmed', booking.id))
+        response = self.client.post(reverse('seat-hold-confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_confirm_reactivates_cancelled_booking(self):
+        """Test that confirming reuses the customer's cancelled booking of the event."""
+        cancelled = Booking.objects.create(attendee=self.customers[0], event=self.event, status='cancelled')
+        hold_id = self._hold(self.customers[0]).data['id']
+        response = self.client.post(reverse('seat-hold-confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.data['id'], cancelled.id)
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'active')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_direct_booking_refused_while_holding(self):
+        """Test that a customer holding a seat cannot take a second one by booking directly."""
+        self.event.capacity = 3
+        self.event.save()
+        self._hold(self.customers[0])
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Confirm the hold', response.data['event'][0])
+        response = self.client.post(reverse('booking-bulk'), {'events': [self.event.id]}, format='json')
+        self.assertIn('Confirm the hold', response.data['results'][0]['error'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_confirm_checks_event_and_schedule(self):
+        """Test that confirming is refused once the event takes no bookings or clashes with another."""
+        from django.test import override_settings
+        from .lottery import open_lottery
+        hold_id = self._hold(self.customers[0]).data['id']
+        open_lottery(self.event, timezone.now() + timedelta(hours=1))
+        response = self.client.post(reverse('seat-hold-confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('allocated by lottery', response.data['error'])
+        self.assertFalse(Booking.objects.exists())
+        
+        Event.objects.filter(pk=self.event.pk).update(lottery_pending=False)
+        clash = Event.objects.create(
+            title='Clashing Event',
+            start_time=self.event.start_time,
+            end_time=self.event.end_time,
+            capacity=5,
+            creator=self.organizer
+        )
+        Booking.objects.create(attendee=self.customers[0], event=clash)
+        with override_settings(BOOKING_CONFLICT_CHECK=True):
+            response = self.client.post(reverse('seat-hold-confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Clashing Event', response.data['error'])
+        self.assertEqual(self.client.get(reverse('seat-hold-detail', kwargs={'pk': hold_id})).data['status'], 'held')
+    
+    def test_expired_hold_cannot_be_confirmed(self):
+        """Test that a hold past expires_at cannot be confirmed, even before it is swept."""
+        hold_id = self._hold(self.customers[0]).data['id']
+        self._expire(hold_id)
+        response = self.client.post(reverse('seat-hold-confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Booking.objects.exists())
+    
+    def test_release_hold(self):
+        """Test that releasing a hold gives its seat back."""
+        hold_id = self._hold(self.customers[0]).data['id']
+        response = self.client.post(reverse('seat-hold-release', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'released')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+        response = self.client.post(reverse('seat-hold-release', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_holds_private_to_customer(self):
+        """Test that holds are only visible to their customer and organizers cannot hold seats."""
+        hold_id = self._hold(self.customers[0]).data['id']
+        self.client.force_authenticate(user=self.customers[1].user)
+        self.assertEqual(
+            self.client.get(reverse('seat-hold-detail', kwargs={'pk': hold_id})).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(reverse('seat-hold-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_sweeper_expires_due_holds_from_heap(self):
+        """Test that the heap sweeper expires due holds only and skips confirmed ones."""
+        from .holds import HoldSweeper, confirm_hold
+        from .models import SeatHold
+        self.event.capacity = 3
+        self.event.save()
+        ids = [self._hold(customer).data['id'] for customer in self.customers]
+        sweeper = HoldSweeper()
+        self.assertEqual(sweeper.load_new(), 3)
+        self.assertEqual(sweeper.load_new(), 0)
+        confirm_hold(SeatHold.objects.get(id=ids[2]), self.customers[2].user)
+        self._expire(ids[0], ids[2])
+        sweeper.heap = sorted(
+            (expires_at, hold_id) for hold_id, expires_at in SeatHold.objects.values_list('id', 'expires_at')
+        )
+        
+        self.assertEqual(sweeper.expire_due(), 1)
+        statuses = dict(SeatHold.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[i] for i in ids], ['expired', 'held', 'confirmed'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+        self.assertEqual(len(sweeper.heap), 1)
+    
+    def test_range_sweep_fallback(self):
+        """Test that the range sweep expires due holds the heap never saw, in batches."""
+        from .holds import HoldSweeper
+        ids = [self._hold(customer).data['id'] for customer in self.customers[:2]]
+        self._expire(*ids)
+        self.assertEqual(HoldSweeper(batch_size=1).sweep(), 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+        self.assertEqual(HoldSweeper().sweep(), 0)
+    
+    def test_expiry_cost_independent_of_hold_count(self):
+        """Test that expiring a batch of holds on one event costs a fixed number of statements."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .holds import expire_holds
+        from .models import SeatHold
+        
+        def expire(count):
+            SeatHold.objects.all().delete()
+            Event.objects.filter(id=self.event.id).update(capacity=count, booked_count=count)
+            customers = [
+                Customer.objects.create(user=User.objects.create_user(username=f'bulk{count}-{i}'))
+                for i in range(count)
+            ]
+            holds = SeatHold.objects.bulk_create([
+                SeatHold(attendee=customer, event=self.event, expires_at=timezone.now() - timedelta(seconds=1))
+                for customer in customers
+            ])
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(expire_holds([hold.id for hold in holds]), count)
+            return len(ctx.captured_queries)
+        
+        self.assertEqual(expire(3), expire(30))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+    
+    def test_sharded_event_holds(self):
+        """Test that holds on a sharded event take and give back bucket seats."""
+        from django.core.cache import caches
+        from .holds import HoldSweeper
+        caches['availability'].clear()
+        self.event.capacity = 4
+        self.event.bucket_count = 2
+        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = [self._hold(customer).data['id'] for customer in self.customers]
+        self.assertEqual(Event.objects.get(id=self.event.id).available_slots, 1)
+        self._expire(*ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(HoldSweeper().sweep(), 3)
+        self.assertEqual(Event.objects.get(id=self.event.id).available_slots, 4)
+    
+    def test_reconcile_counts_live_holds(self):
+        """Test that rebuilding the seat counters keeps the seats of live holds."""
+        from io import StringIO
+        from django.core.management import call_command
+        self._hold(self.customers[0])
+        Booking.objects.create(attendee=self.customers[1], event=self.event)
+        out = StringIO()
+        call_command('reconcile_booked_counts', stdout=out)
+        self.assertIn('0 counters fixed', out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+
+
+class EventLotteryTest(APITestCase):
+    """Test cases for lottery allocation of oversubscribed events."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.other_organizer = Organizer.objects.create(
+            user=User.objects.create_user(username='organizer2'),
+            organization_name='Other Org',
+            business_address='456 Other St'
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(6)
+        ]
+        self.event = Event.objects.create(
+            title='Popular Event',
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+            capacity=2,
+            creator=self.organizer
+        )
+    
+    def _open(self, user=None, **extra):
+        self.client.force_authenticate(user=user or self.organizer_user)
+        data = {'event': self.event.id, 'closes_at': (timezone.now() + timedelta(days=1)).isoformat()}
+        data.update(extra)
+        return self.client.post(reverse('lottery-list'), data)
+    
+    def _enter(self, lottery_id, customers):
+        for customer in customers:
+            self.client.force_authenticate(user=customer.user)
+            response = self.client.post(reverse('lottery-entry', kwargs={'pk': lottery_id}))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def _close(self, lottery_id):
+        from .models import EventLottery
+        EventLottery.objects.filter(id=lottery_id).update(closes_at=timezone.now() - timedelta(seconds=1))
+    
+    def test_open_lottery_refuses_direct_bookings(self):
+        """Test that bookings and holds are refused while the event's lottery is pending."""
+        response = self._open()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['seed'])
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.lottery_pending)
+        self.client.force_authenticate(user=self.customers[0].user)
+        for url in (reverse('booking-list'), reverse('seat-hold-list')):
+            response = self.client.post(url, {'event': self.event.id})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('allocated by lottery', str(response.data))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+    
+    def test_stale_save_keeps_lottery_pending(self):
+        """Test that saving an instance loaded before the lottery opened keeps bookings refused."""
+        stale = Event.objects.get(pk=self.event.pk)
+        self._open()
+        stale.title = 'Renamed'
+        stale.save()
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.lottery_pending)
+        self.client.force_authenticate(user=self.customers[0].user)
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_only_event_organizer_opens_and_draws(self):
+        """Test that other organisers and customers cannot open or draw an event's lottery."""
+        self.assertEqual(self._open(user=self.other_organizer.user).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._open(user=self.customers[0].user).status_code, status.HTTP_400_BAD_REQUEST)
+        lottery_id = self._open().data['id']
+        self._close(lottery_id)
+        self.client.force_authenticate(user=self.other_organizer.user)
+        response = self.client.post(reverse('lottery-draw', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_entry_rules(self):
+        """Test that entries take no seat and duplicate, organiser and late entries are refused."""
+        lottery_id = self._open().data['id']
+        self._enter(lottery_id, self.customers)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+        response = self.client.post(reverse('lottery-entry', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already entered', response.data['error'])
+        response = self.client.get(reverse('lottery-entry', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.data['result'], 'pending')
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(reverse('lottery-entry', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self._close(lottery_id)
+        late = Customer.objects.create(user=User.objects.create_user(username='late'))
+        self.client.force_authenticate(user=late.user)
+        response = self.client.post(reverse('lottery-entry', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('closed', response.data['error'])
+    
+    def test_draw_refused_while_open(self):
+        """Test that a lottery cannot be drawn before its entry window closes."""
+        lottery_id = self._open().data['id']
+        response = self.client.post(reverse('lottery-draw', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('still open', response.data['error'])
+    
+    def test_draw_books_capacity_in_seeded_order(self):
+        """Test that the draw books exactly the free seats, in the order replayed from its seed."""
+        from .lottery import shuffled_entries
+        from .models import EventLottery, LotteryEntry
+        lottery_id = self._open().data['id']
+        self._enter(lottery_id, self.customers)
+        self._close(lottery_id)
+        lottery = EventLottery.objects.get(id=lottery_id)
+        order = [attendee_id for _, attendee_id in shuffled_entries(lottery)]
+        self.client.force_authenticate(user=self.organizer_user)
+        ContentType.objects.get_for_model(Booking)  # warm the content type cache
+        with self.assertNumQueries(16):
+            response = self.client.post(reverse('lottery-draw', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['entries'], 6)
+        self.assertEqual(response.data['winners'], 2)
+        self.assertEqual(response.data['losers'], 4)
+        booked = set(Booking.objects.filter(event=self.event, status='active').values_list('attendee_id', flat=True))
+        self.assertEqual(booked, set(order[:2]))
+        self.assertEqual(
+            set(LotteryEntry.objects.filter(lottery=lottery, result='won').values_list('attendee_id', flat=True)),
+            booked
+        )
+        self.assertEqual(LotteryEntry.objects.filter(lottery=lottery, result='lost').count(), 4)
+        self.assertEqual(HistoryPoint.objects.filter(action='create', details__lottery=lottery_id).count(), 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+        self.assertFalse(self.event.lottery_pending)
+        # The seed is published, and drawing again changes nothing
+        response = self.client.get(reverse('lottery-detail', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.data['seed'], lottery.seed)
+        response = self.client.post(reverse('lottery-draw', kwargs={'pk': lottery_id}))
+        self.assertTrue(response.data['already_drawn'])
+        self.assertEqual(Booking.objects.filter(event=self.event).count(), 2)
+    
+    def test_losers_waitlisted_in_draw_order(self):
+        """Test that losers join the waitlist in draw order when the lottery asks for it."""
+        from .lottery import shuffled_entries
+        from .models import EventLottery, WaitlistEntry
+        lottery_id = self._open(waitlist_losers=True).data['id']
+        self._enter(lottery_id, self.customers)
+        self._close(lottery_id)
+        order = [attendee_id for _, attendee_id in shuffled_entries(EventLottery.objects.get(id=lottery_id))]
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(reverse('lottery-draw', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.data['waitlisted'], 4)
+        waiting = list(WaitlistEntry.objects.filter(event=self.event).order_by('joined_at', 'id')
+                       .values_list('attendee_id', flat=True))
+        self.assertEqual(waiting, order[2:])
+    
+    def test_waitlisted_counts_inserted_entries(self):
+        """Test that losers who joined the waitlist during the draw are not counted as waitlisted."""
+        from unittest import mock
+        from .lottery import shuffled_entries
+        from .models import EventLottery, WaitlistEntry
+        lottery_id = self._open(waitlist_losers=True).data['id']
+        self._enter(lottery_id, self.customers)
+        self._close(lottery_id)
+        order = [attendee_id for _, attendee_id in shuffled_entries(EventLottery.objects.get(id=lottery_id))]
+        bulk_create = WaitlistEntry.objects.bulk_create
+        
+        def join_first(*args, **kwargs):
+            # The first loser joins on their own after the draw read the waitlist
+            WaitlistEntry.objects.create(attendee_id=order[2], event=self.event)
+            return bulk_create(*args, **kwargs)
+        
+        self.client.force_authenticate(user=self.organizer_user)
+        with mock.patch.object(WaitlistEntry.objects, 'bulk_create', side_effect=join_first):
+            response = self.client.post(reverse('lottery-draw', kwargs={'pk': lottery_id}))
+        self.assertEqual(response.data['waitlisted'], 3)
+        self.assertEqual(WaitlistEntry.objects.filter(event=self.event, status='waiting').count(), 4)
+    
+    def test_existing_booking_counts_as_win(self):
+        """Test that an entrant who already booked keeps the seat and the draw fills the rest."""
+        from .lottery import draw_lottery
+        Booking.objects.create(attendee=self.customers[0], event=self.event)
+        lottery_id = self._open().data['id']
+        self._enter(lottery_id, self.customers)
+        self._close(lottery_id)
+        summary = draw_lottery(lottery_id)
+        self.assertEqual(summary['winners'], 2)
+        self.assertEqual(Booking.objects.filter(event=self.event, status='active').count(), 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+    
+    def test_draw_lotteries_command(self):
+        """Test that the command draws only lotteries whose window has closed."""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import EventLottery
+        lottery_id = self._open().data['id']
+        self._enter(lottery_id, self.customers[:3])
+        out = StringIO()
+        call_command('draw_lotteries', stdout=out)
+        self.assertIn('Drew 0 lotteries', out.getvalue())
+        self._close(lottery_id)
+        out = StringIO()
+        call_command('draw_lotteries', stdout=out)
+        self.assertIn('2 winner(s) of 3 entries', out.getvalue())
+        self.assertIsNotNone(EventLottery.objects.get(id=lottery_id).drawn_at)
@@ -1,12 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookingViewSet
+from .feeds import customer_calendar
+from .views import BookingJobViewSet, BookingViewSet, EventLotteryViewSet, SeatHoldViewSet, WaitlistViewSet
 
 
 router = DefaultRouter()
 router.register(r'booking', BookingViewSet, basename='booking')
+router.register(r'waitlist', WaitlistViewSet, basename='waitlist')
+router.register(r'jobs', BookingJobViewSet, basename='booking-job')
+router.register(r'holds', SeatHoldViewSet, basename='seat-hold')
+router.register(r'lotteries', EventLotteryViewSet, basename='lottery')
 
 urlpatterns = [
+    path('calendar/<str:key>.ics', customer_calendar, name='booking-calendar'),
     path('', include(router.urls)),
 ]
 
@@ -2,31 +2,67 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
+from django.db import transaction
 from django.db.models import Q
 
-from .models import Booking
-from .serializers import BookingSerializer
+from event_scheduling_system.conditional import ConditionalGetMixin
+from event_scheduling_system.fast_serializers import ValuesListMixin, format_datetime
+from event_scheduling_system.idempotency import idempotent
+from event_scheduling_system.pagination import KeysetPaginationMixin
+
+from .fast_serializers import BookingValuesSerializer
+from .admission import AdmissionRejected, admission_enabled, admission_queue_for
+from .conflicts import INTERVAL_FIELDS, conflicting_bookings, customer_conflicts
+from .holds import confirm_hold, release_hold
+from .jobs import async_submission_enabled, max_wait, submit_booking, wait_for_job
+from .lottery import draw_lottery, enter_lottery
+from .models import Booking, BookingJob, EventLottery, LotteryEntry, SeatHold, WaitlistEntry
+from .serializers import (
+    BookingJobSerializer, BookingSerializer, BulkBookingSerializer, EventLotterySerializer, LotteryEntrySerializer,
+    SeatHoldSerializer, SeriesBookingSerializer, WaitlistEntrySerializer
+)
 from .permissions import IsBookingAttendeeOrEventOrganizer
+from events.models import Event
 from user.models import HistoryPoint
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(KeysetPaginationMixin, ValuesListMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsBookingAttendeeOrEventOrganizer]
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
     queryset = Booking.objects.select_related('attendee__user', 'event').all()
     serializer_class = BookingSerializer
+    values_serializer_class = BookingValuesSerializer
+    keyset_ordering = {'list': ('-booking_date', 'id')}
     """
     Booking CRUD:
     - GET /bookingapi/booking/ : list of all bookings for customers; booking for their own events for organizers
-    - POST /bookingapi/booking/ : Creates a booking for customers, 403 for organisers
+    - POST /bookingapi/booking/ : Creates a booking for customers, 403 for organisers; with asynchronous
+      submission on, queues it instead and answers 202 with the job to poll at /bookingapi/jobs/{id}/
     - GET /bookingapi/booking/{id}/ : Attendee can see their bookings with ID; and organisers can see all bookings for their events with ID; 403 for other events' booking
     - PATCH /bookingapi/booking/{id}/ : Updates a booking, if booking's attendee; 403 for organisers
     - DELETE /bookingapi/booking/{id}/ : Hard deletes a booking, if booking's attendee; 403 for organisers
     - POST /bookingapi/booking/{id}/cancel/ : Cancels a booking, if booking's attendee; 403 for organisers
+    - POST /bookingapi/booking/bulk/ : Books a list of events in one transaction for customers, 403 for organisers
+    - POST /bookingapi/booking/series/ : Books one occurrence (start_time) or the upcoming occurrences (until) of a
+      recurring series for customers, 403 for organisers
+    - GET /bookingapi/booking/conflicts/ : Pairs of the customer's active bookings whose events overlap in time;
+      ?event={id} lists the active bookings that event would overlap; 403 for organisers
+
+    The list is page-numbered by default; ?pagination=cursor switches it to keyset cursors.
+    GETs carry ETags (the list also Last-Modified) and answer matching conditional requests with 304.
+    GETs accept ?fields=a,b or ?omit=a,b to render only some fields.
+    POST /bookingapi/booking/ and .../cancel/ accept an Idempotency-Key header; repeats with the key replay
+    the first response instead of booking or cancelling again.
     """
+    def object_version(self, booking):
+        return booking.pk, booking.updated_at.isoformat()
+
     def get_queryset(self):
         if self.action == 'list':
-            qs = self.queryset
+            # Rows render attendee and event as ids, so the list needs no joins
+            qs = Booking.objects.all()
             user = self.request.user
             has_c = hasattr(user, 'customer_profile')
             has_o = hasattr(user, 'organizer_profile')
@@ -39,58 +75,119 @@ class BookingViewSet(viewsets.ModelViewSet):
             return qs.none()
         return self.queryset
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
-        Create a booking and log the action.
+        Create a booking; the serializer logs the action in the same transaction.
         """
         # Get the serializer and validate data
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        booking = serializer.save()
-        HistoryPoint.log_action(
-            user=request.user,
-            action=HistoryPoint.ACTION_CREATE,
-            obj=booking,
-            details={
-                'event_id': booking.event.id,
-                'event_title': booking.event.title,
-                'booking_date': booking.booking_date.isoformat(),
-                'status': booking.status
-            }
-        )
+        if async_submission_enabled():
+            return self._submit_job(request, serializer)
+        if admission_enabled():
+            return self._create_through_admission_queue(request, serializer)
+        serializer.save()
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def _submit_job(self, request, serializer):
+        """
+        Queue a validated booking for the booking workers; the client polls the job.
+        """
+        try:
+            job = submit_booking(request.user.customer_profile, serializer.validated_data['event'])
+        except AdmissionRejected as e:
+            raise ValidationError({'event': [str(e)]})
+        location = reverse('booking-job-detail', kwargs={'pk': job.pk}, request=request)
+        return Response(BookingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+    def _create_through_admission_queue(self, request, serializer):
+        """
+        Hand a validated booking to the event's admission queue, which creates
+        it and logs its history point as part of a batch.
+        """
+        event = serializer.validated_data['event']
+        try:
+            booking = admission_queue_for(event.id).submit(
+                attendee=request.user.customer_profile, user=request.user
+            )
+        except AdmissionRejected as e:
+            raise ValidationError({'event': str(e)})
+        serializer.instance = booking
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def update(self, request, *args, **kwargs):
         """
-        Update a booking and log the action.
+        Update a booking; the serializer logs the action in the same transaction.
         """
         instance = self.get_object()
-        original_status = instance.status
-        response = super().update(request, *args, **kwargs)
-        
-        if response.status_code == 200:
-            updated_instance = self.get_object()
-            action = HistoryPoint.ACTION_REACTIVATE if (
-                original_status == 'cancelled' and updated_instance.status == 'active'
-            ) else HistoryPoint.ACTION_UPDATE
-            
-            HistoryPoint.log_action(
-                user=request.user,
-                action=action,
-                obj=updated_instance,
-                details={
-                    'previous_status': original_status,
-                    'new_status': updated_instance.status,
-                    'event_id': updated_instance.event.id,
-                    'event_title': updated_instance.event.title,
-                    'updated_fields': list(request.data.keys()) if request.data else []
-                }
-            )
-        
-        return response
+        serializer = self.get_serializer(instance, data=request.data, partial=kwargs.pop('partial', False))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], serializer_class=BulkBookingSerializer)
+    def bulk(self, request):
+        """
+        Book several events at once; returns a result for each requested event.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], serializer_class=SeriesBookingSerializer)
+    def series(self, request):
+        """
+        Book occurrences of a recurring series; returns a result for each occurrence.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response({'series': serializer.validated_data['series'].id, 'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def conflicts(self, request):
+        """
+        Report time conflicts among the customer's active bookings, or with one event.
+        """
+        if not hasattr(request.user, 'customer_profile'):
+            return Response({
+                'error': 'Only customers have booking conflicts.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        customer = request.user.customer_profile
+
+        event_id = request.query_params.get('event')
+        if event_id is not None:
+            try:
+                event = Event.objects.get(pk=event_id)
+            except (Event.DoesNotExist, ValueError):
+                return Response({'error': 'Event not found.'}, status=status.HTTP_404_NOT_FOUND)
+            rows = conflicting_bookings(customer, event).order_by('event__start_time', 'id').values(*INTERVAL_FIELDS)
+            return Response({'event': event.id, 'conflicts': [self._interval_data(row) for row in rows]})
+
+        return Response({'conflicts': [
+            {
+                'bookings': [self._interval_data(first), self._interval_data(second)],
+                'overlap_start': format_datetime(second['event__start_time']),
+                'overlap_end': format_datetime(min(first['event__end_time'], second['event__end_time'])),
+            }
+            for first, second in customer_conflicts(customer)
+        ]})
+
+    @staticmethod
+    def _interval_data(row):
+        return {
+            'booking': row['id'],
+            'event': row['event_id'],
+            'start_time': format_datetime(row['event__start_time']),
+            'end_time': format_datetime(row['event__end_time']),
+        }
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def cancel(self, request, pk=None):
         """
         Cancel a booking.
@@ -99,18 +196,19 @@ class BookingViewSet(viewsets.ModelViewSet):
         booking = self.get_object()
         
         try:
-            booking.cancel()
-            HistoryPoint.log_action(
-                user=request.user,
-                action='cancel',
-                obj=booking,
-                details={
-                    'previous_status': 'active',
-                    'new_status': 'cancelled',
-                    'event_id': booking.event.id,
-                    'event_title': booking.event.title
-                }
-            )
+            with transaction.atomic():
+                booking.cancel()
+                HistoryPoint.log_action(
+                    user=request.user,
+                    action='cancel',
+                    obj=booking,
+                    details={
+                        'previous_status': 'active',
+                        'new_status': 'cancelled',
+                        'event_id': booking.event.id,
+                        'event_title': booking.event.title
+                    }
+                )
             
             return Response({
                 'message': 'Booking cancelled successfully.',
@@ -120,4 +218,232 @@ class BookingViewSet(viewsets.ModelViewSet):
         except ValueError as e:
             return Response({
                 'error': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BookingJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Asynchronously submitted bookings:
+    - GET /bookingapi/jobs/ : the customer's booking jobs, newest first; empty for organisers
+    - GET /bookingapi/jobs/{id}/ : a job's status, and its booking once done; ?wait={seconds} holds the
+      request until the job finishes or the wait (at most BOOKING_JOB_MAX_WAIT) runs out
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = BookingJobSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        if not hasattr(user, 'customer_profile'):
+            return BookingJob.objects.none()
+        return BookingJob.objects.filter(attendee=user.customer_profile).order_by('-id')
+
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+        try:
+            wait = min(float(request.query_params.get('wait', 0)), max_wait())
+        except ValueError:
+            return Response({'error': 'wait must be a number of seconds.'}, status=status.HTTP_400_BAD_REQUEST)
+        if wait > 0:
+            wait_for_job(job, wait)
+        return Response(self.get_serializer(job).data)
+
+
+class SeatHoldViewSet(viewsets.ModelViewSet):
+    """
+    Time-limited seat holds for checkout:
+    - GET /bookingapi/holds/ : the customer's seat holds, newest first; empty for organisers
+    - POST /bookingapi/holds/ : Holds a seat on an upcoming event for SEAT_HOLD_MINUTES, for customers; 403 for organisers
+    - GET /bookingapi/holds/{id}/ : a hold of the customer
+    - POST /bookingapi/holds/{id}/confirm/ : Turns a live hold into an active booking
+    - POST /bookingapi/holds/{id}/release/ : Gives a live hold's seat back
+    Holds count against capacity while live; unconfirmed holds expire and free their seat.
+    """
+    permission_classes = [IsAuthenticated, IsBookingAttendeeOrEventOrganizer]
+    http_method_names = ['get', 'post', 'head', 'options']
+    serializer_class = SeatHoldSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        if not hasattr(user, 'customer_profile'):
+            return SeatHold.objects.none()
+        return SeatHold.objects.filter(attendee=user.customer_profile).select_related('event')
+
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        """
+        Confirm a hold into a booking.
+        """
+        hold = self.get_object()
+        try:
+            booking = confirm_hold(hold, request.user)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """
+        Release a hold before it expires.
+        """
+        hold = self.get_object()
+        try:
+            release_hold(hold)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(hold).data, status=status.HTTP_200_OK)
+
+
+class EventLotteryViewSet(viewsets.ModelViewSet):
+    """
+    Lottery entry windows for oversubscribed events:
+    - GET /bookingapi/lotteries/ : all lotteries, newest first
+    - POST /bookingapi/lotteries/ : Opens the lottery of an upcoming event, for its organiser; direct bookings of
+      the event are refused until the draw
+    - GET /bookingapi/lotteries/{id}/ : a lottery; its seed is shown once drawn
+    - POST /bookingapi/lotteries/{id}/entry/ : Enters the draw while it is open, for customers; 403 for organisers
+    - GET /bookingapi/lotteries/{id}/entry/ : The customer's entry and its result
+    - POST /bookingapi/lotteries/{id}/draw/ : Draws a closed lottery now, for the event's organiser
+    Closed lotteries are also drawn by manage.py draw_lotteries.
+    """
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+    queryset = EventLottery.objects.select_related('event').all()
+    serializer_class = EventLotterySerializer
+
+    def create(self, request, *args, **kwargs):
+        """
+        Open a lottery and log the action.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lottery = serializer.save()
+        HistoryPoint.log_action(
+            user=request.user,
+            action=HistoryPoint.ACTION_CREATE,
+            obj=lottery,
+            details={
+                'event_id': lottery.event_id,
+                'closes_at': lottery.closes_at.isoformat(),
+                'waitlist_losers': lottery.waitlist_losers
+            }
+        )
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=True, methods=['get', 'post'])
+    def entry(self, request, pk=None):
+        """
+        Enter the draw (POST) or see the customer's entry (GET).
+        """
+        if not hasattr(request.user, 'customer_profile'):
+            return Response({
+                'error': 'Only customers can enter lotteries.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        lottery = self.get_object()
+        customer = request.user.customer_profile
+        if request.method == 'GET':
+            entry = LotteryEntry.objects.filter(lottery=lottery, attendee=customer).first()
+            if entry is None:
+                return Response({'error': 'You have not entered this lottery.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(LotteryEntrySerializer(entry).data)
+        try:
+            entry = enter_lottery(lottery, customer)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(LotteryEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def draw(self, request, pk=None):
+        """
+        Draw a closed lottery; returns the draw's summary.
+        """
+        lottery = self.get_object()
+        organizer = getattr(request.user, 'organizer_profile', None)
+        if organizer is None or lottery.event.creator_id != organizer.id:
+            return Response({
+                'error': 'Only the event\'s organiser can draw its lottery.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        try:
+            summary = draw_lottery(lottery.id)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class WaitlistViewSet(viewsets.ModelViewSet):
+    """
+    Waitlist for full events:
+    - GET /bookingapi/waitlist/ : own waitlist entries for customers; entries for their own events for organizers
+    - POST /bookingapi/waitlist/ : Joins the waitlist of a full event for customers, 403 for organisers
+    - GET /bookingapi/waitlist/{id}/ : Entry's attendee or the event's organiser
+    - DELETE /bookingapi/waitlist/{id}/ : Leaves the waitlist, if entry's attendee and still waiting; 403 for
+      organisers. The entry stays as history with status withdrawn.
+    Waiting customers are promoted to bookings in FIFO order when seats are freed.
+    """
+    permission_classes = [IsAuthenticated, IsBookingAttendeeOrEventOrganizer]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    queryset = WaitlistEntry.objects.select_related('attendee__user', 'event').all()
+    serializer_class = WaitlistEntrySerializer
+
+    def get_queryset(self):
+        if self.action == 'list':
+            user = self.request.user
+            if hasattr(user, 'customer_profile'):
+                return self.queryset.filter(attendee=user.customer_profile)
+            if hasattr(user, 'organizer_profile'):
+                return self.queryset.filter(event__creator=user.organizer_profile)
+            return self.queryset.none()
+        return self.queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        Join a waitlist and log the action.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entry = serializer.save()
+        HistoryPoint.log_action(
+            user=request.user,
+            action=HistoryPoint.ACTION_CREATE,
+            obj=entry,
+            details={
+                'event_id': entry.event.id,
+                'event_title': entry.event.title,
+                'joined_at': entry.joined_at.isoformat()
+            }
+        )
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_destroy(self, instance):
+        """
+        Withdraw a waiting entry and log the action; promoted and withdrawn
+        entries are kept unchanged.
+        """
+        with transaction.atomic():
+            # Guarded so an entry promoted meanwhile is not withdrawn
+            withdrawn = WaitlistEntry.objects.filter(
+                pk=instance.pk, status=WaitlistEntry.STATUS_WAITING
+            ).update(status=WaitlistEntry.STATUS_WITHDRAWN)
+            if not withdrawn:
+                raise ValidationError({'error': 'Only waiting entries can leave the waitlist.'})
+            instance.status = WaitlistEntry.STATUS_WITHDRAWN
+            HistoryPoint.log_action(
+                user=self.request.user,
+                action=HistoryPoint.ACTION_CANCEL,
+                obj=instance,
+                details={
+                    'previous_status': WaitlistEntry.STATUS_WAITING,
+                    'new_status': WaitlistEntry.STATUS_WITHDRAWN,
+                    'event_id': instance.event.id,
+                    'event_title': instance.event.title
+                }
+            )
@@ -0,0 +1,121 @@
+"""
+Batched FIFO promotion of waitlisted customers into bookings.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from events.models import Event
+from user.models import HistoryPoint
+from .admission import closed_reason
+from .conflicts import conflict_check_enabled, conflicting_titles
+from .models import Booking, WaitlistEntry
+
+
+def promote_waitlist(event_id, batch_size=500):
+    """
+    Turn waiting entries of an event into active bookings, oldest first, for as
+    many seats as are free. Entries are taken batch_size at a time, each batch
+    in its own transaction: seats are claimed with one Event.claim_seats call
+    and bookings and history points are written in bulk.
+
+    Promotion follows the rules of direct booking: nothing is promoted while
+    the event takes no bookings (see closed_reason), and customers whose
+    schedule now clashes with the event keep waiting.
+
+    Returns the number of promoted entries.
+    """
+    promoted, after = 0, None
+    while True:
+        count, after = _promote_batch(event_id, batch_size, after)
+        promoted += count
+        if after is None:
+            return promoted
+
+
+def _promote_batch(event_id, batch_size, after):
+    """
+    Promote the batch of waiting entries that follows after, a (joined_at, id)
+    position; the first batch when after is None.
+
+    Returns (promoted count, position of the batch's last entry), the position
+    being None once no seat or waiting entry is left.
+    """
+    with transaction.atomic():
+        waiting = WaitlistEntry.objects.filter(event_id=event_id, status=WaitlistEntry.STATUS_WAITING)
+        if after is not None:
+            # Skipped customers keep waiting; later batches start behind them
+            joined_at, entry_id = after
+            waiting = waiting.filter(Q(joined_at__gt=joined_at) | Q(joined_at=joined_at, id__gt=entry_id))
+        waiting = list(
+            waiting.select_for_update().select_related('attendee__user').order_by('joined_at', 'id')[:batch_size]
+        )
+        if not waiting:
+            return 0, None
+        event = Event.objects.get(pk=event_id)
+        if closed_reason(event):
+            return 0, None
+
+        existing = {
+            booking.attendee_id: booking
+            for booking in Booking.objects.filter(
+                event_id=event_id, attendee_id__in=[entry.attendee_id for entry in waiting]
+            )
+        }
+        # Customers who got a seat some other way leave the waitlist without using one
+        already_booked, candidates = [], []
+        for entry in waiting:
+            booking = existing.get(entry.attendee_id)
+            if booking and booking.status == Booking.STATUS_ACTIVE:
+                already_booked.append(entry)
+            else:
+                candidates.append(entry)
+        if conflict_check_enabled() and candidates:
+            conflicts = conflicting_titles([entry.attendee_id for entry in candidates], event)
+            candidates = [entry for entry in candidates if entry.attendee_id not in conflicts]
+
+        granted = event.claim_seats(len(candidates))
+        promoted = candidates[:granted]
+        # A short batch was the end of the queue; a short grant means the seats ran out
+        last = waiting[-1]
+        after = (last.joined_at, last.id) if len(waiting) == batch_size and granted == len(candidates) else None
+        if not promoted and not already_booked:
+            return 0, after
+
+        reactivated = [existing[entry.attendee_id] for entry in promoted if entry.attendee_id in existing]
+        # The seats were claimed above, so skip Booking.save's per-row claim
+        Booking.objects.filter(id__in=[booking.id for booking in reactivated]).update(
+            status=Booking.STATUS_ACTIVE, updated_at=timezone.now()
+        )
+        for booking in reactivated:
+            booking.status = Booking.STATUS_ACTIVE
+        created = {
+            booking.attendee_id: booking
+            for booking in Booking.objects.bulk_create([
+                Booking(attendee_id=entry.attendee_id, event_id=event_id)
+                for entry in promoted if entry.attendee_id not in existing
+            ])
+        }
+
+        history = []
+        for entry in promoted:
+            booking = existing.get(entry.attendee_id) or created[entry.attendee_id]
+            entry.booking = booking
+            entry.status = WaitlistEntry.STATUS_PROMOTED
+            history.append((
+                entry.attendee.user,
+                HistoryPoint.ACTION_REACTIVATE if entry.attendee_id in existing else HistoryPoint.ACTION_CREATE,
+                booking,
+                {
+                    'event_id': event.id,
+                    'event_title': event.title,
+                    'booking_date': booking.booking_date.isoformat(),
+                    'status': booking.status,
+                    'waitlist_entry_id': entry.id
+                }
+            ))
+        for entry in already_booked:
+            entry.status = WaitlistEntry.STATUS_WITHDRAWN
+        WaitlistEntry.objects.bulk_update(promoted + already_booked, ['status', 'booking'])
+        HistoryPoint.bulk_log_actions(history)
+        return len(promoted), after
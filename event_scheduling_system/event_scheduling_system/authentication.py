@@ -0,0 +1,30 @@
+"""
+Token authentication that loads the user's profiles with the token.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class ProfileTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication joining the customer and organizer profiles.
+
+    Permissions and serializers check hasattr(user, 'customer_profile') and
+    friends on nearly every request; with the profiles joined to the token
+    lookup those checks cost no query, a missing profile included.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related(
+                'user', 'user__customer_profile', 'user__organizer_profile'
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
@@ -0,0 +1,27 @@
+"""
+Which cache aliases every process can rely on.
+
+Events and bookings are written by web processes and also by booking
+workers, the hold sweeper and management commands, each in its own process.
+Caches whose entries must reflect all of those writes (the catalog change
+stamp, listing pages, booked seats of sharded events) are only used when
+their alias is shared; with a process-local backend they are bypassed and
+the database answers instead.
+"""
+from django.conf import settings
+
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared(alias='default'):
+    """
+    Whether the alias's backend is visible to every process.
+
+    A CACHES entry may set 'SHARED' to override the guess from its backend,
+    e.g. True for a single-process deployment without workers.
+    """
+    config = settings.CACHES[alias]
+    return config.get('SHARED', config['BACKEND'] not in PROCESS_LOCAL_BACKENDS)
@@ -0,0 +1,128 @@
+"""
+Conditional GET support: strong ETags computed from version columns and a
+catalog-wide change stamp for Last-Modified, both checked before serialization.
+
+The stamp is only kept when the default cache is shared by all processes
+(see caching.py), as the shipped file-based one is; with a process-local
+cache, writes made by workers and commands would never reach it, so
+responses go without the validators derived from it.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .caching import cache_is_shared
+
+CHANGE_STAMP_KEY = 'catalog:changed-at'
+
+
+def _stamp(key=CHANGE_STAMP_KEY):
+    cache.set(key, time.time_ns(), None)
+
+
+def touch_catalog(key=CHANGE_STAMP_KEY):
+    """
+    Record that events or bookings changed.
+
+    The stamp is set immediately and again on commit, so a response built
+    from pre-commit data in between is not considered current afterwards.
+    Pass key to bump a narrower stamp kept the same way instead.
+    """
+    if not cache_is_shared():
+        return
+    _stamp(key)
+    transaction.on_commit(lambda: _stamp(key))
+
+
+def catalog_changed_at(key=CHANGE_STAMP_KEY):
+    """
+    Nanosecond timestamp of the last recorded change (the first read if none
+    was recorded), or None when the stamp cannot see every process's writes.
+    """
+    if not cache_is_shared():
+        return None
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest())
+
+
+def conditional_response(request, response_factory, etag, last_modified=None):
+    """
+    Return 304 if the request's validators match, else build the response and tag it.
+    """
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+    response = response_factory()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering retrieve and list GETs with ETag validators.
+
+    Subclasses implement object_version(instance), a tuple of cheap values
+    (ids, timestamps, counters) that changes whenever the instance's rendered
+    representation would. A list ETag combines the versions of the page's rows
+    with the paginator's state, so it costs no queries beyond the page itself.
+    List responses also carry Last-Modified from the catalog change stamp.
+    """
+
+    def object_version(self, instance):
+        raise NotImplementedError
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = make_etag(instance._meta.label, request.get_full_path(), *self.object_version(instance))
+        return conditional_response(request, lambda: Response(self.get_serializer(instance).data), etag)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_list(self.filter_queryset(self.get_queryset()))
+
+    def list_rows(self, queryset):
+        """Return (page, rows) for a listing; page is None when the view does not paginate."""
+        page = self.paginate_queryset(queryset)
+        return page, list(queryset) if page is None else page
+
+    def row_version(self, row):
+        return self.object_version(row)
+
+    def render_rows(self, rows, page):
+        serializer = self.get_serializer(rows, many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def conditional_list(self, queryset):
+        """Paginate queryset and serve the page, or 304 if it has not changed."""
+        request = self.request
+        page, rows = self.list_rows(queryset)
+
+        parts = [queryset.model._meta.label, request.user.pk, request.get_full_path()]
+        if page is not None:
+            parts += [self.paginator.get_next_link(), self.paginator.get_previous_link()]
+            django_page = getattr(self.paginator, 'page', None)
+            if hasattr(django_page, 'paginator'):
+                parts.append(django_page.paginator.count)
+        parts += [self.row_version(row) for row in rows]
+
+        last_modified = None
+        changed_at = catalog_changed_at()
+        if changed_at is not None:
+            # Whole seconds only: a second still in progress could see more changes
+            changed_at //= 10 ** 9
+            last_modified = changed_at if time.time() >= changed_at + 1 else None
+
+        return conditional_response(request, lambda: self.render_rows(rows, page), make_etag(*parts), last_modified)
@@ -0,0 +1,91 @@
+"""
+Read-only fast path for list endpoints.
+
+A ValuesSerializer renders rows fetched with values() straight into the JSON
+shape of the corresponding ModelSerializer, without building model instances
+or per-row serializer objects. It is enabled by FAST_LIST_SERIALIZATION.
+"""
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .fieldsets import selected_fields
+
+# Unbound DRF fields reused for their formatting, so output matches the serializers exactly
+format_datetime = serializers.DateTimeField().to_representation
+
+
+def nullable(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+class ValuesSerializer:
+    """
+    Render values() rows as the dicts a ModelSerializer would produce.
+
+    Subclasses define fields as (name, lookups, render) triples in output
+    order; render receives the row dict and returns the field's value.
+    version_lookups are the values() paths version(row) reads.
+    """
+    fields = ()
+    version_lookups = ('id',)
+
+    def __init__(self, selected=None):
+        self.fields = [field for field in self.fields if selected is None or field[0] in selected]
+        self.selected = {name for name, _, _ in self.fields}
+
+    def lookups(self, extra=()):
+        """values() paths needed to render the selected fields, versions and extra keys."""
+        paths = [path for _, lookups, _ in self.fields for path in lookups]
+        paths += list(self.version_lookups) + list(extra)
+        return list(dict.fromkeys(paths))
+
+    def prepare(self, rows):
+        """Hook to load per-page data the rows need, with one query per page at most."""
+
+    def version(self, row):
+        return (row['id'],)
+
+    def to_representation(self, rows):
+        fields = self.fields
+        return [{name: render(row) for name, _, render in fields} for row in rows]
+
+
+class ValuesListMixin:
+    """
+    ViewSet mixin rendering list pages through values_serializer_class.
+
+    Works with ConditionalGetMixin's list plumbing (list_rows, row_version,
+    render_rows); falls back to the regular serializer when the setting is off.
+    """
+    values_serializer_class = None
+    values_serializer = None
+
+    def get_values_serializer(self):
+        if self.values_serializer_class is None or not getattr(settings, 'FAST_LIST_SERIALIZATION', False):
+            return None
+        return self.values_serializer_class(
+            selected_fields(self.request, self.get_serializer_class().Meta.fields)
+        )
+
+    def list_rows(self, queryset):
+        self.values_serializer = self.get_values_serializer()
+        if self.values_serializer is None:
+            return super().list_rows(queryset)
+        # Keyset cursors are built from the ordering columns of each row
+        keys = [name for name, _ in getattr(self.paginator, 'ordering', ())]
+        queryset = queryset.prefetch_related(None).values(*self.values_serializer.lookups(keys))
+        page, rows = super().list_rows(queryset)
+        self.values_serializer.prepare(rows)
+        return page, rows
+
+    def row_version(self, row):
+        if self.values_serializer is None:
+            return super().row_version(row)
+        return self.values_serializer.version(row)
+
+    def render_rows(self, rows, page):
+        if self.values_serializer is None:
+            return super().render_rows(rows, page)
+        data = self.values_serializer.to_representation(rows)
+        return Response(data) if page is None else self.get_paginated_response(data)
@@ -0,0 +1,63 @@
+"""
+Sparse fieldsets: ?fields=a,b keeps only the named fields of a GET response,
+?omit=a,b drops them. The view side prunes the queryset to match, so omitted
+relations are not joined and omitted computed fields are not loaded.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def selected_fields(request, available):
+    """
+    Names from available kept by the request's ?fields= and ?omit=.
+
+    Returns None when the request does not select fields (or is not a GET),
+    meaning every field is rendered. Unknown names are ignored.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = _names(request.query_params.get(FIELDS_PARAM))
+    omit = _names(request.query_params.get(OMIT_PARAM))
+    if not fields and not omit:
+        return None
+    return [name for name in available if (not fields or name in fields) and name not in omit]
+
+
+class SparseFieldsSerializerMixin:
+    """Serializer mixin dropping the fields a GET request did not select."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        kept = selected_fields(self.context.get('request'), list(self.fields))
+        if kept is not None:
+            for name in set(self.fields) - set(kept):
+                self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """
+    ViewSet mixin that loads only what the selected fields render.
+
+    field_querysets lists (field names, callable) pairs; the callable adds the
+    joins or prefetches those fields need and is applied when any of them is
+    selected. deferrable_fields are deferred when not selected.
+    """
+    field_querysets = ()
+    deferrable_fields = ()
+
+    def field_selected(self, name):
+        kept = selected_fields(self.request, self.get_serializer_class().Meta.fields)
+        return kept is None or name in kept
+
+    def prune_queryset(self, queryset):
+        for names, prepare in self.field_querysets:
+            if any(self.field_selected(name) for name in names):
+                queryset = prepare(queryset)
+        deferred = [name for name in self.deferrable_fields if not self.field_selected(name)]
+        return queryset.defer(*deferred) if deferred else queryset
@@ -0,0 +1,122 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A client retrying a POST sends the same Idempotency-Key header; the first
+completed response is kept in the 'idempotency' cache for its TIMEOUT and
+replayed for every repeat without running the view again. While the first
+request is still running, an atomic cache.add() marker makes repeats wait for
+its response instead of racing it through validation and locking.
+
+Keys are scoped to the user and the endpoint. Reusing a key with a different
+body is rejected with 422. Requests ending in an exception or a server error
+are not kept, so they run again when retried.
+
+A retry may reach any process, so keys are only honoured when the cache is
+shared by all of them (see caching.py); with a process-local cache requests
+run as if they carried no key.
+"""
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .caching import cache_is_shared
+
+HEADER = 'Idempotency-Key'
+CACHE_ALIAS = 'idempotency'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+IN_FLIGHT = 'in-flight'
+POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def in_flight_timeout():
+    """Seconds a request may hold its key, and repeats wait for it."""
+    return getattr(settings, 'IDEMPOTENCY_IN_FLIGHT_TIMEOUT', 30)
+
+
+def _cache_key(request, key):
+    digest = hashlib.sha256(f'{request.user.pk}:{request.method}:{request.path}:{key}'.encode('utf-8'))
+    return f'idempotency:{digest.hexdigest()}'
+
+
+def _fingerprint(request):
+    return hashlib.sha256(json.dumps(request.data, cls=JSONEncoder, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _record(fingerprint, response):
+    """Compact stored form of a response: plain JSON, no serializer references."""
+    return {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'body': json.dumps(response.data, cls=JSONEncoder),
+        'location': response.get('Location'),
+    }
+
+
+def _replay(record, fingerprint):
+    if record['fingerprint'] != fingerprint:
+        return Response({
+            'error': f'This {HEADER} was already used with a different request.'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    headers = {REPLAYED_HEADER: 'true'}
+    if record['location']:
+        headers['Location'] = record['location']
+    return Response(json.loads(record['body']), status=record['status'], headers=headers)
+
+
+def idempotent(view_method):
+    """
+    Make a ViewSet write method honour the Idempotency-Key request header.
+
+    Requests without the header, or without a shared cache, run as before.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not cache_is_shared(CACHE_ALIAS):
+            return view_method(self, request, *args, **kwargs)
+
+        cache = _cache()
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+        deadline = time.monotonic() + in_flight_timeout()
+        # Either claim the key or wait for the request holding it to finish
+        while not cache.add(cache_key, IN_FLIGHT, in_flight_timeout()):
+            record = cache.get(cache_key)
+            if isinstance(record, dict):
+                return _replay(record, fingerprint)
+            if time.monotonic() >= deadline:
+                return Response({
+                    'error': f'A request with this {HEADER} is still in progress.'
+                }, status=status.HTTP_409_CONFLICT)
+            time.sleep(POLL_INTERVAL)
+
+        response = None
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        finally:
+            if response is not None and response.status_code < 500:
+                cache.set(cache_key, _record(fingerprint, response))
+            else:
+                # Failed requests release the key for the next attempt
+                cache.delete(cache_key)
+        return response
+
+    return wrapper
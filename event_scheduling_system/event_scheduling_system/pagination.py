@@ -0,0 +1,138 @@
+"""
+Keyset (cursor) pagination that clients opt into next to the default page numbers.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on an ordering's own column values instead of an OFFSET.
+
+    Each page is one range query on the ordering columns (e.g. created_at, id)
+    fetching page_size + 1 rows, and no COUNT(*) is run. Cursors are opaque
+    tokens holding the boundary row's values and the direction.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering, page_size=None):
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.page_size = page_size or settings.REST_FRAMEWORK.get('PAGE_SIZE') or 10
+
+    @classmethod
+    def requested(cls, request):
+        """Whether a request asks for cursor pagination rather than page numbers."""
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get(cls.mode_query_param) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        token = request.query_params.get(self.cursor_query_param)
+        position, backwards = self._decode(token, queryset.model) if token else (None, False)
+
+        ordering = [(name, desc != backwards) for name, desc in self.ordering]
+        queryset = queryset.order_by(*[('-' if desc else '') + name for name, desc in ordering])
+        if position is not None:
+            queryset = queryset.filter(self._beyond(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        self.has_next = has_more if not backwards else True
+        self.has_previous = position is not None if not backwards else has_more
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.page[0], backwards=True)
+
+    def _link(self, row, backwards):
+        # Rows are model instances, or dicts on the values() fast path
+        values = [row[name] if isinstance(row, dict) else getattr(row, name) for name, _ in self.ordering]
+        payload = json.dumps({'p': [self._dump(v) for v in values], 'r': int(backwards)})
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    @staticmethod
+    def _dump(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def _decode(self, token, model):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _beyond(ordering, position):
+        """Rows strictly after position in the given ordering (a lexicographic keyset predicate)."""
+        condition = Q()
+        equal_so_far = Q()
+        for (name, desc), value in zip(ordering, position):
+            condition |= equal_so_far & Q(**{f'{name}__{"lt" if desc else "gt"}': value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+
+class KeysetPaginationMixin:
+    """
+    ViewSet mixin that switches an action to KeysetPagination when the client
+    passes ?pagination=cursor or a cursor; page numbers stay the default.
+
+    keyset_ordering maps action names to the ordering the cursor is keyed on.
+    """
+    keyset_ordering = {}
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            ordering = self.keyset_ordering.get(self.action)
+            if ordering and self.request is not None and KeysetPagination.requested(self.request):
+                self._paginator = KeysetPagination(ordering)
+        return super().paginator
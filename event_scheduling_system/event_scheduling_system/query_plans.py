@@ -0,0 +1,32 @@
+"""
+Query-plan inspection used by the index regression tests.
+"""
+import re
+
+from django.db import connections
+
+# "SCAN events_event" is a full table scan; "SCAN events_event USING INDEX ..." walks an index
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?\S+( AS \S+)?$')
+
+
+def full_table_scans(sql, using='default'):
+    """
+    Return the plan steps of sql that read a whole table without an index.
+
+    Supports SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN with sequential
+    scans disabled, so small test tables do not hide a missing index).
+    Other backends are not inspected and yield no steps.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall() if SQLITE_FULL_SCAN.match(row[-1])]
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute('EXPLAIN ' + sql)
+                return [row[0].strip() for row in cursor.fetchall() if 'Seq Scan' in row[0]]
+            finally:
+                cursor.execute('RESET enable_seqscan')
+    return []
@@ -108,7 +108,8 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # DRF's TokenAuthentication, also loading the user's customer/organizer profiles
+        'event_scheduling_system.authentication.ProfileTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -122,6 +123,98 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Seat reservation strategy for bookings (see bookings/reservations.py):
+# 'conditional_update' claims seats with a guarded UPDATE, 'row_lock' uses select_for_update
+BOOKING_RESERVATION_STRATEGY = 'conditional_update'
+
+# Group-commit admission queue for booking creation (see bookings/admission.py):
+# requests per event are collected for this many milliseconds and applied as one batch.
+# 0 disables the queue.
+BOOKING_ADMISSION_WINDOW_MS = 0
+BOOKING_ADMISSION_MAX_BATCH = 500
+
+# Asynchronous booking submission (see bookings/jobs.py): booking requests are queued in the
+# BookingJob table and answered with 202; run manage.py run_booking_workers to apply them.
+# The same workers send the attendee emails queued by event cancellations.
+BOOKING_ASYNC_SUBMISSION = False
+BOOKING_WORKERS = 2
+BOOKING_JOB_BATCH_SIZE = 100
+# Jobs a worker has held for this many seconds without finishing are claimed again
+BOOKING_JOB_CLAIM_TIMEOUT = 300
+# Longest ?wait= long-poll on a job's status, in seconds
+BOOKING_JOB_MAX_WAIT = 30
+
+# Seat holds (see bookings/holds.py): a held seat counts against capacity for this many
+# minutes, then expires unless confirmed. Run manage.py run_hold_sweeper to expire holds;
+# its fallback range sweep over expiring holds runs every SEAT_HOLD_SWEEP_INTERVAL seconds.
+SEAT_HOLD_MINUTES = 10
+SEAT_HOLD_SWEEP_INTERVAL = 60
+
+# Reject bookings whose event overlaps in time another active booking of the same
+# customer (see bookings/conflicts.py). GET /bookingapi/booking/conflicts/ works either way.
+BOOKING_CONFLICT_CHECK = False
+
+CACHES = {
+    # Files are seen by every process on the host, so the catalog change stamp and listing
+    # pages work out of the box; use e.g. django.core.cache.backends.redis.RedisCache when
+    # processes run on several hosts.
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'default',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Booked seats of sharded events (see events/availability.py). Files are shared by the
+    # processes of one host, but their incr/decr is a read then a write; .redis.RedisCache makes
+    # the write-through atomic. TIMEOUT is the safety net that bounds any drift from the
+    # database. A local-memory backend is only seen by its own process, so it is bypassed.
+    'availability': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'availability',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Responses kept for Idempotency-Key replays (see event_scheduling_system/idempotency.py);
+    # TIMEOUT is how long a key is remembered. The in-flight marker needs an atomic add() seen
+    # by every process, which the database gives: run manage.py createcachetable once.
+    # Keys are ignored with a local-memory backend.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'idempotency_cache',
+        'TIMEOUT': 86400,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+EVENT_AVAILABILITY_CACHE = 'availability'
+
+# Cached listing pages and the change stamp behind Last-Modified (see
+# event_scheduling_system/conditional.py) live in the default cache. Booking workers, the
+# hold sweeper and management commands write from their own processes, so both are only
+# used when that cache is shared by every process (see event_scheduling_system/caching.py),
+# as the file-based default is. With a local-memory alias, set 'SHARED': True only in a
+# single-process deployment.
+#
+# Upcoming/past event listing cache (see events/listing_cache.py): pages are kept until the
+# next start_time/end_time boundary but never longer than this many seconds. 0 disables it.
+EVENT_LISTING_CACHE_TIMEOUT = 3600
+# Longest browser max-age, in seconds, sent with past event pages
+EVENT_PAST_MAX_AGE = 86400
+
+# Booking a whole recurring series books its occurrences up to this many days ahead,
+# unless the request sets 'until' (see bookings/serializers.py SeriesBookingSerializer)
+EVENT_SERIES_BOOKING_HORIZON_DAYS = 90
+
+# Rows fetched per database round trip while streaming iCalendar feeds
+# (see event_scheduling_system/icalendar.py); memory per feed request stays bounded by it
+CALENDAR_FEED_CHUNK_SIZE = 500
+
+# Render event and booking list pages from values() rows instead of model instances
+# (see event_scheduling_system/fast_serializers.py); the JSON is identical
+FAST_LIST_SERIALIZATION = True
+
+# Seconds a request holding an Idempotency-Key may run before repeats with the same key
+# stop waiting for it and get 409 (see event_scheduling_system/idempotency.py)
+IDEMPOTENCY_IN_FLIGHT_TIMEOUT = 30
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Event Scheduling System API',
     'DESCRIPTION': 'API documentation for Event Scheduling System',
@@ -158,3 +251,6 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Tests run against process-local caches (see event_scheduling_system/testing.py)
+TEST_RUNNER = 'event_scheduling_system.testing.TestRunner'
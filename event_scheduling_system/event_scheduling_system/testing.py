@@ -0,0 +1,44 @@
+"""
+Test runner and helpers for the cache configuration.
+
+The shipped caches are file-based, so their entries would outlive each test's
+rolled-back database. Tests run against local-memory caches instead, which
+behave like a deployment whose processes do not share them; share_caches()
+opts a test into caches every process can rely on (see caching.py).
+"""
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+LOCAL_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def local_caches():
+    """A local-memory alias in place of each configured one, keeping its TIMEOUT."""
+    return {
+        alias: {
+            'BACKEND': LOCAL_BACKEND,
+            'LOCATION': f'test-{alias}',
+            **({'TIMEOUT': config['TIMEOUT']} if 'TIMEOUT' in config else {}),
+        }
+        for alias, config in settings.CACHES.items()
+    }
+
+
+def share_caches(test):
+    """Run test as a deployment whose caches every process shares."""
+    shared = {alias: {**config, 'SHARED': True} for alias, config in settings.CACHES.items()}
+    override = override_settings(CACHES=shared)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches_override = override_settings(CACHES=local_caches())
+        self._caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Event
+from .models import Event, EventSeries
 
 
 @admin.register(Event)
@@ -15,12 +15,12 @@ class EventAdmin(admin.ModelAdmin):
         'start_time', 'end_time', 'created_at', 'creator'
     ]
     search_fields = ['title', 'description', 'creator__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['booked_count', 'created_at', 'updated_at']
     date_hierarchy = 'start_time'
     
     fieldsets = (
         ('Event Information', {
-            'fields': ('title', 'description', 'capacity')
+            'fields': ('title', 'description', 'capacity', 'bucket_count', 'booked_count')
         }),
         ('Schedule', {
             'fields': ('start_time', 'end_time')
@@ -38,3 +38,14 @@ class EventAdmin(admin.ModelAdmin):
         """Display available slots in admin."""
         return obj.available_slots
     available_slots.short_description = 'Available Slots'
+
+
+@admin.register(EventSeries)
+class EventSeriesAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for EventSeries model.
+    """
+    list_display = ['template', 'frequency', 'interval', 'weekdays', 'count', 'until', 'created_at']
+    list_filter = ['frequency', 'created_at']
+    search_fields = ['template__title']
+    raw_id_fields = ['template']
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        from .search import install_search_index
+        # The full-text index is not a model, so it is created after the app's tables
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,65 @@
+"""
+Cache of booked seats per sharded event.
+
+Sharded events spread their booked seats over CapacityBucket rows, so knowing
+their availability without the buckets prefetched costs a query. This cache
+keeps the total per event ID in the CACHES alias named by
+EVENT_AVAILABILITY_CACHE; pick its backend there (local memory, file-based or
+Redis). Committed seat changes are written through with incr/decr, and the
+alias TIMEOUT bounds how long any drift can survive.
+
+Booking workers and the hold sweeper change seats from their own processes,
+so a process-local alias is bypassed and every read goes to the buckets.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from event_scheduling_system.caching import cache_is_shared
+
+
+def _alias():
+    return getattr(settings, 'EVENT_AVAILABILITY_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def _key(event_id):
+    return f'events:booked-seats:{event_id}'
+
+
+def get_booked_seats(event_id, load):
+    """Return an event's cached booked seats, calling load() and caching the result on a miss."""
+    if not cache_is_shared(_alias()):
+        return load()
+    cache = _cache()
+    booked = cache.get(_key(event_id))
+    if booked is None:
+        booked = load()
+        # add() so a write-through that landed meanwhile is not overwritten
+        cache.add(_key(event_id), booked)
+    return booked
+
+
+def record_seat_change(event_id, delta):
+    """Write a seat change through to the cache once the transaction commits."""
+    if not cache_is_shared(_alias()):
+        return
+
+    def apply():
+        try:
+            _cache().incr(_key(event_id), delta)
+        except ValueError:
+            # Not cached; the next read loads the committed value
+            pass
+    transaction.on_commit(apply)
+
+
+def forget_booked_seats(event_id):
+    """Drop an event's cached value, now and again on commit."""
+    if not cache_is_shared(_alias()):
+        return
+    _cache().delete(_key(event_id))
+    transaction.on_commit(lambda: _cache().delete(_key(event_id)))
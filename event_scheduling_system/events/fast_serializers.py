@@ -0,0 +1,83 @@
+from django.db.models import Sum
+
+from event_scheduling_system.fast_serializers import ValuesSerializer, format_datetime, nullable
+from .models import CapacityBucket
+
+_datetime = nullable(format_datetime)
+_text = nullable(str)
+
+CREATOR_LOOKUPS = (
+    'creator_id', 'creator__user_id', 'creator__user__username', 'creator__user__email',
+    'creator__user__first_name', 'creator__user__last_name', 'creator__organization_name',
+    'creator__business_address', 'creator__created_at', 'creator__updated_at',
+)
+
+
+def _creator(row):
+    return {
+        'id': row['creator_id'],
+        'user': {
+            'id': row['creator__user_id'],
+            'username': row['creator__user__username'],
+            'email': row['creator__user__email'],
+            'first_name': row['creator__user__first_name'],
+            'last_name': row['creator__user__last_name'],
+        },
+        'organization_name': row['creator__organization_name'],
+        'business_address': row['creator__business_address'],
+        'created_at': _datetime(row['creator__created_at']),
+        'updated_at': _datetime(row['creator__updated_at']),
+    }
+
+
+class EventValuesSerializer(ValuesSerializer):
+    """values() counterpart of EventSerializer for list pages."""
+    SEAT_LOOKUPS = ('capacity', 'booked_count', 'booking_version', 'bucket_count')
+
+    fields = (
+        ('id', ('id',), lambda row: row['id']),
+        ('title', ('title',), lambda row: _text(row['title'])),
+        ('description', ('description',), lambda row: _text(row['description'])),
+        ('start_time', ('start_time',), lambda row: _datetime(row['start_time'])),
+        ('end_time', ('end_time',), lambda row: _datetime(row['end_time'])),
+        ('capacity', ('capacity',), lambda row: row['capacity']),
+        ('bucket_count', ('bucket_count',), lambda row: row['bucket_count']),
+        ('available_slots', SEAT_LOOKUPS, lambda row: row['_available_slots']),
+        ('is_full', SEAT_LOOKUPS, lambda row: row['_available_slots'] <= 0),
+        ('creator', CREATOR_LOOKUPS, _creator),
+        ('series', ('series_id',), lambda row: row['series_id']),
+        ('cancelled_at', ('cancelled_at',), lambda row: _datetime(row['cancelled_at'])),
+        ('created_at', ('created_at',), lambda row: _datetime(row['created_at'])),
+        ('updated_at', ('updated_at',), lambda row: _datetime(row['updated_at'])),
+    )
+    version_lookups = ('id', 'updated_at')
+
+    def prepare(self, rows):
+        """Compute availability, summing the capacity buckets of sharded events in one query."""
+        if not self.selected & {'available_slots', 'is_full'}:
+            return
+        sharded = [row['id'] for row in rows if row['bucket_count']]
+        buckets = {}
+        if sharded:
+            buckets = {
+                item['event_id']: item
+                for item in CapacityBucket.objects.filter(event_id__in=sharded).values('event_id').annotate(
+                    booked=Sum('booked_count'), version=Sum('version')
+                ).order_by()
+            }
+        for row in rows:
+            booked, version = row['booked_count'], row['booking_version']
+            if row['bucket_count']:
+                bucket = buckets.get(row['id'], {'booked': 0, 'version': 0})
+                booked, version = bucket['booked'], version + bucket['version']
+            row['_available_slots'] = max(0, row['capacity'] - booked)
+            row['_seat_version'] = version
+
+    def version(self, row):
+        # Mirrors EventViewSet.object_version for the selected fields
+        version = [row['id'], row['updated_at'].isoformat()]
+        if 'creator' in self.selected:
+            version.append(row['creator__updated_at'].isoformat())
+        if self.selected & {'available_slots', 'is_full'}:
+            version.append(row['_seat_version'])
+        return version
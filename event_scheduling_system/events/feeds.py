@@ -0,0 +1,47 @@
+"""
+iCalendar feed of an organizer's events, addressed by the secret key of
+their CalendarFeed (GET /eventapi/calendar/{key}.ics).
+"""
+from django.http import Http404
+from django.views.decorators.http import require_safe
+
+from event_scheduling_system.icalendar import calendar_response, feed_chunk_size, vevent
+from user.models import CalendarFeed
+from .models import Event
+
+# values() paths a feed VEVENT is rendered from
+FEED_FIELDS = ('id', 'title', 'description', 'start_time', 'end_time', 'updated_at', 'cancelled_at')
+
+
+def event_component(row, host):
+    return vevent(
+        uid=f"event-{row['id']}@{host}",
+        start=row['start_time'],
+        end=row['end_time'],
+        summary=row['title'],
+        stamp=row['updated_at'],
+        description=row['description'],
+        # Calendar clients drop or strike out cancelled events instead of keeping them scheduled
+        status='CANCELLED' if row['cancelled_at'] else None,
+    )
+
+
+def feed_user(key, profile):
+    """The user owning feed key, if they have the given profile; 404 otherwise."""
+    feed = CalendarFeed.objects.select_related(f'user__{profile}').filter(key=key).first()
+    if feed is None or not hasattr(feed.user, profile):
+        raise Http404('Unknown calendar feed.')
+    return feed.user
+
+
+@require_safe
+def organizer_calendar(request, key):
+    organizer = feed_user(key, 'organizer_profile').organizer_profile
+    events = Event.objects.filter(creator=organizer).order_by('start_time', 'id')
+    rows = events.values(*FEED_FIELDS).iterator(chunk_size=feed_chunk_size())
+    host = request.get_host()
+    components = (event_component(row, host) for row in rows)
+    return calendar_response(
+        request, f'{organizer.organization_name} events', components, 'events', key, organizer.updated_at,
+        content_rows=events.values_list(*FEED_FIELDS),
+    )
@@ -0,0 +1,117 @@
+"""
+Streaming bulk import of events from CSV or NDJSON.
+
+Rows are read lazily from the uploaded stream, validated in chunks with
+EventSerializer, inserted with bulk_create and logged with one bulk insert of
+history points per chunk, so memory stays flat whatever the file size.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from user.models import HistoryPoint
+from .listing_cache import invalidate_event_listings
+from .models import CapacityBucket, Event
+from .search import index_events
+from .serializers import EventSerializer
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('title', 'description', 'start_time', 'end_time', 'capacity', 'bucket_count')
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(filename, requested=None):
+    """Pick the import format from an explicit choice or the file extension."""
+    if requested:
+        return requested if requested in IMPORT_FORMATS else None
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield (row_number, row) pairs from a binary stream without reading it whole.
+
+    A malformed NDJSON line yields its error message as a string instead of a dict.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, {key: value for key, value in row.items() if key in IMPORT_FIELDS and value != ''}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield number, 'Each line must be a JSON object.'
+            continue
+        yield number, {key: value for key, value in row.items() if key in IMPORT_FIELDS}
+
+
+def import_events(rows, organizer, user, chunk_size=500):
+    """
+    Validate and insert events for an organizer, chunk by chunk.
+
+    Returns a summary with the created and failed row counts and up to
+    MAX_REPORTED_ERRORS per-row errors.
+    """
+    summary = {'created': 0, 'failed': 0, 'errors': []}
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return summary
+        valid = []
+        for number, row in chunk:
+            errors = row if isinstance(row, str) else None
+            if errors is None:
+                serializer = EventSerializer(data=row)
+                if serializer.is_valid():
+                    event = Event(creator=organizer, **serializer.validated_data)
+                    try:
+                        # Model rules without full_clean's per-row creator lookup
+                        event.clean()
+                    except ValidationError as e:
+                        errors = e.message_dict
+                    else:
+                        valid.append(event)
+                        continue
+                else:
+                    errors = serializer.errors
+            summary['failed'] += 1
+            if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                summary['errors'].append({'row': number, 'errors': errors})
+
+        with transaction.atomic():
+            created = Event.objects.bulk_create(valid)
+            for event in created:
+                if event.bucket_count:
+                    CapacityBucket.rebuild(event.pk, event.bucket_count, event.capacity, 0)
+            HistoryPoint.bulk_log_actions(
+                (user, HistoryPoint.ACTION_CREATE, event, {
+                    'title': event.title,
+                    'start_time': event.start_time.isoformat(),
+                    'end_time': event.end_time.isoformat(),
+                    'capacity': event.capacity,
+                    'creator_id': organizer.id,
+                    'imported': True
+                })
+                for event in created
+            )
+            if created:
+                invalidate_event_listings()
+                index_events(created)
+        summary['created'] += len(created)
@@ -0,0 +1,88 @@
+"""
+Time-aware cache for the upcoming and past event listings.
+
+A cached page stays valid until the next moment its result set can change on
+its own: the earliest future start_time for upcoming, the earliest end_time
+not yet reached for past. Writes to events (including seat counts) bump the
+catalog change stamp, which is part of every upcoming key, so stale pages are
+never read. Past keys use their own stamp, bumped only by writes that can
+change a past page (see invalidate_event_listings), so booking traffic on
+upcoming events leaves them cached.
+The cache is off unless the default cache is shared by all processes, as the
+stamp is.
+"""
+import hashlib
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+
+from event_scheduling_system.caching import cache_is_shared
+from event_scheduling_system.conditional import CHANGE_STAMP_KEY, catalog_changed_at, make_etag, touch_catalog
+from .models import Event
+
+# Tier -> (time field whose crossing changes the result set, lookup for events not yet crossed)
+LISTING_TIERS = {
+    'upcoming': ('start_time', 'start_time__gt'),
+    'past': ('end_time', 'end_time__gte'),
+}
+
+
+PAST_CHANGE_STAMP_KEY = 'catalog:past-changed-at'
+
+
+def invalidate_event_listings(past=True):
+    """
+    Make cached upcoming pages unreachable, and past pages too unless past is False.
+
+    Callers pass past=False only for writes to events that have not ended and
+    whose end_time is unchanged: those rows are in no past page yet, and any
+    cached past page expires before they could enter it.
+    """
+    touch_catalog()
+    if past:
+        touch_catalog(PAST_CHANGE_STAMP_KEY)
+
+
+def listing_cache_enabled():
+    return getattr(settings, 'EVENT_LISTING_CACHE_TIMEOUT', 0) > 0 and cache_is_shared()
+
+
+def listing_key(tier, request):
+    generation = catalog_changed_at(PAST_CHANGE_STAMP_KEY if tier == 'past' else CHANGE_STAMP_KEY)
+    uri = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f'events:listing:{tier}:{generation}:{uri}'
+
+
+def next_boundary(tier, now):
+    """The earliest moment after now at which the tier's result set changes by itself."""
+    field, lookup = LISTING_TIERS[tier]
+    return Event.objects.filter(**{lookup: now}).aggregate(boundary=Min(field))['boundary']
+
+
+def get_listing(key, now):
+    """Return (data, expires_at) of a cached page still valid at now, or None."""
+    entry = cache.get(key)
+    if entry is None or entry['expires_at'] <= now:
+        return None
+    return entry['data'], entry['expires_at']
+
+
+def store_listing(key, data, now, boundary):
+    """Cache a page until boundary, or for EVENT_LISTING_CACHE_TIMEOUT if that is sooner."""
+    timeout = settings.EVENT_LISTING_CACHE_TIMEOUT
+    if boundary is not None:
+        timeout = min(timeout, math.ceil((boundary - now).total_seconds()))
+    expires_at = now + timedelta(seconds=timeout)
+    if boundary is not None:
+        expires_at = min(expires_at, boundary)
+    if timeout > 0:
+        cache.set(key, {'data': data, 'expires_at': expires_at}, timeout)
+    return expires_at
+
+
+def listing_etag(key, expires_at):
+    """Validator of a cached page: changes with the tier's stamp, the URI and the time tier."""
+    return make_etag(key, expires_at.timestamp())
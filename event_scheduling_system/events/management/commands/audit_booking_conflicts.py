@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from bookings.conflicts import audit_conflicts
+
+
+class Command(BaseCommand):
+    """
+    Report every customer whose active bookings overlap in time.
+
+    Active bookings are streamed once, ordered by customer and event start,
+    and each customer's bookings are swept in memory, so the audit is one
+    query regardless of the number of customers.
+    """
+    help = 'List customers with overlapping active bookings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Rows fetched per database round trip (default: 2000).'
+        )
+
+    def handle(self, *args, **options):
+        customers = conflicts = 0
+        for attendee_id, pairs in audit_conflicts(chunk_size=options['chunk_size']):
+            customers += 1
+            conflicts += len(pairs)
+            for first, second in pairs:
+                self.stdout.write(
+                    f"customer {attendee_id}: booking {first['id']} (event {first['event_id']}) "
+                    f"overlaps booking {second['id']} (event {second['event_id']})"
+                )
+        self.stdout.write(f'{conflicts} conflicting booking pair(s) across {customers} customer(s).')
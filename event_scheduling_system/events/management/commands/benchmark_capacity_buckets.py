@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from events.models import Event
+from user.models import Organizer
+
+
+class Command(BaseCommand):
+    """
+    Measure seat-claim throughput on one hot event for several bucket counts.
+
+    Every worker thread uses its own database connection and claims seats
+    on the same event, so the numbers show how much sharding the capacity
+    reduces row contention. Run it against the production database engine;
+    SQLite serializes all writers and hides the difference. The scratch
+    organizer and events are deleted afterwards.
+    """
+    help = 'Benchmark concurrent seat claims on one event with 1, 8 and 64 capacity buckets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--buckets', type=int, nargs='+', default=[1, 8, 64],
+            help='Bucket counts to compare; 0 claims from the event row itself (default: 1 8 64).'
+        )
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent worker threads (default: 16).')
+        parser.add_argument('--claims', type=int, default=2000, help='Seats claimed per run (default: 2000).')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        claims_per_worker = max(1, options['claims'] // workers)
+        user = User.objects.create_user(username=f'bucket-benchmark-{time.time_ns()}')
+        organizer = Organizer.objects.create(
+            user=user, organization_name='Bucket benchmark', business_address='-'
+        )
+        try:
+            self.stdout.write(f'{"buckets":>8} {"seconds":>9} {"claims/s":>10} {"claimed":>8} {"errors":>7}')
+            for bucket_count in options['buckets']:
+                capacity = workers * claims_per_worker
+                event = Event.objects.create(
+                    title=f'Bucket benchmark ({bucket_count})',
+                    start_time=timezone.now() + timedelta(days=1),
+                    end_time=timezone.now() + timedelta(days=1, hours=1),
+                    capacity=capacity,
+                    bucket_count=bucket_count,
+                    creator=organizer,
+                )
+                claimed, errors, elapsed = self._run(event.pk, workers, claims_per_worker)
+                event.refresh_from_db()
+                rate = claimed / elapsed if elapsed else 0
+                self.stdout.write(
+                    f'{bucket_count:>8} {elapsed:>9.3f} {rate:>10.0f} {claimed:>8} {errors:>7}'
+                )
+                if event.booked_seats != claimed:
+                    self.stderr.write(f'Counter mismatch: {event.booked_seats} booked, {claimed} claimed.')
+        finally:
+            user.delete()
+
+    def _run(self, event_id, workers, claims_per_worker):
+        results = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(workers + 1)
+
+        def worker():
+            claimed = errors = 0
+            start_barrier.wait()
+            try:
+                event = Event.objects.get(pk=event_id)
+                for _ in range(claims_per_worker):
+                    try:
+                        claimed += event.claim_seat()
+                    except DatabaseError:
+                        errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    results.append((claimed, errors))
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        start_barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return sum(r[0] for r in results), sum(r[1] for r in results), elapsed
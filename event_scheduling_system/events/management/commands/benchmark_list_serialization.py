@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookings.fast_serializers import BookingValuesSerializer
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+from events.fast_serializers import EventValuesSerializer
+from events.models import Event
+from events.serializers import EventSerializer
+from user.models import Customer, Organizer
+
+
+class Command(BaseCommand):
+    """
+    Compare list serialization throughput of the ModelSerializer path and the
+    values() fast path (FAST_LIST_SERIALIZATION) for events and bookings.
+
+    Each pass fetches and renders the same rows the way the list endpoints do;
+    the reported rate includes the queries. Half of the scratch events are
+    sharded so the bucket lookups are exercised too. The scratch organizer,
+    customer, events and bookings are deleted afterwards.
+    """
+    help = 'Benchmark rows/sec of instance-based and values()-based list serialization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Events and bookings to create (default: 1000).')
+        parser.add_argument('--repeat', type=int, default=5, help='Passes per path; the best is reported (default: 5).')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        stamp = time.time_ns()
+        organizer_user = User.objects.create_user(username=f'list-benchmark-organizer-{stamp}')
+        customer_user = User.objects.create_user(username=f'list-benchmark-customer-{stamp}')
+        try:
+            organizer = Organizer.objects.create(
+                user=organizer_user, organization_name='List benchmark', business_address='-'
+            )
+            customer = Customer.objects.create(user=customer_user)
+            start = timezone.now() + timedelta(days=1)
+            for i in range(rows):
+                Event.objects.create(
+                    title=f'List benchmark {i}',
+                    description='Benchmark event',
+                    start_time=start + timedelta(minutes=i),
+                    end_time=start + timedelta(minutes=i, hours=1),
+                    capacity=10,
+                    bucket_count=i % 2 and 2,
+                    creator=organizer,
+                )
+            events = Event.objects.filter(creator=organizer)
+            Booking.objects.bulk_create(Booking(attendee=customer, event_id=pk) for pk in events.values_list('pk', flat=True))
+            bookings = Booking.objects.filter(attendee=customer)
+
+            def events_instances():
+                queryset = events.select_related('creator__user').prefetch_related('capacity_buckets')
+                return EventSerializer(queryset, many=True).data
+
+            def events_values():
+                serializer = EventValuesSerializer()
+                values = list(events.values(*serializer.lookups()))
+                serializer.prepare(values)
+                return serializer.to_representation(values)
+
+            def bookings_instances():
+                return BookingSerializer(bookings, many=True).data
+
+            def bookings_values():
+                serializer = BookingValuesSerializer()
+                return serializer.to_representation(bookings.values(*serializer.lookups()))
+
+            self.stdout.write(f'{"list":>9} {"path":>10} {"seconds":>9} {"rows/s":>10}')
+            for name, instance_path, values_path in (
+                ('events', events_instances, events_values),
+                ('bookings', bookings_instances, bookings_values),
+            ):
+                if list(instance_path()) != values_path():
+                    self.stderr.write(f'Output mismatch between the {name} paths.')
+                for path, render in (('instances', instance_path), ('values', values_path)):
+                    elapsed = min(self._time(render) for _ in range(repeat))
+                    rate = rows / elapsed if elapsed else 0
+                    self.stdout.write(f'{name:>9} {path:>10} {elapsed:>9.3f} {rate:>10.0f}')
+        finally:
+            organizer_user.delete()
+            customer_user.delete()
+
+    def _time(self, render):
+        started = time.perf_counter()
+        render()
+        return time.perf_counter() - started
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from bookings.lottery import draw_closed_lotteries
+
+
+class Command(BaseCommand):
+    """
+    Draw every event lottery whose entry window has closed (see
+    bookings/lottery.py). Run it periodically, e.g. every minute from cron.
+
+    Each draw is one transaction with a single seat claim and bulk writes,
+    however many customers entered.
+    """
+    help = 'Draw winners of event lotteries whose entry window has closed.'
+
+    def handle(self, *args, **options):
+        drawn = 0
+        for summary in draw_closed_lotteries():
+            drawn += 1
+            self.stdout.write(
+                f"Lottery {summary['lottery']}: {summary['winners']} winner(s) of {summary['entries']} "
+                f"entr{'y' if summary['entries'] == 1 else 'ies'}, {summary['waitlisted']} waitlisted "
+                f"(seed {summary['seed']})."
+            )
+        self.stdout.write(f'Drew {drawn} lotter{"y" if drawn == 1 else "ies"}.')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.importer import IMPORT_FORMATS, detect_format, import_events, iter_rows
+from user.models import Organizer
+
+
+class Command(BaseCommand):
+    """
+    Import events for an organizer from a CSV or NDJSON file, streaming it in chunks.
+    """
+    help = 'Bulk import events from a CSV or NDJSON file for an organizer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument('--organizer', required=True, help='Username of the organizer creating the events.')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='File format (default: from the extension).')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Rows validated and inserted per batch (default: 500).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            organizer = Organizer.objects.select_related('user').get(user__username=options['organizer'])
+        except Organizer.DoesNotExist:
+            raise CommandError(f"No organizer with username {options['organizer']!r}.")
+        fmt = detect_format(options['path'], options['format'])
+        if fmt is None:
+            raise CommandError('Cannot tell the file format; pass --format.')
+
+        with open(options['path'], 'rb') as stream:
+            summary = import_events(
+                iter_rows(stream, fmt), organizer=organizer, user=organizer.user,
+                chunk_size=options['chunk_size']
+            )
+
+        for error in summary['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created']} events, {summary['failed']} rows failed."
+        ))
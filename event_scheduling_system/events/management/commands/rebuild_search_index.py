@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from events.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+    Create the event full-text index if needed and, on SQLite, re-fill it.
+
+    The SQLite FTS5 table is kept in sync by Event.save/delete and the
+    importer; writes that bypass them (queryset updates, cascading deletes)
+    leave it stale until this runs. PostgreSQL maintains its GIN index itself.
+    """
+    help = 'Create and rebuild the full-text index used by event search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias (default: default).')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        install_search_index(using=using)
+        with transaction.atomic(using=using):
+            indexed = rebuild_search_index(using=using)
+        if connections[using].vendor == 'sqlite':
+            self.stdout.write(f'Indexed {indexed} events.')
+        else:
+            self.stdout.write('The search index is maintained by the database.')
@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from events.availability import forget_booked_seats
+from events.listing_cache import invalidate_event_listings
+from events.models import CapacityBucket, Event
+
+
+class Command(BaseCommand):
+    """
+    Rebuild Event.booked_count (or the capacity buckets of sharded events)
+    from the active bookings and live seat holds and report any drift.
+
+    The counter is maintained by Booking.save/delete/cancel, but bulk queryset
+    deletes and cascades (e.g. deleting a customer) bypass those hooks.
+    """
+    help = 'Rebuild booked seat counters from active bookings and seat holds, in chunks, and report drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of events to reconcile per transaction (default: 500).'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report drift, do not update any counters.'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        checked = drifted = overbooked = 0
+        last_id = 0
+
+        while True:
+            with transaction.atomic():
+                # Lock the chunk so concurrent bookings cannot move the counters mid-rebuild
+                chunk = list(
+                    Event.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', 'capacity', 'booked_count', 'bucket_count')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                last_id = chunk[-1][0]
+                chunk_ids = [row[0] for row in chunk]
+                actual_counts = dict(
+                    Event.objects.filter(id__in=chunk_ids)
+                    .annotate(active=Count('bookings', filter=Q(bookings__status='active')))
+                    .values_list('id', 'active')
+                )
+                # Live seat holds take seats too
+                for event_id, held in (
+                    Event.objects.filter(id__in=chunk_ids, seat_holds__status='held')
+                    .annotate(held=Count('seat_holds')).values_list('id', 'held')
+                ):
+                    actual_counts[event_id] = actual_counts.get(event_id, 0) + held
+                bucket_counts = dict(
+                    CapacityBucket.objects.filter(event_id__in=chunk_ids)
+                    .values('event_id').annotate(booked=Sum('booked_count'))
+                    .values_list('event_id', 'booked')
+                )
+
+                to_update = []
+                fixed_ids = []
+                for event_id, capacity, booked_count, bucket_count in chunk:
+                    checked += 1
+                    actual = actual_counts.get(event_id, 0)
+                    if bucket_count:
+                        booked_count = bucket_counts.get(event_id, 0)
+                    if actual == booked_count:
+                        continue
+                    drifted += 1
+                    if actual > capacity:
+                        overbooked += 1
+                        self.stderr.write(
+                            f'Event #{event_id}: {actual} active bookings and holds exceed capacity {capacity}; '
+                            f'counter left at {booked_count}.'
+                        )
+                        continue
+                    self.stdout.write(f'Event #{event_id}: booked_count {booked_count} -> {actual}')
+                    fixed_ids.append(event_id)
+                    if bucket_count and not dry_run:
+                        CapacityBucket.rebuild(event_id, bucket_count, capacity, actual)
+                        forget_booked_seats(event_id)
+                    elif not bucket_count:
+                        to_update.append(Event(id=event_id, booked_count=actual))
+
+                if to_update and not dry_run:
+                    Event.objects.bulk_update(to_update, ['booked_count'], batch_size=chunk_size)
+                if fixed_ids and not dry_run:
+                    # Availability changed, so conditional GETs must see a new version
+                    Event.objects.filter(id__in=fixed_ids).update(booking_version=F('booking_version') + 1)
+
+        if drifted and not dry_run:
+            invalidate_event_listings()
+
+        verb = 'would be fixed' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} events: {drifted - overbooked} counters {verb}, '
+            f'{overbooked} overbooked events need attention.'
+        ))
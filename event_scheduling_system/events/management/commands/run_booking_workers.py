@@ -0,0 +1,59 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bookings.jobs import run_worker
+
+
+class Command(BaseCommand):
+    """
+    Run a pool of booking worker processes draining asynchronously submitted
+    bookings (see bookings/jobs.py).
+
+    Each worker claims a batch of the oldest jobs, applies them one event at a
+    time and sleeps for the poll interval only when the queue is empty. Workers
+    also send the attendee emails queued by event cancellations.
+    """
+    help = 'Process queued booking jobs with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'BOOKING_WORKERS', 2),
+            help='Number of worker processes (default: BOOKING_WORKERS). 1 runs in this process.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'BOOKING_JOB_BATCH_SIZE', 100),
+            help='Jobs claimed per batch (default: BOOKING_JOB_BATCH_SIZE).'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to sleep when the queue is empty (default: 1).'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs.'
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+        if options['workers'] <= 1:
+            run_worker(*worker_args)
+            return
+        # Forked children inherit the loaded project but must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_worker, args=worker_args, daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} booking worker(s).")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookings.holds import HoldSweeper
+
+
+class Command(BaseCommand):
+    """
+    Expire seat holds as they fall due and give their seats back (see
+    bookings/holds.py).
+
+    Runs as a long-lived worker keeping a min-heap of upcoming expiries, with a
+    periodic range sweep over the live holds' expires_at index as a fallback.
+    --once runs only the range sweep and exits, for cron.
+    """
+    help = 'Expire due seat holds, continuously or with a single range sweep.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run one range sweep and exit.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Holds expired per transaction (default: 1000).'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Longest sleep between looking for new holds, in seconds (default: 1).'
+        )
+        parser.add_argument(
+            '--sweep-interval', type=float, default=getattr(settings, 'SEAT_HOLD_SWEEP_INTERVAL', 60),
+            help='Seconds between fallback range sweeps (default: SEAT_HOLD_SWEEP_INTERVAL).'
+        )
+
+    def handle(self, *args, **options):
+        sweeper = HoldSweeper(batch_size=options['batch_size'])
+        if options['once']:
+            self.stdout.write(f"Expired {sweeper.sweep()} seat hold(s).")
+            return
+        sweeper.run(poll_interval=options['poll_interval'], sweep_interval=options['sweep_interval'])
@@ -27,8 +27,8 @@ class IsEventCreatorOrCustomerReadOnly(permissions.BasePermission):
 		# Read: customers can read all; organizers only their own
 		if request.method in permissions.SAFE_METHODS:
 			if hasattr(request.user, 'organizer_profile'):
-				return obj.creator == request.user.organizer_profile
+				return obj.creator_id == request.user.organizer_profile.id
 			return True  # customers (and non-organizer users) can read all
 
 		# Write: only organizer-creator
-		return hasattr(request.user, 'organizer_profile') and obj.creator == request.user.organizer_profile
+		return hasattr(request.user, 'organizer_profile') and obj.creator_id == request.user.organizer_profile.id
@@ -0,0 +1,137 @@
+"""
+Full-text search over event titles and descriptions.
+
+The index is the database's own inverted index:
+
+- SQLite: an FTS5 table (porter stemming, prefix indexes for autocomplete)
+  holding a copy of each event's text, kept in sync by Event.save/delete and
+  the importer. rebuild_search_index repairs it after writes that bypass
+  those hooks (queryset updates, cascading deletes of organizers).
+- PostgreSQL: a GIN index over the weighted tsvector expression, which the
+  database maintains itself on every write.
+
+Both indexes are installed after migrate. Every word of a query must match;
+results are ranked by relevance with title matches weighted above
+description matches. On other databases search falls back to unranked
+icontains filters.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Event
+
+FTS_TABLE = 'events_event_fts'
+PG_INDEX = 'event_search_idx'
+PG_CONFIG = 'english'
+# Relevance weight of a title match relative to a description match
+TITLE_WEIGHT = 10.0
+MAX_TERMS = 8
+
+_WORD = re.compile(r'\w+')
+
+
+def search_terms(text):
+    """Lowercased words of a query, without any query syntax."""
+    return _WORD.findall((text or '').lower())[:MAX_TERMS]
+
+
+def _vendor(queryset):
+    return connections[queryset.db].vendor
+
+
+def search_events(queryset, text, prefix=False):
+    """
+    Filter queryset to events matching every word of text, best match first.
+
+    With prefix=True the last word also matches longer words (autocomplete).
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+    vendor = _vendor(queryset)
+    if vendor == 'sqlite':
+        expression = ' '.join(f'"{term}"' for term in terms) + ('*' if prefix else '')
+        # extra() joins the FTS table on its rowid, which the ORM cannot express
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {Event._meta.db_table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[expression],
+        ).order_by(RawSQL(f'bm25({FTS_TABLE}, %s, 1.0)', (TITLE_WEIGHT,)), 'id')
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        tsquery = ' & '.join(f"'{term}'" for term in terms) + (':*' if prefix else '')
+        query = SearchQuery(tsquery, search_type='raw', config=PG_CONFIG)
+        vector = _pg_vector()
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).order_by(
+            SearchRank(vector, query).desc(), 'id'
+        )
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition).order_by('id')
+
+
+def _pg_vector():
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', weight='A', config=PG_CONFIG)
+        + SearchVector('description', weight='B', config=PG_CONFIG)
+    )
+
+
+def index_events(events, using='default'):
+    """Add or refresh events in the SQLite index; PostgreSQL keeps its index itself."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not events:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(event.pk,) for event in events])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+            [(event.pk, event.title, event.description or '') for event in events],
+        )
+
+
+def unindex_event(event_id, using='default'):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [event_id])
+
+
+def rebuild_search_index(using='default'):
+    """Re-fill the SQLite index from the events table. Returns the number of indexed events."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+            f"SELECT id, title, COALESCE(description, '') FROM {Event._meta.db_table}"
+        )
+        return cursor.rowcount
+
+
+def install_search_index(using='default', **kwargs):
+    """post_migrate hook creating the search index if it is missing."""
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        if FTS_TABLE in connection.introspection.table_names():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"title, description, tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        rebuild_search_index(using)
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Event._meta.db_table)
+        if PG_INDEX not in constraints:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.add_index(Event, GinIndex(_pg_vector(), name=PG_INDEX))
@@ -1,9 +1,11 @@
 from rest_framework import serializers
-from .models import Event
+from django.db import transaction
+from event_scheduling_system.fieldsets import SparseFieldsSerializerMixin
+from .models import Event, EventSeries
 from user.serializers import OrganizerSerializer
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for Event model."""
     
     creator = OrganizerSerializer(read_only=True)
@@ -14,9 +16,10 @@ class EventSerializer(serializers.ModelSerializer):
         model = Event
         fields = [
             'id', 'title', 'description', 'start_time', 'end_time',
-            'capacity', 'available_slots', 'is_full', 'creator', 'created_at', 'updated_at'
+            'capacity', 'bucket_count', 'available_slots', 'is_full', 'creator',
+            'series', 'cancelled_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'creator', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'creator', 'series', 'cancelled_at', 'created_at', 'updated_at']
 
     def validate(self, data):
         """
@@ -37,7 +40,21 @@ class EventSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'capacity': 'Capacity must be at least 1.'
             })
-        
+
+        # Sharding needs at least one seat per capacity bucket
+        bucket_count = data.get('bucket_count')
+        effective_capacity = capacity or getattr(self.instance, 'capacity', None)
+        if bucket_count and effective_capacity and bucket_count > effective_capacity:
+            raise serializers.ValidationError({
+                'bucket_count': 'Bucket count cannot exceed capacity.'
+            })
+
+        # Capacity cannot drop below the seats already booked
+        if self.instance and capacity and capacity < self.instance.booked_seats:
+            raise serializers.ValidationError({
+                'capacity': 'Capacity cannot be less than the number of active bookings.'
+            })
+
         return data
 
     def create(self, validated_data):
@@ -45,4 +62,78 @@ class EventSerializer(serializers.ModelSerializer):
         Create a new event and set the creator to the authenticated user.
         """
         validated_data['creator'] = self.context['request'].user.organizer_profile
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class EventSeriesSerializer(serializers.ModelSerializer):
+    """
+    Serializer for EventSeries; creating one also creates its template event.
+    """
+    template = EventSerializer()
+
+    class Meta:
+        model = EventSeries
+        fields = [
+            'id', 'template', 'frequency', 'interval', 'weekdays', 'count', 'until',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_weekdays(self, value):
+        days = [day.strip().upper() for day in value.split(',') if day.strip()]
+        unknown = [day for day in days if day not in EventSeries.WEEKDAYS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown weekdays: {', '.join(unknown)}. Use {', '.join(EventSeries.WEEKDAYS)}."
+            )
+        return ','.join(dict.fromkeys(days))
+
+    def validate(self, data):
+        """
+        Rule checks, applied to the merged values on updates.
+        """
+        if self.instance and 'template' in data:
+            raise serializers.ValidationError({
+                'template': 'Edit the template through its event endpoint.'
+            })
+        rule = {
+            name: data.get(name, getattr(self.instance, name, None))
+            for name in ('frequency', 'weekdays', 'count', 'until')
+        }
+        if rule['weekdays'] and rule['frequency'] != EventSeries.FREQ_WEEKLY:
+            raise serializers.ValidationError({
+                'weekdays': 'Weekdays only apply to weekly series.'
+            })
+        if rule['count'] is not None and rule['until'] is not None:
+            raise serializers.ValidationError({
+                'until': 'Use either count or until, not both.'
+            })
+        if rule['count'] is not None and rule['count'] < 1:
+            raise serializers.ValidationError({
+                'count': 'Count must be at least 1.'
+            })
+        starts_at = data['template']['start_time'] if 'template' in data else self.instance.starts_at
+        if rule['until'] is not None and rule['until'] < starts_at:
+            raise serializers.ValidationError({
+                'until': 'Until must not be before the first start.'
+            })
+        return data
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """
+        Create the template event as the first occurrence, then the rule.
+        """
+        template_data = validated_data.pop('template')
+        template_data['creator'] = self.context['request'].user.organizer_profile
+        template = Event.objects.create(**template_data)
+        series = EventSeries.objects.create(
+            template=template,
+            starts_at=template.start_time,
+            duration=template.end_time - template.start_time,
+            **validated_data
+        )
+        Event.objects.filter(pk=template.pk).update(series=series, recurrence_start=template.start_time)
+        template.series, template.recurrence_start = series, template.start_time
+        return series
+
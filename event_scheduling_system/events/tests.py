@@ -8,7 +8,8 @@ from rest_framework.authtoken.models import Token
 from django.urls import reverse
 
 from user.models import Organizer, Customer, HistoryPoint
-from .models import Event
+from .models import Event, EventSeries
+from event_scheduling_system.testing import share_caches
 
 
 class EventAPITest(APITestCase):
@@ -510,6 +511,20 @@ class EventAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('capacity', response.data)
 
+    def test_event_update_capacity_below_bookings(self):
+        """Test that capacity cannot be reduced below the active bookings."""
+        from bookings.models import Booking
+        for i in range(3):
+            customer = Customer.objects.create(user=User.objects.create_user(username=f'booker{i}'))
+            Booking.objects.create(attendee=customer, event=self.event, status='active')
+
+        url = reverse('event-detail', kwargs={'pk': self.event.id})
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.patch(url, {'capacity': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('capacity', response.data)
+
     def test_event_delete_with_bookings(self):
         """Test event deletion when it has bookings."""
         # Create a booking for the event
@@ -694,3 +709,1725 @@ class EventModelTest(TestCase):
         booking.cancel()
         
         self.assertEqual(self.event.available_slots, 10)  # Back to full capacity
+
+
+class EventBookedCountTest(TestCase):
+    """Test cases for the maintained booked seat counter."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.user,
+            organization_name='Test Organization',
+            business_address='123 Business St'
+        )
+        self.event = Event.objects.create(
+            title='Test Event',
+            description='Test Description',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=2,
+            creator=self.organizer
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(3)
+        ]
+    
+    def _book(self, customer):
+        from bookings.models import Booking
+        return Booking.objects.create(attendee=customer, event=self.event, status='active')
+    
+    def test_counter_follows_booking_transitions(self):
+        """Test that create, cancel, reactivate and delete keep the counter in step."""
+        booking = self._book(self.customers[0])
+        self._book(self.customers[1])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+        
+        booking.cancel()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+        
+        booking.status = 'active'
+        booking.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+        
+        booking.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_available_slots_uses_no_queries(self):
+        """Test that availability is read from the counter without a COUNT."""
+        self._book(self.customers[0])
+        event = Event.objects.get(id=self.event.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(event.available_slots, 1)
+            self.assertFalse(event.is_full)
+    
+    def test_counter_cannot_exceed_capacity(self):
+        """Test that claiming a seat on a full event is rejected."""
+        from .models import EventFullError
+        self._book(self.customers[0])
+        self._book(self.customers[1])
+        with self.assertRaises(EventFullError):
+            self._book(self.customers[2])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+    
+    def test_stale_event_save_keeps_counter(self):
+        """Test that saving a stale event instance does not overwrite the counter."""
+        stale = Event.objects.get(id=self.event.id)
+        self._book(self.customers[0])
+        stale.title = 'Renamed Event'
+        stale.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.title, 'Renamed Event')
+        self.assertEqual(self.event.booked_count, 1)
+    
+    def test_reconcile_command_fixes_drift(self):
+        """Test that the reconcile command rebuilds drifted counters."""
+        from io import StringIO
+        from django.core.management import call_command
+        self._book(self.customers[0])
+        self._book(self.customers[1])
+        Event.objects.filter(id=self.event.id).update(booked_count=0)
+        
+        out = StringIO()
+        call_command('reconcile_booked_counts', '--dry-run', stdout=out)
+        self.assertIn('0 -> 2', out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+        
+        call_command('reconcile_booked_counts', '--chunk-size', '1', stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+
+
+class EventListQueryCountTest(APITestCase):
+    """Query-count regression tests for the event listing actions."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+    
+    def _create_events(self, count):
+        now = timezone.now()
+        for i in range(count):
+            # Alternate upcoming and past events so every action has rows
+            offset = timedelta(days=i + 1) if i % 2 == 0 else -timedelta(days=i + 1)
+            Event.objects.create(
+                title=f'Event {i}',
+                start_time=now + offset,
+                end_time=now + offset + timedelta(hours=2),
+                capacity=10,
+                creator=self.organizer
+            )
+    
+    def _count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+    
+    def _assert_constant_queries(self, url_name, max_queries=3):
+        url = reverse(url_name)
+        self._create_events(2)
+        small_page = self._count_queries(url)
+        self._create_events(18)
+        full_page = self._count_queries(url)
+        self.assertEqual(small_page, full_page)
+        self.assertLessEqual(full_page, max_queries)
+    
+    def test_list_query_count(self):
+        """Test that the event list costs a constant number of queries."""
+        self._assert_constant_queries('event-list')
+    
+    def test_my_events_query_count(self):
+        """Test that my_events costs a constant number of queries."""
+        self._assert_constant_queries('event-my-events')
+    
+    def test_upcoming_query_count(self):
+        """Test that upcoming costs a constant number of queries."""
+        # Plus the next start_time lookup when the listing cache is filled
+        self._assert_constant_queries('event-upcoming', max_queries=4)
+    
+    def test_past_query_count(self):
+        """Test that past costs a constant number of queries."""
+        # Plus the next end_time lookup when the listing cache is filled
+        self._assert_constant_queries('event-past', max_queries=4)
+
+
+class CapacityBucketTest(TestCase):
+    """Test cases for sharded capacity buckets."""
+    
+    def setUp(self):
+        self.organizer = Organizer.objects.create(
+            user=User.objects.create_user(username='organizer'),
+            organization_name='Test Organization',
+            business_address='123 Business St'
+        )
+        self.event = Event.objects.create(
+            title='Flash Sale',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=10,
+            bucket_count=4,
+            creator=self.organizer
+        )
+        self.customers = [
+            Customer.objects.create(user=User.objects.create_user(username=f'customer{i}'))
+            for i in range(11)
+        ]
+    
+    def _book(self, customer):
+        from bookings.models import Booking
+        return Booking.objects.create(attendee=customer, event=self.event, status='active')
+    
+    def test_capacity_split_across_buckets(self):
+        """Test that capacity is split evenly over the buckets."""
+        capacities = list(self.event.capacity_buckets.values_list('capacity', flat=True))
+        self.assertEqual(capacities, [3, 3, 2, 2])
+        self.assertEqual(self.event.available_slots, 10)
+    
+    def test_bookings_fall_back_to_other_buckets(self):
+        """Test that bookings fill every bucket and then the event is full."""
+        from .models import EventFullError
+        for customer in self.customers[:10]:
+            self._book(customer)
+        self.assertEqual(self.event.available_slots, 0)
+        self.assertTrue(self.event.is_full)
+        self.assertEqual(self.event.booked_count, 0)
+        with self.assertRaises(EventFullError):
+            self._book(self.customers[10])
+    
+    def test_cancel_releases_bucket_seat(self):
+        """Test that cancelling a booking gives its seat back to a bucket."""
+        booking = self._book(self.customers[0])
+        self.assertEqual(self.event.available_slots, 9)
+        booking.cancel()
+        self.assertEqual(Event.objects.get(id=self.event.id).available_slots, 10)
+    
+    def test_capacity_change_and_unsharding_keep_booked_seats(self):
+        """Test that re-splitting and folding buckets back preserve booked seats."""
+        for customer in self.customers[:3]:
+            self._book(customer)
+        event = Event.objects.get(id=self.event.id)
+        event.capacity = 20
+        event.bucket_count = 8
+        event.save()
+        self.assertEqual(event.capacity_buckets.count(), 8)
+        self.assertEqual(event.booked_seats, 3)
+        
+        event.bucket_count = 0
+        event.save()
+        event.refresh_from_db()
+        self.assertFalse(event.capacity_buckets.exists())
+        self.assertEqual(event.booked_count, 3)
+        self.assertEqual(event.available_slots, 17)
+    
+    def test_reconcile_command_rebuilds_buckets(self):
+        """Test that the reconcile command repairs drifted bucket counters."""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import CapacityBucket
+        for customer in self.customers[:5]:
+            self._book(customer)
+        CapacityBucket.objects.filter(event=self.event).update(booked_count=0)
+        call_command('reconcile_booked_counts', stdout=StringIO())
+        self.assertEqual(Event.objects.get(id=self.event.id).booked_seats, 5)
+
+
+class EventImportTest(APITestCase):
+    """Test cases for streaming bulk event import."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1')
+        Customer.objects.create(user=self.customer_user)
+        self.url = reverse('event-import-events')
+        self.start = (timezone.now() + timedelta(days=3)).replace(microsecond=0)
+    
+    def _upload(self, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return SimpleUploadedFile(name, content.encode('utf-8'))
+    
+    def test_import_csv_reports_errors_per_row(self):
+        """Test that valid CSV rows are created and invalid rows are reported."""
+        end = self.start + timedelta(hours=2)
+        content = (
+            'title,description,start_time,end_time,capacity\n'
+            f'Yoga,Morning class,{self.start.isoformat()},{end.isoformat()},20\n'
+            f'Broken,,{end.isoformat()},{self.start.isoformat()},20\n'
+            f'Pilates,,{self.start.isoformat()},{end.isoformat()},-1\n'
+            f'Spin,,{self.start.isoformat()},{end.isoformat()},15\n'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(self.url, {'file': self._upload('season.csv', content)}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('end_time', response.data['errors'][0]['errors'])
+        self.assertEqual(
+            sorted(Event.objects.filter(creator=self.organizer).values_list('title', flat=True)),
+            ['Spin', 'Yoga']
+        )
+        self.assertEqual(HistoryPoint.objects.filter(
+            user=self.organizer_user, action='create', content_type__model='event'
+        ).count(), 2)
+    
+    def test_import_ndjson_in_chunks(self):
+        """Test that NDJSON rows are imported across several chunks."""
+        import json
+        from .importer import import_events, iter_rows
+        from io import BytesIO
+        end = self.start + timedelta(hours=1)
+        lines = [
+            json.dumps({'title': f'Class {i}', 'start_time': self.start.isoformat(),
+                        'end_time': end.isoformat(), 'capacity': 10})
+            for i in range(7)
+        ]
+        lines.insert(3, '{not json')
+        stream = BytesIO('\n'.join(lines).encode('utf-8'))
+        
+        summary = import_events(iter_rows(stream, 'ndjson'), self.organizer, self.organizer_user, chunk_size=3)
+        
+        self.assertEqual(summary['created'], 7)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(summary['errors'][0]['row'], 4)
+        self.assertEqual(Event.objects.filter(creator=self.organizer).count(), 7)
+    
+    def test_import_requires_known_format(self):
+        """Test that an upload with an unknown format is rejected."""
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(self.url, {'file': self._upload('season.txt', 'x')}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('import_format', response.data)
+    
+    def test_import_explicit_format(self):
+        """Test that ?import_format= and the form field override the file extension."""
+        import json
+        end = self.start + timedelta(hours=1)
+        row = json.dumps({'title': 'Yoga', 'start_time': self.start.isoformat(),
+                          'end_time': end.isoformat(), 'capacity': 10})
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(
+            self.url + '?import_format=ndjson', {'file': self._upload('season.txt', row)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        response = self.client.post(
+            self.url, {'file': self._upload('season.txt', row), 'import_format': 'ndjson'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(Event.objects.filter(creator=self.organizer, title='Yoga').count(), 2)
+    
+    def test_import_forbidden_customer(self):
+        """Test that customers cannot import events."""
+        self.client.force_authenticate(user=self.customer_user)
+        response = self.client.post(self.url, {'file': self._upload('season.csv', 'title\n')}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_import_events_command(self):
+        """Test that the management command imports a file for an organizer."""
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        end = self.start + timedelta(hours=1)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('title,start_time,end_time,capacity\n')
+            handle.write(f'Imported,{self.start.isoformat()},{end.isoformat()},5\n')
+        out = StringIO()
+        call_command('import_events', handle.name, '--organizer', 'organizer1', stdout=out)
+        self.assertIn('Imported 1 events', out.getvalue())
+        self.assertTrue(Event.objects.filter(title='Imported', creator=self.organizer).exists())
+
+
+class EventCursorPaginationTest(APITestCase):
+    """Tests for keyset (cursor) pagination of the event listings."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        now = timezone.now()
+        for i in range(25):
+            # Every other event shares a start time, so the id tie-breaker is exercised
+            start = now + timedelta(days=(i // 2) + 1)
+            Event.objects.create(
+                title=f'Event {i}',
+                start_time=start,
+                end_time=start + timedelta(hours=2),
+                capacity=10,
+                creator=self.organizer
+            )
+    
+    def _walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertLessEqual(len(response.data['results']), 10)
+            ids.extend(event['id'] for event in response.data['results'])
+            url = response.data['next']
+        return ids
+    
+    def test_list_cursor_walk(self):
+        """Test that following next links visits every event once in -created_at, id order."""
+        ids = self._walk(reverse('event-list') + '?pagination=cursor')
+        expected = list(Event.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+    
+    def test_upcoming_cursor_walk(self):
+        """Test that upcoming cursors follow start_time with ties broken by id."""
+        ids = self._walk(reverse('event-upcoming') + '?pagination=cursor')
+        expected = list(Event.objects.order_by('start_time', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+    
+    def test_cursor_page_runs_no_count(self):
+        """Test that a cursor page is fetched without a COUNT query."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        first = self.client.get(reverse('event-list') + '?pagination=cursor')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(first.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in ctx.captured_queries))
+    
+    def test_cursor_previous_link(self):
+        """Test that the previous link returns the page before."""
+        first = self.client.get(reverse('event-list') + '?pagination=cursor')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [event['id'] for event in back.data['results']],
+            [event['id'] for event in first.data['results']]
+        )
+        self.assertIsNotNone(back.data['next'])
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected with 404."""
+        response = self.client.get(reverse('event-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_page_number_mode_is_default(self):
+        """Test that clients not asking for cursors still get page numbers."""
+        response = self.client.get(reverse('event-list') + '?page=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class EventQueryPlanTest(APITestCase):
+    """Fails when an event endpoint's SQL falls back to a full table scan."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        now = timezone.now()
+        for i in range(12):
+            offset = timedelta(days=i + 1) if i % 2 == 0 else -timedelta(days=i + 1)
+            self.event = Event.objects.create(
+                title=f'Event {i}',
+                start_time=now + offset,
+                end_time=now + offset + timedelta(hours=2),
+                capacity=10,
+                bucket_count=2 if i % 3 == 0 else 0,
+                creator=self.organizer
+            )
+    
+    def _assert_indexed(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from event_scheduling_system.query_plans import full_table_scans
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(full_table_scans(sql), [], sql)
+        return response
+    
+    def test_list_plans(self):
+        """Test that the event list pages through indexes in both modes."""
+        self._assert_indexed(reverse('event-list'))
+        first = self._assert_indexed(reverse('event-list') + '?pagination=cursor')
+        self._assert_indexed(first.data['next'])
+    
+    def test_my_events_plans(self):
+        """Test that my_events reads the creator index."""
+        self._assert_indexed(reverse('event-my-events'))
+        self._assert_indexed(reverse('event-my-events') + '?pagination=cursor')
+    
+    def test_upcoming_plans(self):
+        """Test that upcoming reads the start_time index."""
+        self._assert_indexed(reverse('event-upcoming'))
+        self._assert_indexed(reverse('event-upcoming') + '?pagination=cursor')
+    
+    def test_past_plans(self):
+        """Test that past reads the end_time index."""
+        self._assert_indexed(reverse('event-past'))
+        self._assert_indexed(reverse('event-past') + '?pagination=cursor')
+    
+    def test_detail_plans(self):
+        """Test that the event detail is a primary-key lookup."""
+        self._assert_indexed(reverse('event-detail', kwargs={'pk': self.event.id}))
+
+
+class EventListingCacheTest(APITestCase):
+    """Tests for the time-aware upcoming/past listing cache."""
+    
+    def setUp(self):
+        share_caches(self)
+        from django.core.cache import cache
+        cache.clear()
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        now = timezone.now()
+        self.soon = self._create_event('Soon', now + timedelta(hours=1))
+        self.later = self._create_event('Later', now + timedelta(hours=2))
+        self.ended = self._create_event('Ended', now - timedelta(days=2))
+    
+    def _create_event(self, title, start):
+        return Event.objects.create(
+            title=title,
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            capacity=10,
+            creator=self.organizer
+        )
+    
+    def _titles(self, url_name):
+        response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {event['title'] for event in response.data['results']}
+    
+    def test_shipped_default_cache_is_shared(self):
+        """Test that the listing cache is on in the shipped configuration."""
+        from django.test.utils import override_settings
+        from event_scheduling_system import settings as project_settings
+        from .listing_cache import listing_cache_enabled
+        with override_settings(CACHES=project_settings.CACHES):
+            self.assertTrue(listing_cache_enabled())
+    
+    def test_upcoming_hit_skips_database(self):
+        """Test that a repeated upcoming request is served without queries."""
+        self.assertEqual(self._titles('event-upcoming'), {'Soon', 'Later'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self._titles('event-upcoming'), {'Soon', 'Later'})
+    
+    def test_upcoming_expires_at_next_start_time(self):
+        """Test that the cached upcoming page is dropped exactly when an event starts."""
+        from unittest import mock
+        self._titles('event-upcoming')
+        with mock.patch('django.utils.timezone.now', return_value=self.soon.start_time - timedelta(seconds=1)):
+            with self.assertNumQueries(0):
+                self.assertEqual(self._titles('event-upcoming'), {'Soon', 'Later'})
+        with mock.patch('django.utils.timezone.now', return_value=self.soon.start_time):
+            self.assertEqual(self._titles('event-upcoming'), {'Later'})
+    
+    def test_event_writes_invalidate(self):
+        """Test that saving or deleting an event invalidates cached listings."""
+        self._titles('event-upcoming')
+        self._create_event('New', timezone.now() + timedelta(days=1))
+        self.assertEqual(self._titles('event-upcoming'), {'Soon', 'Later', 'New'})
+        self.later.delete()
+        self.assertEqual(self._titles('event-upcoming'), {'Soon', 'New'})
+        self.soon.title = 'Renamed'
+        self.soon.save()
+        self.assertEqual(self._titles('event-upcoming'), {'Renamed', 'New'})
+    
+    def test_seat_claims_invalidate(self):
+        """Test that claimed seats show up in cached availability."""
+        self._titles('event-upcoming')
+        self.soon.claim_seat()
+        response = self.client.get(reverse('event-upcoming'))
+        slots = {event['title']: event['available_slots'] for event in response.data['results']}
+        self.assertEqual(slots['Soon'], 9)
+    
+    def test_past_cache_control(self):
+        """Test that past pages are cached by clients and upcoming pages are revalidated."""
+        self.assertEqual(self._titles('event-past'), {'Ended'})
+        past = self.client.get(reverse('event-past'))
+        self.assertIn('private', past['Cache-Control'])
+        self.assertIn('max-age=', past['Cache-Control'])
+        self.assertNotIn('max-age=0', past['Cache-Control'])
+        upcoming = self.client.get(reverse('event-upcoming'))
+        self.assertIn('no-cache', upcoming['Cache-Control'])
+    
+    def test_past_expires_when_next_event_ends(self):
+        """Test that an event moves into the cached past listing when it ends."""
+        from unittest import mock
+        self.assertEqual(self._titles('event-past'), {'Ended'})
+        with mock.patch('django.utils.timezone.now', return_value=self.soon.end_time + timedelta(seconds=1)):
+            self.assertEqual(self._titles('event-past'), {'Ended', 'Soon'})
+    
+    def test_upcoming_bookings_keep_past_pages(self):
+        """Test that seat traffic on upcoming events does not evict cached past pages."""
+        self.assertEqual(self._titles('event-past'), {'Ended'})
+        self.soon.claim_seat()
+        self.soon.release_seat()
+        self.later.title = 'Renamed'
+        self.later.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._titles('event-past'), {'Ended'})
+    
+    def test_past_event_writes_invalidate_past_pages(self):
+        """Test that edits and deletes of ended events refresh cached past pages."""
+        self.assertEqual(self._titles('event-past'), {'Ended'})
+        self.ended.title = 'Renamed'
+        self.ended.save()
+        self.assertEqual(self._titles('event-past'), {'Renamed'})
+        self.ended.delete()
+        self.assertEqual(self._titles('event-past'), set())
+    
+    def test_new_event_ending_soon_invalidates_past_pages(self):
+        """Test that an event ending before the cached past page expires still shows once it ends."""
+        from unittest import mock
+        self.assertEqual(self._titles('event-past'), {'Ended'})
+        early = self._create_event('Early', timezone.now() + timedelta(minutes=1))
+        with mock.patch('django.utils.timezone.now', return_value=early.end_time + timedelta(seconds=1)):
+            self.assertEqual(self._titles('event-past'), {'Ended', 'Early'})
+    
+    def test_cache_can_be_disabled(self):
+        """Test that EVENT_LISTING_CACHE_TIMEOUT=0 queries on every request."""
+        from django.test.utils import override_settings
+        with override_settings(EVENT_LISTING_CACHE_TIMEOUT=0):
+            self._titles('event-upcoming')
+            response = self.client.get(reverse('event-upcoming'))
+            self.assertNotIn('Cache-Control', response)
+
+
+class EventConditionalGetTest(APITestCase):
+    """Tests for ETag / If-None-Match / If-Modified-Since on event GETs."""
+    
+    def setUp(self):
+        share_caches(self)
+        from django.core.cache import cache
+        cache.clear()
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        self.event = Event.objects.create(
+            title='Test Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=10,
+            creator=self.organizer
+        )
+    
+    def _revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+    
+    def test_detail_not_modified_skips_serializer(self):
+        """Test that a matching If-None-Match on detail returns 304 without serializing."""
+        from unittest import mock
+        url = reverse('event-detail', kwargs={'pk': self.event.id})
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('"'))
+        with mock.patch('events.views.EventSerializer.to_representation') as to_representation:
+            response = self._revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+    
+    def test_detail_etag_changes_with_edits_and_seats(self):
+        """Test that edits and seat claims produce a new detail ETag."""
+        url = reverse('event-detail', kwargs={'pk': self.event.id})
+        etag = self.client.get(url)['ETag']
+        self.event.claim_seat()
+        response = self._revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['available_slots'], 9)
+        etag = response['ETag']
+        self.event.title = 'Renamed'
+        self.event.save()
+        self.assertEqual(self._revalidate(url, etag).status_code, status.HTTP_200_OK)
+    
+    def test_sharded_event_etag_changes_with_bucket_claims(self):
+        """Test that bucket claims change the ETag of a sharded event and of the list."""
+        self.event.bucket_count = 4
+        self.event.save()
+        detail_url = reverse('event-detail', kwargs={'pk': self.event.id})
+        list_url = reverse('event-list')
+        detail_etag = self.client.get(detail_url)['ETag']
+        list_etag = self.client.get(list_url)['ETag']
+        self.event.claim_seat()
+        self.assertEqual(self._revalidate(detail_url, detail_etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._revalidate(list_url, list_etag).status_code, status.HTTP_200_OK)
+    
+    def test_list_not_modified(self):
+        """Test that list endpoints answer a matching If-None-Match with 304."""
+        for url_name in ('event-list', 'event-my-events', 'event-upcoming'):
+            url = reverse(url_name)
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self._revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_list_etag_changes_on_delete(self):
+        """Test that deleting an event changes the list ETag."""
+        other = Event.objects.create(
+            title='Other',
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        url = reverse('event-list')
+        etag = self.client.get(url)['ETag']
+        other.delete()
+        response = self._revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+    
+    def test_list_if_modified_since(self):
+        """Test If-Modified-Since against the list's Last-Modified."""
+        from unittest import mock
+        from django.utils.http import http_date
+        import time
+        url = reverse('event-list')
+        # Last-Modified is only sent once the second of the last change has passed
+        with mock.patch('event_scheduling_system.conditional.time.time', return_value=time.time() + 2):
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.event.claim_seat()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() - 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_list_last_modified_with_file_cache(self):
+        """Test that a file-based default cache, as shipped, keeps the stamp without 'SHARED'."""
+        import shutil
+        import tempfile
+        import time
+        from unittest import mock
+        from django.test.utils import override_settings
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        url = reverse('event-list')
+        with override_settings(CACHES=caches), \
+                mock.patch('event_scheduling_system.conditional.time.time', return_value=time.time() + 2):
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class EventAvailabilityCacheTest(TestCase):
+    """Tests for the cached booked seats of sharded events."""
+    
+    def setUp(self):
+        share_caches(self)
+        from django.core.cache import caches
+        caches['availability'].clear()
+        organizer = Organizer.objects.create(
+            user=User.objects.create_user(username='organizer1'),
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.event = Event.objects.create(
+            title='Flash Sale',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=10,
+            bucket_count=4,
+            creator=organizer
+        )
+    
+    def _fresh(self):
+        return Event.objects.get(pk=self.event.pk)
+    
+    def test_shipped_cache_is_shared(self):
+        """Test that the availability cache is used in the shipped configuration."""
+        from django.test.utils import override_settings
+        from event_scheduling_system import settings as project_settings
+        from event_scheduling_system.caching import cache_is_shared
+        with override_settings(CACHES=project_settings.CACHES):
+            self.assertTrue(cache_is_shared(project_settings.EVENT_AVAILABILITY_CACHE))
+    
+    def test_reads_are_served_from_cache(self):
+        """Test that only the first availability read of an unprefetched event queries."""
+        with self.assertNumQueries(1):
+            self.assertEqual(self.event.available_slots, 10)
+        event = self._fresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(event.available_slots, 10)
+            self.assertFalse(event.is_full)
+    
+    def test_committed_claims_are_written_through(self):
+        """Test that claims and releases update the cached value on commit."""
+        self.assertEqual(self._fresh().available_slots, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._fresh().claim_seat()
+            self._fresh().claim_seats(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._fresh().release_seat()
+        event = self._fresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(event.available_slots, 7)
+    
+    def test_instance_sees_its_own_claims(self):
+        """Test that an instance that claimed a seat reads past the cache."""
+        self.assertEqual(self.event.available_slots, 10)
+        self.event.claim_seat()
+        self.assertEqual(self.event.available_slots, 9)
+    
+    def test_bucket_change_drops_cached_value(self):
+        """Test that rebalancing the buckets forgets the cached total."""
+        from .models import CapacityBucket
+        self.assertEqual(self._fresh().available_slots, 10)
+        CapacityBucket.objects.filter(event=self.event, index=0).update(booked_count=1)
+        self.event.bucket_count = 2
+        self.event.save()
+        self.assertEqual(self._fresh().available_slots, 9)
+    
+    def test_file_based_backend(self):
+        """Test that the cache works with the file-based backend."""
+        import tempfile
+        from django.test.utils import override_settings
+        with tempfile.TemporaryDirectory() as location:
+            caches = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'availability': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location,
+                },
+            }
+            with override_settings(CACHES=caches):
+                self.assertEqual(self._fresh().available_slots, 10)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self._fresh().claim_seat()
+                event = self._fresh()
+                with self.assertNumQueries(0):
+                    self.assertEqual(event.available_slots, 9)
+
+
+class EventProcessLocalCacheTest(APITestCase):
+    """Tests that process-local caches never answer for writes made elsewhere."""
+    
+    def setUp(self):
+        from django.core.cache import cache, caches
+        cache.clear()
+        caches['availability'].clear()
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        self.event = Event.objects.create(
+            title='Flash Sale',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=10,
+            bucket_count=4,
+            creator=organizer
+        )
+    
+    def test_listing_sees_writes_from_other_processes(self):
+        """Test that upcoming pages are not cached, so unsignalled writes show up."""
+        self.client.get(reverse('event-upcoming'))
+        # A queryset update stands in for a worker: it never touches this process's cache
+        Event.objects.filter(pk=self.event.pk).update(title='Renamed')
+        response = self.client.get(reverse('event-upcoming'))
+        self.assertEqual([event['title'] for event in response.data['results']], ['Renamed'])
+    
+    def test_no_last_modified_from_stamp(self):
+        """Test that lists carry no Last-Modified and the stamp is not kept."""
+        from unittest import mock
+        from django.core.cache import cache
+        from event_scheduling_system.conditional import CHANGE_STAMP_KEY, catalog_changed_at
+        import time
+        with mock.patch('event_scheduling_system.conditional.time.time', return_value=time.time() + 2):
+            response = self.client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIsNone(catalog_changed_at())
+        self.assertIsNone(cache.get(CHANGE_STAMP_KEY))
+    
+    def test_availability_reads_buckets(self):
+        """Test that every availability read of a sharded event sums its buckets."""
+        from .models import CapacityBucket
+        self.assertEqual(Event.objects.get(pk=self.event.pk).available_slots, 10)
+        CapacityBucket.objects.filter(event=self.event, index=0).update(booked_count=2)
+        event = Event.objects.get(pk=self.event.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(event.available_slots, 8)
+
+
+class EventSparseFieldsetTest(APITestCase):
+    """Tests for ?fields= / ?omit= on event GETs."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        for i in range(5):
+            self.event = Event.objects.create(
+                title=f'Event {i}',
+                description='A long description ' * 20,
+                start_time=timezone.now() + timedelta(days=i + 1),
+                end_time=timezone.now() + timedelta(days=i + 1, hours=2),
+                capacity=10,
+                bucket_count=2,
+                creator=self.organizer
+            )
+    
+    def _get(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query['sql'] for query in ctx.captured_queries]
+    
+    def test_fields_selects_and_prunes(self):
+        """Test that ?fields= renders only those fields and skips joins, prefetches and description."""
+        full, full_queries = self._get(reverse('event-list'))
+        slim, slim_queries = self._get(reverse('event-list') + '?fields=id,title,start_time')
+        
+        self.assertEqual(set(slim.data['results'][0]), {'id', 'title', 'start_time'})
+        self.assertLess(len(slim_queries), len(full_queries))
+        self.assertLess(len(slim.content), len(full.content) / 3)
+        for sql in slim_queries:
+            self.assertNotIn('user_organizer', sql)
+            self.assertNotIn('events_capacitybucket', sql)
+            self.assertNotIn('"description"', sql)
+    
+    def test_omit(self):
+        """Test that ?omit= drops fields and the creator join."""
+        response, queries = self._get(reverse('event-list') + '?omit=creator,description')
+        row = response.data['results'][0]
+        self.assertNotIn('creator', row)
+        self.assertNotIn('description', row)
+        self.assertIn('available_slots', row)
+        self.assertTrue(all('user_organizer' not in sql for sql in queries))
+    
+    def test_detail_fields_and_etag(self):
+        """Test that detail honours ?fields= and gets an ETag of its own."""
+        url = reverse('event-detail', kwargs={'pk': self.event.id})
+        full, _ = self._get(url)
+        slim, _ = self._get(url + '?fields=id,is_full')
+        self.assertEqual(slim.data, {'id': self.event.id, 'is_full': False})
+        self.assertNotEqual(full['ETag'], slim['ETag'])
+    
+    def test_writes_ignore_fields(self):
+        """Test that field selection only applies to reads."""
+        response = self.client.post(reverse('event-list') + '?fields=id', {
+            'title': 'New Event',
+            'start_time': (timezone.now() + timedelta(days=3)).isoformat(),
+            'end_time': (timezone.now() + timedelta(days=3, hours=1)).isoformat(),
+            'capacity': 5
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', response.data)
+        self.assertIn('creator', response.data)
+
+
+class EventFastListSerializationTest(APITestCase):
+    """Tests that the values() list path renders exactly what EventSerializer does."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(
+            username='organizer1', password='testpass123', first_name='Org', email='org@test.com'
+        )
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1', password='testpass123')
+        self.customer = Customer.objects.create(user=self.customer_user)
+        for i in range(4):
+            event = Event.objects.create(
+                title=f'Event {i}',
+                description=None if i == 0 else f'Description {i}',
+                start_time=timezone.now() + timedelta(days=i - 1),
+                end_time=timezone.now() + timedelta(days=i - 1, hours=2),
+                capacity=3,
+                bucket_count=2 if i % 2 else 0,
+                creator=self.organizer
+            )
+            for _ in range(i):
+                event.claim_seat()
+    
+    def _assert_parity(self, url):
+        from django.core.cache import cache
+        from django.test import override_settings
+        cache.clear()
+        fast = self.client.get(url)
+        cache.clear()
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.json(), slow.json())
+        self.assertEqual(fast['ETag'], slow['ETag'])
+        return fast.json()
+    
+    def test_list_parity(self):
+        """Test that full, sparse and cursor pages match, including sharded and full events."""
+        self.client.force_authenticate(user=self.customer_user)
+        data = self._assert_parity(reverse('event-list'))
+        self.assertEqual(len(data['results']), 4)
+        self.assertIn(True, [row['is_full'] for row in data['results']])
+        self._assert_parity(reverse('event-list') + '?fields=id,available_slots,creator')
+        self._assert_parity(reverse('event-list') + '?omit=creator')
+        page = self._assert_parity(reverse('event-list') + '?pagination=cursor')
+        while page['next']:
+            page = self._assert_parity(page['next'])
+    
+    def test_listing_actions_parity(self):
+        """Test that upcoming, past and my_events match."""
+        from django.test import override_settings
+        self.client.force_authenticate(user=self.customer_user)
+        # Cached listings are tagged by their cache key, so compare uncached responses
+        with override_settings(EVENT_LISTING_CACHE_TIMEOUT=0):
+            self._assert_parity(reverse('event-upcoming'))
+            self._assert_parity(reverse('event-past'))
+        self.client.force_authenticate(user=self.organizer_user)
+        self._assert_parity(reverse('event-my-events'))
+    
+    def test_no_model_instances_built(self):
+        """Test that the fast path never calls the model serializer."""
+        from unittest import mock
+        from events.serializers import EventSerializer
+        self.client.force_authenticate(user=self.customer_user)
+        with mock.patch.object(EventSerializer, 'to_representation') as to_representation:
+            response = self.client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        to_representation.assert_not_called()
+    
+    def test_sharded_availability_in_one_query(self):
+        """Test that bucket totals for a page take a single query."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.force_authenticate(user=self.customer_user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('event-list'))
+        bucket_queries = [q['sql'] for q in ctx.captured_queries if 'events_capacitybucket' in q['sql']]
+        self.assertEqual(len(bucket_queries), 1)
+
+
+class EventCalendarFeedTest(APITestCase):
+    """Tests for the organizer's iCalendar feed."""
+    
+    def setUp(self):
+        share_caches(self)
+        from user.models import CalendarFeed
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.events = [
+            Event.objects.create(
+                title=f'Event {i}',
+                description='Bring snacks; chairs, tables\nand a ' + 'very ' * 30 + 'long list',
+                start_time=timezone.now() + timedelta(days=i + 1),
+                end_time=timezone.now() + timedelta(days=i + 1, hours=2),
+                capacity=10,
+                creator=self.organizer
+            )
+            for i in range(5)
+        ]
+        self.feed = CalendarFeed.for_user(self.organizer_user)
+        self.url = reverse('event-calendar', kwargs={'key': self.feed.key})
+    
+    def _get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content).decode() if response.streaming else ''
+        return response, body
+    
+    def test_feed_streams_events(self):
+        """Test that the feed streams one folded, escaped VEVENT per event in start order."""
+        from django.test import override_settings
+        with override_settings(CALENDAR_FEED_CHUNK_SIZE=2):
+            response, body = self._get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 5)
+        self.assertLess(body.index('SUMMARY:Event 0'), body.index('SUMMARY:Event 4'))
+        self.assertIn('Bring snacks\\; chairs\\, tables\\nand a', body)
+        for line in body.split('\r\n'):
+            self.assertLessEqual(len(line.encode()), 75)
+    
+    def test_feed_uses_chunked_iterator(self):
+        """Test that rows are streamed with iterator(chunk_size=...)."""
+        from unittest import mock
+        from django.db.models.query import QuerySet
+        from django.test import override_settings
+        with override_settings(CALENDAR_FEED_CHUNK_SIZE=3), \
+                mock.patch.object(QuerySet, 'iterator', autospec=True, side_effect=QuerySet.iterator) as iterator:
+            _, body = self._get()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 5)
+        self.assertEqual(iterator.call_args.kwargs, {'chunk_size': 3})
+    
+    def test_feed_conditional_get(self):
+        """Test that an unchanged feed answers 304 without querying events, and changes with them."""
+        response, _ = self._get()
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.events[0].title = 'Renamed'
+        self.events[0].save()
+        response, body = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('SUMMARY:Renamed', body)
+    
+    def test_feed_conditional_get_without_shared_stamp(self):
+        """Test that with process-local caches the feed is validated by a digest of its rows."""
+        from django.test import override_settings
+        from event_scheduling_system.testing import local_caches
+        with override_settings(CACHES=local_caches()):
+            response, _ = self._get()
+            etag = response['ETag']
+            response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            
+            # A queryset update stands in for another process's write
+            Event.objects.filter(pk=self.events[0].pk).update(title='Renamed')
+            response, body = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('SUMMARY:Renamed', body)
+    
+    def test_feed_secret(self):
+        """Test that unknown, rotated and customer keys are 404."""
+        from user.models import CalendarFeed
+        old_url = self.url
+        self.feed.rotate()
+        self.assertEqual(self.client.get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            self.client.get(reverse('event-calendar', kwargs={'key': self.feed.key})).status_code,
+            status.HTTP_200_OK
+        )
+        customer_user = User.objects.create_user(username='customer1')
+        Customer.objects.create(user=customer_user)
+        customer_feed = CalendarFeed.for_user(customer_user)
+        response = self.client.get(reverse('event-calendar', kwargs={'key': customer_feed.key}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_cancelled_event_marked_cancelled(self):
+        """Test that a cancelled event stays in the feed with STATUS:CANCELLED."""
+        from bookings.cancellation import cancel_event
+        cancel_event(self.events[1], self.organizer_user)
+        response, body = self._get()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 5)
+        self.assertEqual(body.count('STATUS:CANCELLED'), 1)
+        cancelled = body.split('BEGIN:VEVENT')[2]
+        self.assertIn(f'UID:event-{self.events[1].id}@', cancelled)
+        self.assertIn('STATUS:CANCELLED', cancelled)
+
+
+class EventSearchTest(APITestCase):
+    """Tests for full-text event search and autocomplete."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1', password='testpass123')
+        Customer.objects.create(user=self.customer_user)
+        self.client.force_authenticate(user=self.customer_user)
+        self.jazz = self._event('Jazz Concert', 'An evening of live music', days=2)
+        self.brunch = self._event('Sunday Brunch', 'Brunch with a jazz trio and concerts of light music', days=3)
+        self.old_jazz = self._event('Jazz Workshop', 'Improvisation basics', days=-3)
+        self._event('Pottery Class', 'Hands-on clay', days=4)
+    
+    def _event(self, title, description, days):
+        return Event.objects.create(
+            title=title,
+            description=description,
+            start_time=timezone.now() + timedelta(days=days),
+            end_time=timezone.now() + timedelta(days=days, hours=2),
+            capacity=10,
+            creator=self.organizer
+        )
+    
+    def _search(self, **params):
+        response = self.client.get(reverse('event-search'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [row['id'] for row in response.data['results']]
+    
+    def test_ranked_search(self):
+        """Test that title matches outrank description matches and stemming applies."""
+        results = self._search(q='jazz')
+        self.assertEqual(set(results[:2]), {self.jazz.id, self.old_jazz.id})
+        self.assertEqual(results[2], self.brunch.id)
+        self.assertEqual(self._search(q='concerts'), [self.jazz.id, self.brunch.id])
+        self.assertEqual(self._search(q='jazz music brunch'), [self.brunch.id])
+        self.assertEqual(self._search(q='opera'), [])
+    
+    def test_query_syntax_is_not_interpreted(self):
+        """Test that FTS operators and quotes in the query are treated as plain words."""
+        self.assertEqual(self._search(q='title:jazz OR "pottery'), [])
+        self.assertEqual(self._search(q='jazz* NOT'), [])
+        response = self.client.get(reverse('event-search'), {'q': '  '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_when_filter(self):
+        """Test that search combines with the upcoming and past filters."""
+        self.assertEqual(self._search(q='jazz', when='upcoming'), [self.jazz.id, self.brunch.id])
+        self.assertEqual(self._search(q='jazz', when='past'), [self.old_jazz.id])
+        response = self.client.get(reverse('event-search'), {'q': 'jazz', 'when': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_prefix_and_autocomplete(self):
+        """Test that the last word matches as a prefix."""
+        self.assertEqual(self._search(q='pott'), [])
+        self.assertEqual(len(self._search(q='pott', prefix='true')), 1)
+        response = self.client.get(reverse('event-autocomplete'), {'q': 'live ja', 'when': 'upcoming'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'id': self.jazz.id, 'title': 'Jazz Concert'}])
+    
+    def test_index_follows_save_delete_and_import(self):
+        """Test that edits, deletes and imports are reflected in the index."""
+        from .importer import import_events
+        self.jazz.title = 'Blues Night'
+        self.jazz.save()
+        self.assertEqual(self._search(q='blues'), [self.jazz.id])
+        self.assertNotIn(self.jazz.id, self._search(q='concert'))
+        
+        self.brunch.delete()
+        self.assertEqual(self._search(q='brunch'), [])
+        
+        start = timezone.now() + timedelta(days=5)
+        import_events(iter([(1, {
+            'title': 'Imported Salsa Night', 'start_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=1)).isoformat(), 'capacity': 5
+        })]), self.organizer, self.organizer_user)
+        self.assertEqual(len(self._search(q='salsa')), 1)
+    
+    def test_rebuild_command(self):
+        """Test that the rebuild command picks up writes that bypassed Event.save."""
+        from io import StringIO
+        from django.core.management import call_command
+        Event.objects.filter(id=self.jazz.id).update(title='Tango Night')
+        self.assertEqual(self._search(q='tango'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 4 events.', out.getvalue())
+        self.assertEqual(self._search(q='tango'), [self.jazz.id])
+    
+    def test_search_query_plans(self):
+        """Test that search reads the inverted index instead of scanning events."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from event_scheduling_system.query_plans import full_table_scans
+        with CaptureQueriesContext(connection) as ctx:
+            self._search(q='jazz', when='upcoming')
+            self.client.get(reverse('event-autocomplete'), {'q': 'ja'})
+        searches = [q['sql'] for q in ctx.captured_queries if 'events_event_fts' in q['sql']]
+        self.assertTrue(searches)
+        for sql in searches:
+            self.assertEqual(full_table_scans(sql), [], sql)
+
+
+class EventSeriesTest(APITestCase):
+    """Tests for recurring event series and lazy occurrence expansion."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customer_user = User.objects.create_user(username='customer1', password='testpass123')
+        Customer.objects.create(user=self.customer_user)
+        # A Monday at 18:00 next week
+        today = timezone.localdate()
+        monday = today + timedelta(days=7 - today.weekday())
+        self.first = timezone.make_aware(timezone.datetime.combine(monday, timezone.datetime.min.time())) \
+            + timedelta(hours=18)
+    
+    def _create(self, **rule):
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.post(reverse('series-list'), {
+            'template': {
+                'title': 'Yoga',
+                'description': 'Weekly class',
+                'start_time': self.first.isoformat(),
+                'end_time': (self.first + timedelta(hours=1)).isoformat(),
+                'capacity': 5
+            },
+            **rule
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return EventSeries.objects.get(id=response.data['id'])
+    
+    def test_create_series(self):
+        """Test that a series creates one template event and one history point."""
+        series = self._create(frequency='weekly', weekdays='mo,th')
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(series.template.series, series)
+        self.assertEqual(series.weekdays, 'MO,TH')
+        self.assertEqual(HistoryPoint.objects.filter(user=self.organizer_user).count(), 1)
+    
+    def test_rule_validation(self):
+        """Test that invalid rules are rejected."""
+        self.client.force_authenticate(user=self.organizer_user)
+        template = {
+            'title': 'Yoga', 'start_time': self.first.isoformat(),
+            'end_time': (self.first + timedelta(hours=1)).isoformat(), 'capacity': 5
+        }
+        for rule, field in (
+            ({'frequency': 'weekly', 'weekdays': 'XX'}, 'weekdays'),
+            ({'frequency': 'daily', 'weekdays': 'MO'}, 'weekdays'),
+            ({'frequency': 'daily', 'count': 3, 'until': self.first.isoformat()}, 'until'),
+            ({'frequency': 'hourly'}, 'frequency'),
+        ):
+            response = self.client.post(reverse('series-list'), {'template': template, **rule}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, response.data)
+        self.client.force_authenticate(user=self.customer_user)
+        response = self.client.post(reverse('series-list'), {'template': template, 'frequency': 'daily'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_occurrence_starts(self):
+        """Test daily, weekly, monthly, count and until expansion."""
+        template = Event(title='T', start_time=self.first, end_time=self.first + timedelta(hours=1), capacity=1)
+        
+        def starts(limit=5, after=None, **rule):
+            from itertools import islice
+            series = EventSeries(template=template, starts_at=self.first, duration=timedelta(hours=1), **rule)
+            return list(islice(series.occurrence_starts(after=after), limit))
+        
+        day = timedelta(days=1)
+        self.assertEqual(starts(3, frequency='daily', interval=2), [self.first, self.first + 2 * day, self.first + 4 * day])
+        self.assertEqual(
+            starts(4, frequency='weekly', weekdays='MO,WE'),
+            [self.first, self.first + 2 * day, self.first + 7 * day, self.first + 9 * day]
+        )
+        self.assertEqual(len(starts(10, frequency='daily', count=3)), 3)
+        self.assertEqual(starts(10, frequency='weekly', until=self.first + 8 * day), [self.first, self.first + 7 * day])
+        # Jumping ahead gives the same occurrences as walking
+        after = self.first + 1000 * day + timedelta(hours=1)
+        self.assertEqual(starts(2, after=after, frequency='daily', interval=3)[0], self.first + 1002 * day)
+        self.assertEqual(starts(1, after=after, frequency='weekly', weekdays='FR')[0].weekday(), 4)
+        # The 31st is skipped in shorter months
+        jan31 = self.first.replace(month=1, day=31)
+        monthly = EventSeries(template=template, starts_at=jan31, duration=day, frequency='monthly')
+        from itertools import islice
+        self.assertEqual([start.month for start in islice(monthly.occurrence_starts(), 3)], [1, 3, 5])
+    
+    def test_occurrences_window_is_lazy(self):
+        """Test that listing far-future occurrences creates no events."""
+        series = self._create(frequency='daily')
+        self.client.force_authenticate(user=self.customer_user)
+        response = self.client.get(reverse('series-occurrences', kwargs={'pk': series.id}), {
+            'from': (self.first + timedelta(days=3650)).isoformat(), 'limit': 3
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['start_time'], self.first + timedelta(days=3650))
+        self.assertIsNone(response.data['results'][0]['event'])
+        self.assertEqual(response.data['results'][0]['available_slots'], 5)
+        self.assertEqual(Event.objects.count(), 1)
+    
+    def test_materialize(self):
+        """Test that materializing is idempotent and shows in the occurrence window."""
+        series = self._create(frequency='daily')
+        second = self.first + timedelta(days=1)
+        event, = series.materialize([second])
+        again, = series.materialize([second])
+        self.assertEqual(event.id, again.id)
+        self.assertEqual((event.title, event.capacity, event.series_id), ('Yoga', 5, series.id))
+        self.assertEqual(event.end_time - event.start_time, timedelta(hours=1))
+        
+        self.client.force_authenticate(user=self.customer_user)
+        response = self.client.get(reverse('series-occurrences', kwargs={'pk': series.id}), {
+            'from': self.first.isoformat(), 'limit': 3
+        })
+        self.assertEqual(
+            [row['event'] for row in response.data['results']], [series.template.id, event.id, None]
+        )
+    
+    def test_all_occurrences_merged(self):
+        """Test that occurrences of several series are merged in start order."""
+        daily = self._create(frequency='daily')
+        self.first += timedelta(hours=1)
+        weekly = self._create(frequency='weekly')
+        self.client.force_authenticate(user=self.customer_user)
+        response = self.client.get(reverse('series-all-occurrences'), {
+            'from': (self.first - timedelta(hours=2)).isoformat(), 'limit': 4
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['series'] for row in response.data['results']], [daily.id, weekly.id, daily.id, daily.id])
+        starts = [row['start_time'] for row in response.data['results']]
+        self.assertEqual(starts, sorted(starts))
+        
+        response = self.client.get(reverse('series-all-occurrences'), {'from': 'tomorrow'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_update_and_delete(self):
+        """Test that the rule can be changed and ending a series keeps booked occurrences."""
+        series = self._create(frequency='daily')
+        event, = series.materialize([self.first + timedelta(days=1)])
+        url = reverse('series-detail', kwargs={'pk': series.id})
+        response = self.client.patch(url, {'count': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(list(EventSeries.objects.get(id=series.id).occurrence_starts())), 2)
+        response = self.client.patch(url, {'template': {'title': 'New'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        event.refresh_from_db()
+        self.assertIsNone(event.series_id)
+        self.assertTrue(Event.objects.filter(id=series.template.id).exists())
+
+    
+    def test_stale_save_keeps_series_membership(self):
+        """Test that saving an instance loaded before its series ended does not rejoin it."""
+        series = self._create(frequency='daily')
+        stale = Event.objects.get(pk=series.template.pk)
+        response = self.client.delete(reverse('series-detail', kwargs={'pk': series.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        stale.title = 'Renamed'
+        stale.save()
+        event = Event.objects.get(pk=stale.pk)
+        self.assertEqual(event.title, 'Renamed')
+        self.assertIsNone(event.series_id)
+        self.assertEqual(event.recurrence_start, self.first)
+
+class EventIdempotencyTest(APITestCase):
+    """Test cases for Idempotency-Key replays of event creation."""
+    
+    def setUp(self):
+        share_caches(self)
+        from django.core.cache import caches
+        caches['idempotency'].clear()
+        self.organizer_user = User.objects.create_user(username='organizer1')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+        self.data = {
+            'title': 'Retried Event',
+            'start_time': (timezone.now() + timedelta(days=2)).isoformat(),
+            'end_time': (timezone.now() + timedelta(days=2, hours=3)).isoformat(),
+            'capacity': 20
+        }
+    
+    def test_create_replayed(self):
+        """Test that a retried create returns the first event instead of creating another."""
+        first = self.client.post(reverse('event-list'), self.data, HTTP_IDEMPOTENCY_KEY='event-1')
+        second = self.client.post(reverse('event-list'), self.data, HTTP_IDEMPOTENCY_KEY='event-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Event.objects.filter(title='Retried Event').count(), 1)
+        self.assertEqual(HistoryPoint.objects.filter(action=HistoryPoint.ACTION_CREATE).count(), 1)
+    
+    def test_without_key(self):
+        """Test that requests without the header are not deduplicated."""
+        self.client.post(reverse('event-list'), self.data)
+        self.client.post(reverse('event-list'), self.data)
+        self.assertEqual(Event.objects.filter(title='Retried Event').count(), 2)
+    
+    def test_invalid_key(self):
+        """Test that an overlong key is rejected."""
+        response = self.client.post(reverse('event-list'), self.data, HTTP_IDEMPOTENCY_KEY='k' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Event.objects.exists())
+    
+    def test_key_ignored_without_shared_cache(self):
+        """Test that keys are not honoured by a process-local cache, and the shipped one is shared."""
+        from django.test import override_settings
+        from event_scheduling_system import settings as project_settings
+        from event_scheduling_system.caching import cache_is_shared
+        from event_scheduling_system.testing import local_caches
+        with override_settings(CACHES=project_settings.CACHES):
+            self.assertTrue(cache_is_shared('idempotency'))
+        with override_settings(CACHES=local_caches()):
+            self.client.post(reverse('event-list'), self.data, HTTP_IDEMPOTENCY_KEY='event-1')
+            second = self.client.post(reverse('event-list'), self.data, HTTP_IDEMPOTENCY_KEY='event-1')
+        self.assertNotIn('Idempotent-Replayed', second)
+        self.assertEqual(Event.objects.filter(title='Retried Event').count(), 2)
+
+
+class EventCancellationTest(APITestCase):
+    """Test cases for organiser-initiated event cancellation."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', email='organizer@test.com')
+        self.organizer = Organizer.objects.create(
+            user=self.organizer_user,
+            organization_name='Test Org',
+            business_address='123 Test St'
+        )
+        self.customers = [
+            Customer.objects.create(
+                user=User.objects.create_user(username=f'customer{i}', email=f'customer{i}@test.com')
+            )
+            for i in range(5)
+        ]
+        self.event = Event.objects.create(
+            title='Called Off Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=4,
+            creator=self.organizer
+        )
+        self.client.force_authenticate(user=self.organizer_user)
+    
+    def _book(self, customers, event=None):
+        from bookings.models import Booking
+        return [Booking.objects.create(attendee=customer, event=event or self.event) for customer in customers]
+    
+    def _cancel(self, event=None, **extra):
+        return self.client.post(reverse('event-cancel', kwargs={'pk': (event or self.event).id}), **extra)
+    
+    def test_cancel_event_cancels_bookings(self):
+        """Test that cancelling cancels every active booking, frees the seats and logs history."""
+        from bookings.models import Booking
+        bookings = self._book(self.customers[:3])
+        bookings[2].cancel()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._cancel()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cancelled_bookings'], 2)
+        self.assertFalse(Booking.objects.filter(event=self.event, status='active').exists())
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.is_cancelled)
+        self.assertEqual(self.event.booked_count, 0)
+        booking_history = HistoryPoint.objects.filter(action='cancel', details__reason='event_cancelled')
+        self.assertEqual(
+            set(booking_history.values_list('object_id', 'user_id')),
+            {(booking.id, booking.attendee.user_id) for booking in bookings[:2]}
+        )
+        self.assertTrue(HistoryPoint.objects.filter(
+            action='cancel', user=self.organizer_user, object_id=self.event.id, details__cancelled_bookings=2
+        ).exists())
+        self.assertEqual(self.client.get(reverse('event-detail', kwargs={'pk': self.event.id})).data['cancelled_at'],
+                         response.data['cancelled_at'].isoformat().replace('+00:00', 'Z'))
+    
+    def test_attendee_emails_queued_for_workers(self):
+        """Test that the response does not wait on the mail backend and workers email the cancelled attendees."""
+        from unittest import mock
+        from django.core import mail
+        from django.core.management import call_command
+        from bookings.models import CancellationNotice
+        bookings = self._book(self.customers[:3])
+        bookings[0].cancel()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages') as send_messages:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._cancel()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        send_messages.assert_not_called()
+        notice = CancellationNotice.objects.get(event=self.event)
+        self.assertEqual(notice.status, CancellationNotice.STATUS_QUEUED)
+        call_command('run_booking_workers', workers=1, once=True)
+        notice.refresh_from_db()
+        self.assertEqual(notice.status, CancellationNotice.STATUS_SENT)
+        self.assertEqual(notice.sent, 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['customer1@test.com', 'customer2@test.com'])
+        self.assertIn('Called Off Event', mail.outbox[0].subject)
+    
+    def test_failed_emails_fail_the_notice(self):
+        """Test that a failing mail server marks the notice failed without stopping the worker."""
+        from unittest import mock
+        from bookings.cancellation import drain_notices
+        from bookings.models import CancellationNotice
+        self._book(self.customers[:1])
+        self._cancel()
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=ConnectionRefusedError('down')
+        ):
+            self.assertEqual(drain_notices('test-worker'), 1)
+        notice = CancellationNotice.objects.get(event=self.event)
+        self.assertEqual(notice.status, CancellationNotice.STATUS_FAILED)
+        self.assertIn('down', notice.error)
+        self.assertEqual(drain_notices('test-worker'), 0)
+    
+    def test_query_count_independent_of_bookings(self):
+        """Test that cancellation runs a fixed number of queries however many bookings it cancels."""
+        from django.contrib.contenttypes.models import ContentType
+        from bookings.models import Booking
+        small = Event.objects.create(
+            title='Small Event',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+            capacity=5,
+            creator=self.organizer
+        )
+        self._book(self.customers[:1], event=small)
+        self.event.capacity = 5
+        self.event.save()
+        self._book(self.customers, event=self.event)
+        ContentType.objects.get_for_model(Booking)  # warm the content type cache
+        ContentType.objects.get_for_model(Event)
+        with self.assertNumQueries(14):
+            self.assertEqual(self._cancel(event=small).data['cancelled_bookings'], 1)
+        with self.assertNumQueries(14):
+            self.assertEqual(self._cancel().data['cancelled_bookings'], 5)
+    
+    def test_holds_waitlist_and_lottery_closed(self):
+        """Test that live holds are released, waiting entries withdrawn and an undrawn lottery closed."""
+        from bookings.holds import place_hold
+        from bookings.lottery import enter_lottery, open_lottery
+        from bookings.models import LotteryEntry, SeatHold, WaitlistEntry
+        hold = place_hold(self.customers[0], self.event)
+        self._book(self.customers[1:4])
+        entry = WaitlistEntry.objects.create(attendee=self.customers[4], event=self.event)
+        response = self._cancel()
+        self.assertEqual(response.data['released_holds'], 1)
+        self.assertEqual(response.data['withdrawn_waitlist_entries'], 1)
+        hold.refresh_from_db()
+        entry.refresh_from_db()
+        self.assertEqual(hold.status, SeatHold.STATUS_RELEASED)
+        self.assertEqual(entry.status, WaitlistEntry.STATUS_WITHDRAWN)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 0)
+        
+        other = Event.objects.create(
+            title='Lottery Event',
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+            capacity=1,
+            creator=self.organizer
+        )
+        lottery = open_lottery(other, timezone.now() + timedelta(days=1))
+        enter_lottery(lottery, self.customers[0])
+        self._cancel(event=other)
+        lottery.refresh_from_db()
+        other.refresh_from_db()
+        self.assertIsNotNone(lottery.drawn_at)
+        self.assertFalse(other.lottery_pending)
+        self.assertEqual(lottery.entries.get().result, LotteryEntry.RESULT_LOST)
+        with self.assertRaises(ValueError):
+            enter_lottery(lottery, self.customers[1])
+    
+    def test_cancelled_event_refuses_bookings(self):
+        """Test that bookings and seat claims on a cancelled event are refused."""
+        from bookings.models import Booking
+        from events.models import EventFullError
+        self._cancel()
+        self.client.force_authenticate(user=self.customers[0].user)
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cancelled', str(response.data['event']))
+        self.event.refresh_from_db()
+        with self.assertRaises(EventFullError):
+            Booking.objects.create(attendee=self.customers[0], event=self.event)
+        self.assertEqual(self.event.claim_seats(2), 0)
+    
+    def test_stale_save_keeps_cancellation(self):
+        """Test that saving an instance loaded before the cancellation does not revive the event."""
+        from bookings.models import Booking
+        self._book(self.customers[:2])
+        stale = Event.objects.get(pk=self.event.pk)
+        self._cancel()
+        stale.title = 'Renamed'
+        stale.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.title, 'Renamed')
+        self.assertTrue(self.event.is_cancelled)
+        self.assertEqual(self.event.booked_count, 0)
+        self.assertFalse(Booking.objects.filter(event=self.event, status='active').exists())
+    
+    def test_cancel_rules(self):
+        """Test that only the creator may cancel, once, and only before the event starts."""
+        self.client.force_authenticate(user=self.customers[0].user)
+        self.assertEqual(self._cancel().status_code, status.HTTP_403_FORBIDDEN)
+        other_user = User.objects.create_user(username='organizer2')
+        Organizer.objects.create(user=other_user, organization_name='Other Org', business_address='456 Other St')
+        self.client.force_authenticate(user=other_user)
+        self.assertEqual(self._cancel().status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.organizer_user)
+        self.assertEqual(self._cancel().status_code, status.HTTP_200_OK)
+        response = self._cancel()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already been cancelled', response.data['error'])
+        Event.objects.filter(pk=self.event.pk).update(start_time=timezone.now() - timedelta(hours=1), cancelled_at=None)
+        response = self._cancel()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('started or ended', response.data['error'])
+    
+    def test_sharded_event_seats_released(self):
+        """Test that cancelling a sharded event returns the seats to its capacity buckets."""
+        from django.core.cache import caches
+        from .models import CapacityBucket
+        self.event.bucket_count = 2
+        self.event.save()
+        self._book(self.customers[:3])
+        with self.captureOnCommitCallbacks(execute=True):
+            self._cancel()
+        caches['availability'].clear()
+        self.assertEqual(sum(CapacityBucket.objects.filter(event=self.event).values_list('booked_count', flat=True)), 0)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.available_slots, 4)
+    
+    def test_sharded_event_refuses_bookings_after_cancel(self):
+        """Test that a cancelled sharded event takes no new seats, even through a stale instance."""
+        from django.core.cache import caches
+        from bookings.models import Booking
+        from .models import CapacityBucket, EventFullError
+        self.event.bucket_count = 2
+        self.event.save()
+        self._book(self.customers[:2])
+        stale = Event.objects.get(pk=self.event.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._cancel()
+        with self.assertRaises(EventFullError):
+            Booking.objects.create(attendee=self.customers[2], event=stale)
+        self.assertEqual(stale.claim_seats(2), 0)
+        self.client.force_authenticate(user=self.customers[3].user)
+        response = self.client.post(reverse('booking-list'), {'event': self.event.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Booking.objects.filter(event=self.event, status='active').exists())
+        caches['availability'].clear()
+        self.assertEqual(sum(CapacityBucket.objects.filter(event=self.event).values_list('booked_count', flat=True)), 0)
@@ -1,12 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EventViewSet
+from .feeds import organizer_calendar
+from .views import EventSeriesViewSet, EventViewSet
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
 router.register(r'event', EventViewSet, basename='event')
+router.register(r'series', EventSeriesViewSet, basename='series')
 
 # The API URLs are now determined automatically by the router
 urlpatterns = [
+    path('calendar/<str:key>.ics', organizer_calendar, name='event-calendar'),
     path('', include(router.urls)),
 ]
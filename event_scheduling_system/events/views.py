@@ -1,17 +1,40 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import patch_cache_control
+
+from event_scheduling_system.conditional import ConditionalGetMixin, conditional_response
+from event_scheduling_system.fast_serializers import ValuesListMixin
+from event_scheduling_system.fieldsets import SparseFieldsViewMixin
+from event_scheduling_system.idempotency import idempotent
+from event_scheduling_system.pagination import KeysetPaginationMixin
 
-from .models import Event
-from .serializers import EventSerializer
+from .fast_serializers import EventValuesSerializer
+from .importer import IMPORT_FORMATS, detect_format, import_events, iter_rows
+from .listing_cache import (
+    get_listing, listing_cache_enabled, listing_etag, listing_key, next_boundary, store_listing
+)
+from .models import Event, EventSeries
+from .serializers import EventSerializer, EventSeriesSerializer
 from .permissions import IsEventCreatorOrCustomerReadOnly
+from .search import search_events
+from bookings.cancellation import cancel_event
 from user.models import HistoryPoint
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(
+    KeysetPaginationMixin, ValuesListMixin, ConditionalGetMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
     """
     Minimal Event CRUD:
     - GET /eventapi/event/ : list of all events for organisers and customers
@@ -19,15 +42,52 @@ class EventViewSet(viewsets.ModelViewSet):
     - GET /eventapi/event/{id}/ : Creator can see their events with ID; and customers can see all events with ID
     - PATCH /eventapi/event/{id}/ : Updates an event, if event's creator; 403 for customers
     - DELETE /eventapi/event/{id}/ : Hard deletes an event, if event's creator; 403 for customers
+    - POST /eventapi/event/{id}/cancel/ : Calls off an upcoming event, if event's creator: its bookings are cancelled
+      and emails to its attendees queued for the booking workers; 403 for customers
     - GET /eventapi/event/my_events/ : Lists creator's events; 403 for customers
     - GET /eventapi/event/upcoming/ : Lists upcoming events for organisers and customers
     - GET /eventapi/event/past/ : list past events for organisers and customers
+    - POST /eventapi/event/import/ : Bulk creates events from a CSV/NDJSON upload for organisers; 403 for customers
+    - GET /eventapi/event/search/?q= : Full-text search, best match first; ?when=upcoming|past, ?prefix=true
+    - GET /eventapi/event/autocomplete/?q= : Ids and titles of the best matches for a partially typed query
+
+    List endpoints are page-numbered by default; ?pagination=cursor switches them to keyset cursors.
+    GETs carry ETags (lists also Last-Modified) and answer matching conditional requests with 304.
+    GETs accept ?fields=a,b or ?omit=a,b to render, and load, only some fields.
+    POST /eventapi/event/ and POST /eventapi/event/{id}/cancel/ accept an Idempotency-Key header; repeats with the
+    key replay the first response.
     """
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
     queryset = Event.objects.all()
+    # Nested creator/user and availability (booked_count, or the prefetched capacity buckets
+    # of sharded events) are only loaded when the response renders them
+    field_querysets = (
+        (('creator',), lambda queryset: queryset.select_related('creator__user')),
+        (('available_slots', 'is_full'), lambda queryset: queryset.prefetch_related('capacity_buckets')),
+    )
+    deferrable_fields = ('description',)
     serializer_class = EventSerializer
+    values_serializer_class = EventValuesSerializer
     permission_classes = [IsAuthenticated, IsEventCreatorOrCustomerReadOnly]
+    keyset_ordering = {
+        'list': ('-created_at', 'id'),
+        'my_events': ('-created_at', 'id'),
+        'upcoming': ('start_time', 'id'),
+        'past': ('-end_time', 'id'),
+    }
+
+    def get_queryset(self):
+        return self.prune_queryset(super().get_queryset())
+
+    def object_version(self, event):
+        version = [event.pk, event.updated_at.isoformat()]
+        if self.field_selected('creator'):
+            version.append(event.creator.updated_at.isoformat())
+        if self.field_selected('available_slots') or self.field_selected('is_full'):
+            version.append(event.seat_version)
+        return version
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Create an event and log the action.
@@ -89,16 +149,30 @@ class EventViewSet(viewsets.ModelViewSet):
         
         return response
 
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def cancel(self, request, pk=None):
+        """
+        Cancel an upcoming event with all of its bookings.
+        """
+        event = self.get_object()
+        try:
+            summary = cancel_event(event, request.user)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': 'Event cancelled successfully.',
+            **summary
+        }, status=status.HTTP_200_OK)
+
     def _get_paginated_response(self, queryset):
         """
         Helper method to handle pagination for custom actions.
         """
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page, rows = self.list_rows(queryset)
+        return self.render_rows(rows, page)
 
     @action(detail=False, methods=['get'])
     def my_events(self, request):
@@ -111,21 +185,240 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        queryset = Event.objects.filter(creator=request.user.organizer_profile)
-        return self._get_paginated_response(queryset)
+        queryset = self.get_queryset().filter(creator=request.user.organizer_profile)
+        return self.conditional_list(queryset)
+
+    def _cached_listing(self, tier, queryset, now):
+        """
+        Serve an upcoming/past page from the listing cache, filling it on a miss.
+
+        Past pages may be kept by clients until the next event ends; upcoming
+        pages must be revalidated since bookings change their availability.
+        """
+        if not listing_cache_enabled():
+            return self.conditional_list(queryset)
+
+        key = listing_key(tier, self.request)
+        cached = get_listing(key, now)
+        if cached is not None:
+            data, expires_at = cached
+            response = conditional_response(self.request, lambda: Response(data), listing_etag(key, expires_at))
+        else:
+            response = self._get_paginated_response(queryset)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            expires_at = store_listing(key, response.data, now, next_boundary(tier, now))
+            response['ETag'] = listing_etag(key, expires_at)
+
+        if tier == 'past':
+            max_age = min(settings.EVENT_PAST_MAX_AGE, int((expires_at - now).total_seconds()))
+            patch_cache_control(response, private=True, max_age=max_age)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """
         List upcoming events (events that haven't started yet).
         """
-        queryset = Event.objects.filter(start_time__gt=timezone.now())
-        return self._get_paginated_response(queryset)
+        now = timezone.now()
+        queryset = self.get_queryset().filter(start_time__gt=now)
+        return self._cached_listing('upcoming', queryset, now)
 
     @action(detail=False, methods=['get'])
     def past(self, request):
         """
         List past events (events that have already ended).
         """
-        queryset = Event.objects.filter(end_time__lt=timezone.now())
-        return self._get_paginated_response(queryset)
+        now = timezone.now()
+        queryset = self.get_queryset().filter(end_time__lt=now)
+        return self._cached_listing('past', queryset, now)
+
+    AUTOCOMPLETE_LIMIT = 10
+
+    def _search_queryset(self, request, prefix):
+        """
+        Events matching ?q=, narrowed by ?when=upcoming|past; raises ValidationError on bad input.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': ['A search query is required.']})
+        when = request.query_params.get('when')
+        queryset = self.get_queryset()
+        now = timezone.now()
+        if when == 'upcoming':
+            queryset = queryset.filter(start_time__gt=now)
+        elif when == 'past':
+            queryset = queryset.filter(end_time__lt=now)
+        elif when:
+            raise ValidationError({'when': ['Must be one of: upcoming, past.']})
+        return search_events(queryset, text, prefix=prefix)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Search event titles and descriptions; ?prefix=true lets the last word match as a prefix.
+        """
+        prefix = request.query_params.get('prefix', '').lower() in ('1', 'true', 'yes')
+        return self.conditional_list(self._search_queryset(request, prefix))
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Suggest events for a partially typed query.
+        """
+        queryset = self._search_queryset(request, prefix=True)
+        return Response({'results': list(queryset.values('id', 'title')[:self.AUTOCOMPLETE_LIMIT])})
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_events(self, request):
+        """
+        Stream a CSV or NDJSON upload ('file') into events; reports errors per row.
+
+        The format comes from the file extension unless ?import_format= (or an
+        'import_format' form field) names it; DRF keeps ?format= for renderers.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['A CSV or NDJSON file is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = detect_format(
+            upload.name, request.query_params.get('import_format') or request.data.get('import_format')
+        )
+        if fmt is None:
+            return Response(
+                {'import_format': [f'Format must be one of: {", ".join(IMPORT_FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        summary = import_events(
+            iter_rows(upload.file, fmt), organizer=request.user.organizer_profile, user=request.user
+        )
+        response_status = status.HTTP_201_CREATED if summary['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(summary, status=response_status)
+
+
+class EventSeriesViewSet(viewsets.ModelViewSet):
+    """
+    Recurring event series:
+    - GET /eventapi/series/ : all series for customers; own series for organisers
+    - POST /eventapi/series/ : Creates a template event and its recurrence rule for organisers, 403 for customers
+    - GET /eventapi/series/{id}/ : Creator can see their series with ID; and customers can see all series with ID
+    - PATCH /eventapi/series/{id}/ : Changes the rule, if series' creator; 403 for customers
+    - DELETE /eventapi/series/{id}/ : Ends the series, if series' creator; booked occurrences stay as events
+    - GET /eventapi/series/{id}/occurrences/ : Occurrences of one series in a window
+    - GET /eventapi/series/occurrences/ : Occurrences of all visible series in a window, in start order
+
+    Occurrences are computed from the rule and only become events once booked
+    (see POST /bookingapi/booking/series/). Windows take ?from= and ?to=
+    (ISO 8601, default: now and OCCURRENCE_WINDOW later) and ?limit=.
+    """
+    http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    queryset = EventSeries.objects.select_related('template__creator__user')
+    serializer_class = EventSeriesSerializer
+    permission_classes = [IsAuthenticated, IsEventCreatorOrCustomerReadOnly]
+    OCCURRENCE_WINDOW = timedelta(days=31)
+    OCCURRENCE_LIMIT = 50
+    MAX_OCCURRENCE_LIMIT = 500
+
+    def get_queryset(self):
+        if self.action in ('list', 'all_occurrences') and hasattr(self.request.user, 'organizer_profile'):
+            return self.queryset.filter(template__creator=self.request.user.organizer_profile)
+        return self.queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        Create a series and log the action once, however many occurrences it has.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        series = serializer.save()
+        HistoryPoint.log_action(
+            user=request.user,
+            action=HistoryPoint.ACTION_CREATE,
+            obj=series,
+            details={
+                'title': series.template.title,
+                'template_id': series.template.id,
+                'frequency': series.frequency,
+                'interval': series.interval,
+                'starts_at': series.starts_at.isoformat(),
+                'creator_id': series.template.creator_id
+            }
+        )
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_destroy(self, instance):
+        HistoryPoint.log_action(
+            user=self.request.user,
+            action=HistoryPoint.ACTION_DELETE,
+            obj=instance,
+            details={'title': instance.template.title, 'template_id': instance.template.id}
+        )
+        instance.delete()
+
+    def _window(self, request):
+        """(from, to, limit) of an occurrence window; raises ValidationError on bad input."""
+        bounds = {}
+        for name in ('from', 'to'):
+            value = request.query_params.get(name)
+            parsed = parse_datetime(value) if value else None
+            if value and parsed is None:
+                raise ValidationError({name: ['Must be an ISO 8601 date-time.']})
+            if parsed is not None and timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            bounds[name] = parsed
+        start = bounds['from'] or timezone.now()
+        end = bounds['to'] or start + self.OCCURRENCE_WINDOW
+        if end <= start:
+            raise ValidationError({'to': ['Must be after from.']})
+        try:
+            limit = int(request.query_params.get('limit', self.OCCURRENCE_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': ['Must be an integer.']})
+        return start, end, max(1, min(limit, self.MAX_OCCURRENCE_LIMIT))
+
+    @staticmethod
+    def _occurrence_data(series, start, end, event):
+        return {
+            'series': series.id,
+            'event': event.id if event else None,
+            'title': event.title if event else series.template.title,
+            'start_time': start,
+            'end_time': end,
+            'available_slots': event.available_slots if event else series.template.capacity,
+        }
+
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None):
+        """
+        List a series' occurrences in a window, booked or not.
+        """
+        series = self.get_object()
+        start, end, limit = self._window(request)
+        occurrences = islice(series.occurrences(start, end), limit)
+        return Response({'results': [self._occurrence_data(series, *occurrence) for occurrence in occurrences]})
+
+    @action(detail=False, methods=['get'], url_path='occurrences')
+    def all_occurrences(self, request):
+        """
+        Merge the occurrences of every visible series in a window, earliest first.
+        """
+        start, end, limit = self._window(request)
+        series_list = list(self.get_queryset())
+        materialized = {}
+        for event in Event.objects.filter(
+            series__in=series_list, recurrence_start__gte=start, recurrence_start__lt=end
+        ).prefetch_related('capacity_buckets'):
+            materialized.setdefault(event.series_id, {})[event.recurrence_start] = event
+
+        def stream(series):
+            for occurrence in series.occurrences(start, end, materialized.get(series.id, {})):
+                yield occurrence, series
+
+        # Each series yields lazily in start order, so merging them reads only what the page needs
+        merged = heapq.merge(*map(stream, series_list), key=lambda item: (item[0][0], item[1].id))
+        return Response({'results': [
+            self._occurrence_data(series, *occurrence) for occurrence, series in islice(merged, limit)
+        ]})
+
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Organizer, Customer, HistoryPoint
+from .models import Organizer, Customer, CalendarFeed, HistoryPoint
 
 
 class OrganizerAdmin(admin.ModelAdmin):
@@ -20,7 +20,12 @@ class HistoryPointAdmin(admin.ModelAdmin):
     list_filter = ('action', 'created_at')
     search_fields = ('user__username', 'content_type__model')
 
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at')
+    search_fields = ('user__username',)
+
 # Register the models
 admin.site.register(Organizer, OrganizerAdmin)
 admin.site.register(Customer, CustomerAdmin)
+admin.site.register(CalendarFeed, CalendarFeedAdmin)
 admin.site.register(HistoryPoint, HistoryPointAdmin)
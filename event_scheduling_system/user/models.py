@@ -1,7 +1,11 @@
-from django.db import models
+import secrets
+
+from django.db import connections, models
+from django.db.models import F, Value
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 
 
 class Organizer(models.Model):
@@ -24,6 +28,35 @@ class Customer(models.Model):
         return f"{self.user.username} - Customer"
 
 
+class CalendarFeed(models.Model):
+    """
+    Secret key of a user's iCalendar feed URLs.
+
+    Feeds are fetched by calendar apps without credentials, so the key in the
+    URL is the credential; rotating it revokes every subscribed copy.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed')
+    key = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - Calendar feed"
+
+    @staticmethod
+    def new_key():
+        return secrets.token_urlsafe(32)
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the user's feed, creating its key on first use."""
+        feed, _ = cls.objects.get_or_create(user=user, defaults={'key': cls.new_key()})
+        return feed
+
+    def rotate(self):
+        self.key = self.new_key()
+        self.save(update_fields=['key'])
+
+
 class HistoryPoint(models.Model):
     """
     Generic model to track all user actions across the system.
@@ -69,6 +102,7 @@ class HistoryPoint(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'action']),
+            models.Index(fields=['user', '-created_at'], name='history_user_created_idx'),
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['created_at']),
         ]
@@ -91,3 +125,57 @@ class HistoryPoint(models.Model):
             object_id=obj.pk,
             details=details
         )
+
+    @classmethod
+    def bulk_log_actions(cls, entries):
+        """
+        Log many actions with a single bulk insert.
+
+        Args:
+            entries: Iterable of (user, action, obj, details) tuples
+        """
+        return cls.objects.bulk_create([
+            cls(
+                user=user,
+                action=action,
+                content_type=ContentType.objects.get_for_model(obj),
+                object_id=obj.pk,
+                details=details or {}
+            )
+            for user, action, obj, details in entries
+        ])
+
+    @classmethod
+    def log_queryset_actions(cls, queryset, user_lookup, action, details=None):
+        """
+        Log the same action for every object of a queryset with one
+        INSERT ... SELECT, without loading the objects.
+
+        Args:
+            queryset: Objects the action was performed on
+            user_lookup: Lookup from those objects to the acting user's id, e.g. 'attendee__user_id'
+            action: One of the ACTION_* values
+            details: Details shared by all logged actions
+
+        Returns the number of logged actions.
+        """
+        # All columns are annotations, so the SELECT list follows this order
+        rows = queryset.order_by().values(
+            _user=F(user_lookup),
+            _action=Value(action, output_field=models.CharField()),
+            _content_type=Value(
+                ContentType.objects.get_for_model(queryset.model).pk, output_field=models.IntegerField()
+            ),
+            _object_id=F('pk'),
+            _details=Value(details or {}, output_field=models.JSONField()),
+            _created_at=Value(timezone.now(), output_field=models.DateTimeField()),
+        )
+        select, params = rows.query.sql_with_params()
+        connection = connections[queryset.db]
+        columns = ', '.join(
+            connection.ops.quote_name(cls._meta.get_field(name).column)
+            for name in ('user', 'action', 'content_type', 'object_id', 'details', 'created_at')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {connection.ops.quote_name(cls._meta.db_table)} ({columns}) {select}', params)
+            return cursor.rowcount
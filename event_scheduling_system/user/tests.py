@@ -377,7 +377,20 @@ class HistoryPointAPITest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
-
+    
+    def test_history_list_query_plans(self):
+        """Test that history listing reads the (user, created_at) index, not the whole table."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from event_scheduling_system.query_plans import full_table_scans
+        self.client.force_authenticate(user=self.organizer_user)
+        for query_string in ('', '?action=create'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('history-list') + query_string)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            for query in ctx.captured_queries:
+                if query['sql'].lstrip().upper().startswith('SELECT'):
+                    self.assertEqual(full_table_scans(query['sql']), [], query['sql'])
 
 class UserModelTest(TestCase):
     """Test cases for user models."""
@@ -540,3 +553,43 @@ class HistoryPointModelTest(TestCase):
         # Verify ordering (newest first)
         self.assertEqual(history_points[0], history2)
         self.assertEqual(history_points[1], history1)
+
+
+class CalendarFeedAPITest(APITestCase):
+    """Test cases for the calendar feed URL endpoint."""
+    
+    def setUp(self):
+        self.organizer_user = User.objects.create_user(username='organizer1', password='testpass123')
+        Organizer.objects.create(user=self.organizer_user, organization_name='Test Org', business_address='-')
+        self.customer_user = User.objects.create_user(username='customer1', password='testpass123')
+        Customer.objects.create(user=self.customer_user)
+        self.url = reverse('calendar-feed')
+    
+    def test_feed_urls_by_role(self):
+        """Test that customers get a bookings feed and organizers an events feed, stable across calls."""
+        self.client.force_authenticate(user=self.customer_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'bookings_url'})
+        self.assertTrue(response.data['bookings_url'].startswith('http://testserver/bookingapi/calendar/'))
+        self.assertEqual(self.client.get(self.url).data, response.data)
+        
+        self.client.force_authenticate(user=self.organizer_user)
+        response = self.client.get(self.url)
+        self.assertEqual(set(response.data), {'events_url'})
+    
+    def test_rotate(self):
+        """Test that rotating the secret changes the URL, revokes the old one and is logged."""
+        self.client.force_authenticate(user=self.customer_user)
+        old_url = self.client.get(self.url).data['bookings_url']
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['bookings_url'], old_url)
+        self.assertEqual(self.client.get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(response.data['bookings_url']).status_code, status.HTTP_200_OK)
+        self.assertTrue(HistoryPoint.objects.filter(user=self.customer_user, details__calendar_feed='rotated').exists())
+    
+    def test_requires_authentication(self):
+        """Test that the endpoint requires authentication."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from user.views import (
     OrganizerRegistrationView, CustomerRegistrationView,
-    LoginView, LogoutView, UserProfileView, HistoryPointViewSet
+    LoginView, LogoutView, UserProfileView, CalendarFeedView, HistoryPointViewSet
 )
 
 # Create a router for ViewSets
@@ -17,6 +17,7 @@ urlpatterns = [
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
     path('auth/profile/', UserProfileView.as_view(), name='user-profile'),
+    path('auth/calendar-feed/', CalendarFeedView.as_view(), name='calendar-feed'),
     
     # Include router URLs
     path('', include(router.urls)),
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.urls import reverse
 from rest_framework import status, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -12,7 +13,7 @@ from user.serializers import (
     OrganizerRegistrationSerializer, CustomerRegistrationSerializer,
     LoginSerializer, HistoryPointSerializer
 )
-from user.models import Organizer, Customer, HistoryPoint
+from user.models import Organizer, Customer, CalendarFeed, HistoryPoint
 
 
 class HistoryPointViewSet(viewsets.ReadOnlyModelViewSet):
@@ -290,4 +291,43 @@ class UserProfileView(APIView):
             response_data['user_type'] = 'user'
             response_data['profile_data'] = {}
         
-        return response_data
\ No newline at end of file
+        return response_data
+
+
+class CalendarFeedView(APIView):
+    """
+    Secret iCalendar feed URLs of the current user:
+    - GET /userapi/auth/calendar-feed/ : the feed URLs (bookings for customers, own events for organizers)
+    - POST /userapi/auth/calendar-feed/ : rotates the secret, invalidating the previous URLs
+    """
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        responses={200: None},
+        description="Get the secret calendar feed URLs of the current user"
+    )
+    def get(self, request):
+        return Response(self._feed_urls(request, CalendarFeed.for_user(request.user)), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        responses={200: None},
+        description="Rotate the calendar feed secret; previous feed URLs stop working"
+    )
+    def post(self, request):
+        feed = CalendarFeed.for_user(request.user)
+        feed.rotate()
+        HistoryPoint.log_action(
+            user=request.user,
+            action=HistoryPoint.ACTION_UPDATE,
+            obj=feed,
+            details={'calendar_feed': 'rotated'}
+        )
+        return Response(self._feed_urls(request, feed), status=status.HTTP_200_OK)
+
+    def _feed_urls(self, request, feed):
+        urls = {}
+        if hasattr(request.user, 'customer_profile'):
+            urls['bookings_url'] = request.build_absolute_uri(reverse('booking-calendar', kwargs={'key': feed.key}))
+        if hasattr(request.user, 'organizer_profile'):
+            urls['events_url'] = request.build_absolute_uri(reverse('event-calendar', kwargs={'key': feed.key}))
+        return urls